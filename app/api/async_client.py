@@ -0,0 +1,268 @@
+""" Asyncio transport for the PTV and GTFS-R APIs, for refreshing many stops at once """
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError as e:  # optional dependency
+    raise ImportError(
+        "The async PTV client requires aiohttp (pip install aiohttp)"
+    ) from e
+
+from google.transit import gtfs_realtime_pb2
+
+import config
+from api import gtfs, ptv_api
+from api.resilience import ALLOW, PROBE
+from models.train_stop import TrainStop
+from models.tram_stop import TramStop
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPTVClient:
+    """
+    Asyncio client for the PTV timetable API and GTFS-R feeds.
+
+    Requests are signed with ``ptv_api.getUrl`` and go through the same
+    circuit breakers and last-good-response cache as the synchronous client,
+    so both transports see one view of API health. A semaphore bounds the
+    number of requests in flight, one pooled ``aiohttp`` session is shared by
+    every request, and concurrent requests for the same URL are coalesced
+    into one.
+
+    Use as an async context manager::
+
+        async with AsyncPTVClient() as client:
+            result = await client.get("/v3/departures/...")
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = config.ASYNC_MAX_CONCURRENCY,
+        timeout: Tuple[float, float] = config.PTV_REQUEST_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        connect, read = timeout
+        self._timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncPTVClient":
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_with_age(self, endpoint: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        """
+        Async equivalent of ``ptv_api.send_ptv_request_with_age``.
+
+        An open circuit answers from the last good response without a
+        request; a due probe is made inline rather than in a thread.
+
+        Args:
+            endpoint: PTV API endpoint (e.g., "/v3/departures/...")
+
+        Returns:
+            Tuple of (parsed JSON response or None, age in seconds)
+        """
+        breaker = ptv_api.breaker_for(endpoint)
+        decision = breaker.allow()
+
+        if decision in (ALLOW, PROBE):
+            result, failed = await self._coalesced(endpoint, self._get_json, endpoint)
+            if result is not None:
+                return result, 0.0
+            if not failed:
+                return None, None
+        else:
+            ptv_api.count_request("short_circuited")
+
+        return ptv_api.serve_stale(endpoint)
+
+    async def get(self, endpoint: str) -> Optional[Dict[str, Any]]:
+        """Async equivalent of ``ptv_api.send_ptv_request``."""
+        result, _ = await self.get_with_age(endpoint)
+        return result
+
+    async def fetch_gtfsr(self, url: str):
+        """
+        Fetch and parse a GTFS-R protobuf feed.
+
+        Returns:
+            ``FeedMessage`` or None on error
+        """
+        feed, _ = await self._coalesced(url, self._get_feed, url)
+        return feed
+
+    async def _coalesced(self, key: str, fetch, arg) -> Tuple[Any, bool]:
+        """Run ``fetch(arg)`` once for all concurrent callers with the same key."""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            ptv_api.count_request("coalesced")
+            return await asyncio.shield(pending)
+
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            outcome = await fetch(arg)
+        except BaseException:
+            outcome = (None, True)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            pending.set_result(outcome)
+        return outcome
+
+    async def _get_json(self, endpoint: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Make a single signed GET request and record its outcome with
+        ``ptv_api.record_request``; same failure rules as
+        ``ptv_api._send_ptv_request``.
+        """
+        url = ptv_api.getUrl(endpoint)
+        async with self._semaphore:
+            ptv_api.count_request("requests")
+            start = time.perf_counter()
+            result, failed = await self._request_json(url, endpoint)
+        ptv_api.record_request(endpoint, time.perf_counter() - start, result, failed)
+        return result, failed
+
+    async def _request_json(self, url: str, endpoint: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        try:
+            async with self._session.get(url) as response:
+                if response.status == 200:
+                    logger.debug(f"PTV API request successful: {endpoint}")
+                    return await response.json(content_type=None), False
+                text = await response.text()
+                logger.error(f"PTV API error {response.status}: {text} (endpoint: {endpoint})")
+                return None, response.status >= 500 or response.status == 429
+        except asyncio.TimeoutError:
+            logger.error(f"API request timeout for {endpoint}")
+        except aiohttp.ClientError as e:
+            logger.error(f"Request failed for {endpoint}: {str(e)}")
+        except ValueError as e:
+            logger.error(f"Invalid JSON response from API: {str(e)}")
+        return None, True
+
+    async def _get_feed(self, url: str):
+        headers = {"KeyID": os.getenv("OPENDATA_KEY") or ""}
+        async with self._semaphore:
+            try:
+                async with self._session.get(url, headers=headers) as response:
+                    response.raise_for_status()
+                    content = await response.read()
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                logger.error(f"GTFS-R request failed for {url}: {str(e) or type(e).__name__}")
+                return None, True
+
+        feed = gtfs_realtime_pb2.FeedMessage()
+        try:
+            feed.ParseFromString(content)
+        except Exception as e:
+            logger.error(f"Invalid GTFS-R feed from {url}: {str(e)}")
+            return None, True
+        return feed, False
+
+
+async def _resolve(client: AsyncPTVClient, stop) -> bool:
+    try:
+        stop.apply_stop_response(await client.get(stop.stop_endpoint()))
+        return True
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"Failed to resolve stop {stop.stop_id}: {str(e)}")
+        return False
+
+
+async def load_train_stops(client: AsyncPTVClient, stop_ids: Iterable) -> Dict[str, TrainStop]:
+    """
+    Resolve many train stops concurrently.
+
+    Returns:
+        Dict of stop ID to ``TrainStop``; stops that fail to resolve are
+        logged and left out.
+    """
+    stops = [TrainStop(stop_id, resolve=False) for stop_id in stop_ids]
+    resolved = await asyncio.gather(*(_resolve(client, stop) for stop in stops))
+    return {str(stop.stop_id): stop for stop, ok in zip(stops, resolved) if ok}
+
+
+async def load_tram_stops(client: AsyncPTVClient, stop_ids: Iterable) -> Dict[str, TramStop]:
+    """Resolve many tram stops concurrently; see ``load_train_stops``."""
+    stops = [TramStop(stop_id, resolve=False) for stop_id in stop_ids]
+    resolved = await asyncio.gather(*(_resolve(client, stop) for stop in stops))
+    return {str(stop.stop_id): stop for stop, ok in zip(stops, resolved) if ok}
+
+
+async def refresh_train_stops(
+    client: AsyncPTVClient,
+    stops: Iterable[TrainStop],
+    max_results: int = config.FLEET_MAX_RESULTS,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch unfiltered departures for many train stops concurrently.
+
+    Each stop records the outcome (``last_fetch_ok`` and snapshots) exactly
+    as ``TrainStop.fetch_departures`` would, so the responses can be passed
+    straight to ``build_departures``.
+
+    Returns:
+        Dict of stop ID to departures response (None on error)
+    """
+    stops = list(stops)
+
+    async def refresh(stop: TrainStop):
+        result, age = await client.get_with_age(stop.departures_endpoint(max_results))
+        stop.record_departures(result, age)
+        return result
+
+    results = await asyncio.gather(*(refresh(stop) for stop in stops))
+    return {str(stop.stop_id): result for stop, result in zip(stops, results)}
+
+
+async def refresh_tram_stops(
+    client: AsyncPTVClient,
+    stops: Iterable[TramStop],
+    max_results: int = 20,
+) -> Dict[str, Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """
+    Fetch departures for many tram stops and their service alerts.
+
+    The tram service-alerts feed is fetched once, concurrently with the
+    departures, and filtered per stop instead of once per stop.
+
+    Returns:
+        Dict of stop ID to ``(departures response or None, alerts)``, the
+        same payload shape ``fleet.DepartureStore`` keeps for trams.
+    """
+    stops = list(stops)
+
+    async def refresh(stop: TramStop):
+        result, age = await client.get_with_age(stop.departures_endpoint(max_results))
+        stop.record_departures(result, age)
+        return result
+
+    feed, *results = await asyncio.gather(
+        client.fetch_gtfsr(gtfs.TRAM_ALERTS_URL),
+        *(refresh(stop) for stop in stops),
+    )
+
+    payloads = {}
+    for stop, result in zip(stops, results):
+        alerts = []
+        if result is not None and feed is not None:
+            service_updates = gtfs.alerts_for_routes(feed, stop.route_numbers(result))
+            alerts = stop.apply_service_updates(service_updates)
+        payloads[str(stop.stop_id)] = (result, alerts)
+    return payloads
@@ -0,0 +1,154 @@
+""" Incremental GTFS-realtime feed diffing """
+from hashlib import blake2b
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from google.protobuf.message import DecodeError
+from google.transit import gtfs_realtime_pb2
+
+logger = logging.getLogger(__name__)
+
+# FeedMessage field numbers and protobuf wire types
+_HEADER_FIELD = 1
+_ENTITY_FIELD = 2
+_VARINT, _I64, _LEN, _I32 = 0, 1, 2, 5
+
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _top_level_fields(buf: bytes) -> Iterator[Tuple[int, int, int]]:
+    """
+    Yield ``(field_number, start, end)`` for each length-delimited top-level
+    field of a serialised message, skipping other wire types.
+    """
+    pos, end = 0, len(buf)
+    while pos < end:
+        tag, pos = _read_varint(buf, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if wire_type == _LEN:
+            length, pos = _read_varint(buf, pos)
+            yield field, pos, pos + length
+            pos += length
+        elif wire_type == _VARINT:
+            _, pos = _read_varint(buf, pos)
+        elif wire_type == _I64:
+            pos += 8
+        elif wire_type == _I32:
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type} in feed")
+
+
+class FeedDiff:
+    """Entities added, changed and removed between two polls of a feed."""
+
+    def __init__(self, timestamp: int):
+        self.timestamp = timestamp
+        self.added: Dict[str, gtfs_realtime_pb2.FeedEntity] = {}
+        self.changed: Dict[str, gtfs_realtime_pb2.FeedEntity] = {}
+        self.removed: List[str] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def __repr__(self) -> str:
+        return (f"FeedDiff(timestamp={self.timestamp}, added={len(self.added)}, "
+                f"changed={len(self.changed)}, removed={len(self.removed)})")
+
+
+class FeedDiffer:
+    """
+    Tracks one GTFS-R feed across polls and reports what changed.
+
+    Works on the raw protobuf bytes. The header is decoded first and, if its
+    timestamp hasn't moved, nothing else is touched. Otherwise each entity's
+    serialised bytes are hashed and only entities whose hash is new are
+    parsed, so an unchanged alert or vehicle costs a hash rather than a
+    protobuf parse. ``entities`` always holds the current parsed entity for
+    every id.
+    """
+
+    def __init__(self):
+        self.timestamp: Optional[int] = None
+        self.entities: Dict[str, gtfs_realtime_pb2.FeedEntity] = {}
+        self._hashes: Dict[str, bytes] = {}       # entity id -> content hash
+        self._ids_by_hash: Dict[bytes, str] = {}  # content hash -> entity id
+
+    def apply(self, content: bytes) -> Optional[FeedDiff]:
+        """
+        Diff a newly fetched feed against the previous one.
+
+        Args:
+            content: Serialised ``FeedMessage``.
+
+        Returns:
+            ``FeedDiff`` (possibly empty), or None if the header timestamp is
+            unchanged and the feed was skipped.
+
+        Raises:
+            ValueError: If the feed can't be decoded.
+        """
+        try:
+            header_slice = None
+            entity_slices = []
+            for field, start, end in _top_level_fields(content):
+                if field == _ENTITY_FIELD:
+                    entity_slices.append((start, end))
+                elif field == _HEADER_FIELD:
+                    header_slice = (start, end)
+                    header = gtfs_realtime_pb2.FeedHeader.FromString(content[start:end])
+                    if header.timestamp and header.timestamp == self.timestamp:
+                        return None
+        except (IndexError, DecodeError) as e:
+            raise ValueError(f"Invalid GTFS-R feed: {str(e)}") from e
+
+        if header_slice is None:
+            raise ValueError("Invalid GTFS-R feed: no header")
+
+        diff = FeedDiff(header.timestamp)
+        hashes: Dict[str, bytes] = {}
+        ids_by_hash: Dict[bytes, str] = {}
+
+        for start, end in entity_slices:
+            raw = content[start:end]
+            digest = blake2b(raw, digest_size=16).digest()
+            entity_id = self._ids_by_hash.get(digest)
+            if entity_id is None:
+                try:
+                    entity = gtfs_realtime_pb2.FeedEntity.FromString(raw)
+                except DecodeError as e:
+                    raise ValueError(f"Invalid GTFS-R feed entity: {str(e)}") from e
+                entity_id = entity.id
+                if entity_id in self._hashes:
+                    diff.changed[entity_id] = entity
+                else:
+                    diff.added[entity_id] = entity
+            hashes[entity_id] = digest
+            ids_by_hash[digest] = entity_id
+
+        diff.removed = [entity_id for entity_id in self._hashes if entity_id not in hashes]
+
+        for entity_id in diff.removed:
+            self.entities.pop(entity_id, None)
+        self.entities.update(diff.added)
+        self.entities.update(diff.changed)
+
+        self.timestamp = header.timestamp
+        self._hashes = hashes
+        self._ids_by_hash = ids_by_hash
+        if diff:
+            logger.debug(f"Feed changed: {diff!r}")
+        return diff
+
+    def reset(self) -> None:
+        """Forget the previous feed so the next ``apply`` reports everything as added."""
+        self.__init__()
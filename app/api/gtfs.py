@@ -1,14 +1,27 @@
 import os
+import threading
 import requests
-from google.transit import gtfs_realtime_pb2
 
 METRO_URL = "https://api.opendata.transport.vic.gov.au/opendata/public-transport/gtfs/realtime/v1/metro/vehicle-positions"
+TRAM_ALERTS_URL = "https://api.opendata.transport.vic.gov.au/opendata/public-transport/gtfs/realtime/v1/tram/service-alerts"
 
-def gtfsrequest(url):
+# Tram alerts are diffed between polls; only new or changed alerts are parsed.
+# protobuf is imported on first use so importing this module stays cheap at boot.
+_tram_alerts = None
+_tram_alert_dicts = {}
+_tram_alerts_lock = threading.Lock()
+
+def gtfsrequest_content(url):
+    """ Raw serialised FeedMessage bytes """
     key = os.getenv("OPENDATA_KEY")
-    response = requests.get(url, headers={"KeyID": key})
+    response = requests.get(url, headers={"KeyID": key}, timeout=(3.05, 6))
+    response.raise_for_status()
+    return response.content
+
+def gtfsrequest(url):
+    from google.transit import gtfs_realtime_pb2
     feed = gtfs_realtime_pb2.FeedMessage()
-    feed.ParseFromString(response.content)
+    feed.ParseFromString(gtfsrequest_content(url))
     return feed
 
 def extract_route_number(gtfs_route_id):
@@ -27,60 +40,48 @@ def extract_route_number(gtfs_route_id):
     return last_part.split("-")[-1]
 
 def tram_service_updates(route_numbers):
-    URL = "https://api.opendata.transport.vic.gov.au/opendata/public-transport/gtfs/realtime/v1/tram/service-alerts"
-    feed = gtfsrequest(URL)
-    alerts = []
+    global _tram_alerts
+    content = gtfsrequest_content(TRAM_ALERTS_URL)
+    with _tram_alerts_lock:
+        if _tram_alerts is None:
+            from api.feed_diff import FeedDiffer
+            _tram_alerts = FeedDiffer()
+        diff = _tram_alerts.apply(content)
+        if diff:
+            for entity_id in diff.removed:
+                _tram_alert_dicts.pop(entity_id, None)
+            for entity_id, entity in {**diff.added, **diff.changed}.items():
+                if entity.HasField("alert"):
+                    _tram_alert_dicts[entity_id] = alert_to_dict(entity.alert)
+                else:
+                    _tram_alert_dicts.pop(entity_id, None)
+        current = list(_tram_alert_dicts.values())
+    return filter_alerts(current, route_numbers)
 
-    route_numbers_set = set(str(r) for r in route_numbers)
+def alerts_for_routes(feed, route_numbers):
+    """ Extract alerts affecting any of route_numbers from a service-alerts feed """
+    alerts = [alert_to_dict(entity.alert) for entity in feed.entity if entity.HasField("alert")]
+    return filter_alerts(alerts, route_numbers)
 
-    for entity in feed.entity:
-        if entity.HasField("alert"):
-            alert = entity.alert
-            alert_routes = [extract_route_number(ie.route_id) for ie in alert.informed_entity]
+def alert_to_dict(alert):
+    alert_routes = [extract_route_number(ie.route_id) for ie in alert.informed_entity]
+    header = alert.header_text.translation[0].text if alert.header_text.translation else ""
+    description = alert.description_text.translation[0].text if alert.description_text.translation else ""
+    url = alert.url.translation[0].text if alert.url.translation else ""
+    return {
+        "routes": alert_routes,
+        "header": header,
+        "description": description,
+        "url": url
+    }
 
-            if any(r in route_numbers_set for r in alert_routes):
-                header = alert.header_text.translation[0].text if alert.header_text.translation else ""
-                description = alert.description_text.translation[0].text if alert.description_text.translation else ""
-                url = alert.url.translation[0].text if alert.url.translation else ""
-                alerts.append({
-                    "routes": alert_routes,
-                    "header": header,
-                    "description": description,
-                    "url": url
-                })
-    return alerts
+def filter_alerts(alerts, route_numbers):
+    """ Alerts affecting any of route_numbers """
+    route_numbers_set = set(str(r) for r in route_numbers)
+    return [a for a in alerts if any(r in route_numbers_set for r in a["routes"])]
 
 def fetchVehiclePositons_MetroTrain():
-    """ URL WEB JSON """
-    resourceURL = "https://opendata.transport.vic.gov.au/dataset/2d9a7228-5b81-40d3-8075-ae7a3da42198/resource/e2158e21-e6cb-4611-919f-90117b36a610/download/gtfsr_metro_train_vehicle_positions.openapi.json"
-    try:
-        response = requests.get(resourceURL)
-        response.raise_for_status()  # Raises an error for 4xx or 5xx responses
-        data = response.json()       # Parse response body as JSON
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching JSON: {e}")
-    url = data['servers'][0]['url'] + '/vehicle-positions'
-
-    """ API Request """
-    key = os.getenv("OPENDATA_KEY")
-    print(f'Making request at {url}')
-    response = requests.get(url, headers={"KeyID": key})
-
-    feed = gtfs_realtime_pb2.FeedMessage()
-    feed.ParseFromString(response.content)
-    entities = []
-    for entity in feed.entity:
-        v = entity.vehicle
-        entities.append({
-            'id': entity.id,
-            'lat': v.position.latitude,
-            'lon': v.position.longitude,
-            'bearing': v.position.bearing,
-            'trip_id': v.trip.trip_id,
-            'route_id': v.trip.route_id,
-            'start_time': v.trip.start_time,
-            'start_date': v.trip.start_date,
-            'vehicle_id': v.vehicle.id,
-            'timestamp': v.timestamp
-        })
-    return entities
+    """ Current metro train positions as a list of dicts; see api.vehicle_positions for indexed lookups """
+    from api.vehicle_positions import VehicleSnapshot, discover_feed_url
+    feed = gtfsrequest(discover_feed_url())
+    return VehicleSnapshot.from_feed(feed).to_list()
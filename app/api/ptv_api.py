@@ -1,12 +1,18 @@
-from hashlib import sha1
-import hmac
 from dotenv import load_dotenv
 import os
 import requests
 from datetime import datetime, timezone
 import pytz
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from api.signing import get_signer
+from api.resilience import (
+    ALLOW, PROBE, BreakerRegistry, CircuitBreaker, StaleCache, endpoint_family,
+)
 
 load_dotenv()
 
@@ -14,7 +20,6 @@ logger = logging.getLogger(__name__)
 
 devId = os.getenv("USER_ID")
 key = os.getenv("API_KEY")
-BASE_URL = "https://timetableapi.ptv.vic.gov.au"
 
 train_stop_id = os.getenv("TRAIN_STOP_ID")
 
@@ -26,13 +31,124 @@ except pytz.exceptions.UnknownTimeZoneError as e:
 
 def getUrl(endpoint: str) -> str:
     """Generate a properly signed PTV API URL."""
-    request_str = endpoint + ('&' if '?' in endpoint else '?') + f"devid={devId}"
-    signature = hmac.new(key.encode(), request_str.encode(), sha1).hexdigest()
-    return f"{BASE_URL}{request_str}&signature={signature}"
+    return get_signer().sign(endpoint)
+
+class _InflightRequest:
+    """A request being made on behalf of every caller for one endpoint."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.failed = False
+
+
+_inflight: Dict[str, _InflightRequest] = {}
+_inflight_lock = threading.Lock()
+request_stats = {
+    "requests": 0,         # HTTP requests actually sent
+    "coalesced": 0,        # callers served by another caller's in-flight request
+    "failures": 0,         # requests that timed out, errored or returned 5xx/429
+    "stale_served": 0,     # responses served from the last-known-good cache
+    "short_circuited": 0,  # calls answered without touching the network
+}
+# Latency and outcome of the most recent HTTP requests, for status displays
+last_request: Dict[str, Any] = {
+    "latency_ms": None,       # latest request's round trip
+    "mean_latency_ms": None,  # exponentially weighted mean
+    "ok_at": None,            # epoch seconds of the last success
+    "error": None,            # description of the last failure
+    "error_at": None,         # epoch seconds of the last failure
+}
+LATENCY_ALPHA = 0.2
+
+_breakers = BreakerRegistry(
+    failure_threshold=config.PTV_CIRCUIT_FAILURE_THRESHOLD,
+    base_delay=config.PTV_CIRCUIT_BASE_DELAY,
+    max_delay=config.PTV_CIRCUIT_MAX_DELAY,
+)
+_last_good = StaleCache(config.PTV_STALE_CACHE_SIZE)
+
+def get_request_stats() -> Dict[str, Any]:
+    """Return a snapshot of the request counters and circuit breaker states."""
+    with _inflight_lock:
+        stats = dict(request_stats)
+        stats["last_request"] = dict(last_request)
+    stats["circuits"] = _breakers.states()
+    return stats
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    """Return the circuit breaker shared by every request in ``endpoint``'s family."""
+    return _breakers.for_endpoint(endpoint)
+
+def count_request(stat: str) -> None:
+    """Increment one of the ``request_stats`` counters."""
+    with _inflight_lock:
+        request_stats[stat] += 1
+
+def record_request(endpoint: str,
+                   seconds: float,
+                   result: Optional[Dict[str, Any]],
+                   failed: bool,
+                   breaker: Optional[CircuitBreaker] = None) -> None:
+    """
+    Record the outcome of one HTTP request to the PTV API.
+
+    Updates the latency and last error reported by ``get_request_stats``,
+    the failure count and the endpoint family's circuit breaker, and keeps
+    a successful response as the endpoint's last good one. Every transport
+    (this module and ``api.async_client``) records its requests here.
+
+    Args:
+        endpoint: PTV API endpoint requested
+        seconds: Round trip time
+        result: Parsed response, or None
+        failed: Whether the failure counts against the circuit breaker
+        breaker: The endpoint's breaker, if the caller already has it
+    """
+    breaker = breaker_for(endpoint) if breaker is None else breaker
+    latency_ms = seconds * 1000
+    with _inflight_lock:
+        mean = last_request["mean_latency_ms"]
+        last_request["latency_ms"] = latency_ms
+        last_request["mean_latency_ms"] = latency_ms if mean is None else mean + LATENCY_ALPHA * (latency_ms - mean)
+        if failed:
+            request_stats["failures"] += 1
+            last_request["error"] = f"{endpoint_family(endpoint)} request failed"
+            last_request["error_at"] = time.time()
+        else:
+            last_request["ok_at"] = time.time()
+
+    if failed:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+        if result is not None:
+            _last_good.put(endpoint, result)
+
+def serve_stale(endpoint: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+    """
+    Return the last good response for an endpoint and its age in seconds,
+    or ``(None, None)``; counted in ``stale_served`` when there is one.
+    """
+    result, age = _last_good.get(endpoint)
+    if result is not None:
+        count_request("stale_served")
+        logger.debug(f"Serving {age:.0f}s old response for {endpoint}")
+    return result, age
+
+def stale_cache_size() -> int:
+    """Number of endpoints with a last good response cached."""
+    return len(_last_good)
+
+def clear_stale_cache() -> None:
+    """Forget every last good response, e.g. before a memory measurement."""
+    _last_good.clear()
 
 def send_ptv_request(endpoint: str) -> Optional[Dict[str, Any]]:
     """
     Send a GET request to the PTV API and return the JSON response.
+
+    See ``send_ptv_request_with_age``; this drops the age.
     
     Args:
         endpoint: PTV API endpoint (e.g., "/v3/departures/...")
@@ -40,32 +156,109 @@ def send_ptv_request(endpoint: str) -> Optional[Dict[str, Any]]:
     Returns:
         Parsed JSON response or None on error
     """
+    result, _ = send_ptv_request_with_age(endpoint)
+    return result
+
+def send_ptv_request_with_age(endpoint: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+    """
+    Send a GET request to the PTV API, falling back to the last good response.
+
+    Each endpoint family has a circuit breaker. While it is open, calls
+    return the last good response for the endpoint immediately without
+    touching the network, and once the jittered retry time passes a single
+    probe request runs in the background to revalidate it. A failed request
+    on a closed circuit also falls back to the last good response.
+
+    Concurrent calls for the same endpoint are coalesced: the first caller
+    makes the request and the others wait for it and receive the same
+    parsed result, which callers should treat as read-only.
+
+    Args:
+        endpoint: PTV API endpoint (e.g., "/v3/departures/...")
+
+    Returns:
+        Tuple of (parsed JSON response or None, age in seconds). The age is
+        0 for a fresh response, the time since it was fetched for a stale
+        one, and None when there is no response at all.
+    """
+    breaker = breaker_for(endpoint)
+    decision = breaker.allow()
+
+    if decision == ALLOW:
+        result, failed = _coalesced_request(endpoint, breaker)
+        if result is not None:
+            return result, 0.0
+        if not failed:
+            return None, None
+    elif decision == PROBE:
+        logger.info(f"Probing PTV API for {endpoint_family(endpoint)} in the background")
+        threading.Thread(target=_coalesced_request, args=(endpoint, breaker), daemon=True).start()
+        count_request("short_circuited")
+    else:
+        count_request("short_circuited")
+
+    return serve_stale(endpoint)
+
+def _coalesced_request(endpoint: str, breaker: CircuitBreaker) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Make (or join) the in-flight request for an endpoint and record its outcome."""
+    with _inflight_lock:
+        call = _inflight.get(endpoint)
+        leader = call is None
+        if leader:
+            call = _inflight[endpoint] = _InflightRequest()
+            request_stats["requests"] += 1
+        else:
+            request_stats["coalesced"] += 1
+
+    if not leader:
+        call.done.wait()
+        return call.result, call.failed
+
+    try:
+        start = time.perf_counter()
+        call.result, call.failed = _send_ptv_request(endpoint)
+        record_request(endpoint, time.perf_counter() - start, call.result, call.failed, breaker)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(endpoint, None)
+        call.done.set()
+    return call.result, call.failed
+
+def _send_ptv_request(endpoint: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Make a single signed GET request to the PTV API.
+
+    Returns:
+        Tuple of (parsed JSON response or None, whether the failure should
+        count against the circuit breaker). Client errors such as a 404 for
+        an unknown stop return None without counting as a failure.
+    """
     try:
         url = getUrl(endpoint)
-        response = requests.get(url, timeout=10)
+        response = requests.get(url, timeout=config.PTV_REQUEST_TIMEOUT)
 
         if response.status_code == 200:
             logger.debug(f"PTV API request successful: {endpoint}")
-            return response.json()
+            return response.json(), False
         else:
             logger.error(
                 f"PTV API error {response.status_code}: {response.text} "
                 f"(endpoint: {endpoint})"
             )
-        return None
+        return None, response.status_code >= 500 or response.status_code == 429
 
     except requests.exceptions.Timeout:
         logger.error(f"API request timeout for {endpoint}")
-        return None
+        return None, True
     except requests.exceptions.ConnectionError:
         logger.error(f"Connection error to PTV API for {endpoint}")
-        return None
+        return None, True
     except requests.exceptions.RequestException as e:
         logger.error(f"Request failed for {endpoint}: {str(e)}")
-        return None
+        return None, True
     except ValueError as e:
         logger.error(f"Invalid JSON response from API: {str(e)}")
-        return None
+        return None, True
 
 def get_GTFS_route_id(route_id: str) -> Optional[str]:
     """
@@ -0,0 +1,148 @@
+""" Circuit breaking, backoff and stale response serving for API clients """
+from collections import OrderedDict
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# CircuitBreaker.allow() decisions
+ALLOW = "allow"    # make the request normally
+PROBE = "probe"    # open circuit is due a retry; make one trial request
+REJECT = "reject"  # open circuit; don't touch the network
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with "equal jitter".
+
+    Half of the exponential delay is kept and the other half is randomised,
+    so retries from many displays spread out without ever retrying
+    immediately.
+    """
+    delay = min(cap, base * (2 ** max(attempt - 1, 0)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def endpoint_family(endpoint: str) -> str:
+    """
+    Group endpoints that share a backend, e.g. ``/v3/departures``.
+
+    Breakers are kept per family so a failing pattern service doesn't stop
+    departures from being fetched.
+    """
+    path = endpoint.split("?", 1)[0]
+    return "/".join(path.split("/")[:3])
+
+
+class CircuitBreaker:
+    """
+    Per-family circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests are rejected until a jittered, exponentially growing retry time.
+    One probe request is then let through; success closes the circuit and
+    failure re-opens it with a longer delay.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 3, base_delay: float = 5.0, max_delay: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self, now: Optional[float] = None) -> str:
+        """Return ``ALLOW``, ``PROBE`` or ``REJECT`` for a request at ``now``."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == self.CLOSED:
+                return ALLOW
+            if self.state == self.OPEN and now >= self.retry_at:
+                self.state = self.HALF_OPEN
+                return PROBE
+            return REJECT
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+
+    def record_failure(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.trips += 1
+                self.state = self.OPEN
+                self.retry_at = now + backoff_delay(self.trips, self.base_delay, self.max_delay)
+
+
+class StaleCache:
+    """
+    Bounded LRU of the last good response per endpoint.
+
+    Served while a circuit is open or a request fails, together with its age
+    in seconds.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, endpoint: str, result: Any, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[endpoint] = (now, result)
+            self._entries.move_to_end(endpoint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, endpoint: str, now: Optional[float] = None) -> Tuple[Optional[Any], Optional[float]]:
+        """Return ``(result, age_seconds)``, or ``(None, None)`` if nothing is cached."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(endpoint)
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(endpoint)
+        fetched_at, result = entry
+        return result, max(now - fetched_at, 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BreakerRegistry:
+    """Lazily created ``CircuitBreaker`` per endpoint family."""
+
+    def __init__(self, **breaker_kwargs):
+        self._breaker_kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_endpoint(self, endpoint: str) -> CircuitBreaker:
+        family = endpoint_family(endpoint)
+        with self._lock:
+            breaker = self._breakers.get(family)
+            if breaker is None:
+                breaker = self._breakers[family] = CircuitBreaker(**self._breaker_kwargs)
+            return breaker
+
+    def states(self) -> Dict[str, str]:
+        """Return the state of every known family's breaker."""
+        with self._lock:
+            return {family: b.state for family, b in self._breakers.items()}
@@ -0,0 +1,56 @@
+""" PTV API request signing """
+from hashlib import sha1
+from functools import lru_cache
+import hmac
+import os
+import threading
+from typing import Optional
+
+BASE_URL = "https://timetableapi.ptv.vic.gov.au"
+
+
+class PTVSigner:
+    """
+    Signs PTV API endpoints with the developer ID and key.
+
+    The keyed HMAC-SHA1 state (key padding and inner/outer pads) is set up
+    once and copied per signature, and signed URLs are memoised in a bounded
+    LRU keyed by endpoint, since displays request the same few endpoints
+    over and over.
+    """
+
+    def __init__(self, dev_id: str, key: str, base_url: str = BASE_URL, cache_size: int = 256):
+        self.dev_id = dev_id
+        self.base_url = base_url
+        self._keyed = hmac.new(key.encode(), digestmod=sha1)
+        self.sign = lru_cache(maxsize=cache_size)(self._sign)
+
+    def _sign(self, endpoint: str) -> str:
+        """Generate a properly signed PTV API URL (uncached)."""
+        request_str = endpoint + ('&' if '?' in endpoint else '?') + f"devid={self.dev_id}"
+        mac = self._keyed.copy()
+        mac.update(request_str.encode())
+        return f"{self.base_url}{request_str}&signature={mac.hexdigest()}"
+
+    def cache_info(self):
+        """Return hit/miss statistics for the signed-URL cache."""
+        return self.sign.cache_info()
+
+
+_signer: Optional[PTVSigner] = None
+_signer_lock = threading.Lock()
+
+def get_signer() -> PTVSigner:
+    """
+    Return the process-wide signer for ``USER_ID``/``API_KEY``, created on
+    first use so the environment (and any ``.env``) is read by then.
+
+    Import this module as ``api.signing`` everywhere; loading it under a
+    second name would create a second signer and cache.
+    """
+    global _signer
+    if _signer is None:
+        with _signer_lock:
+            if _signer is None:
+                _signer = PTVSigner(os.getenv("USER_ID"), os.getenv("API_KEY"))
+    return _signer
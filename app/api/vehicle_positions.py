@@ -0,0 +1,243 @@
+""" Metro train vehicle positions: polled GTFS-R snapshot with trip, route and spatial indexes """
+from array import array
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+import config
+from api import gtfs
+from api.feed_diff import FeedDiff, FeedDiffer
+from data.snapshot_cache import get_cache
+from data.spatial import GridIndex
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_URL = "https://opendata.transport.vic.gov.au/dataset/2d9a7228-5b81-40d3-8075-ae7a3da42198/resource/e2158e21-e6cb-4611-919f-90117b36a610/download/gtfsr_metro_train_vehicle_positions.openapi.json"
+DISCOVERY_CACHE_KEY = "vehicle_positions:url"
+
+_discovered: Optional[Tuple[float, str]] = None
+_discovery_lock = threading.Lock()
+
+
+def discover_feed_url(ttl: float = config.VEHICLE_DISCOVERY_TTL) -> str:
+    """
+    Return the metro vehicle-positions feed URL from the OpenAPI discovery
+    document.
+
+    The URL is kept in memory and in the snapshot cache for ``ttl`` seconds,
+    so the discovery JSON is downloaded at most once a day rather than on
+    every poll. Falls back to a stale cached URL, then to ``gtfs.METRO_URL``,
+    if the document can't be fetched.
+    """
+    global _discovered
+    now = time.time()
+    with _discovery_lock:
+        if _discovered and now - _discovered[0] < ttl:
+            return _discovered[1]
+
+        cache = get_cache()
+        cached, fetched_at = cache.get_with_time(DISCOVERY_CACHE_KEY) if cache else (None, None)
+        if cached and now - fetched_at < ttl:
+            _discovered = (fetched_at, cached)
+            return cached
+
+        try:
+            response = requests.get(DISCOVERY_URL, timeout=config.PTV_REQUEST_TIMEOUT)
+            response.raise_for_status()
+            url = response.json()['servers'][0]['url'] + '/vehicle-positions'
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+            url = cached or gtfs.METRO_URL
+            logger.warning(f"Vehicle feed discovery failed ({str(e)}), using {url}")
+            # Retry discovery after a short while rather than a full TTL
+            _discovered = (now - ttl + config.VEHICLE_POLL_INTERVAL * 4, url)
+            return url
+
+        _discovered = (now, url)
+        if cache:
+            cache.put(DISCOVERY_CACHE_KEY, url)
+        return url
+
+
+class VehicleSnapshot:
+    """
+    One vehicle-positions feed, stored column-wise.
+
+    Each vehicle is a row index into parallel arrays; coordinates and
+    timestamps live in typed ``array`` columns rather than one dict per
+    vehicle. Rows are indexed by trip ID, route ID and a lat/lon grid, so
+    "where is this trip" is a dict lookup and nearest vehicle queries only
+    scan nearby grid cells.
+    """
+
+    def __init__(self, cell_degrees: float = config.VEHICLE_GRID_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.feed_timestamp = 0
+
+        self.ids: List[str] = []
+        self.trip_ids: List[str] = []
+        self.route_ids: List[str] = []
+        self.vehicle_ids: List[str] = []
+        self.start_times: List[str] = []
+        self.start_dates: List[str] = []
+        self.spatial = GridIndex(cell_degrees)
+        self.lat = self.spatial.lat
+        self.lon = self.spatial.lon
+        self.bearing = array('f')
+        self.timestamp = array('q')
+
+        self.by_trip: Dict[str, int] = {}
+        self.by_route: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_feed(cls, feed, cell_degrees: float = config.VEHICLE_GRID_DEGREES) -> "VehicleSnapshot":
+        """Build a snapshot from a parsed ``FeedMessage``."""
+        return cls.from_entities(feed.header.timestamp, feed.entity, cell_degrees)
+
+    @classmethod
+    def from_entities(cls, timestamp: int, entities,
+                      cell_degrees: float = config.VEHICLE_GRID_DEGREES) -> "VehicleSnapshot":
+        """Build a snapshot from parsed ``FeedEntity`` objects."""
+        snapshot = cls(cell_degrees)
+        snapshot.feed_timestamp = timestamp
+        for entity in entities:
+            if entity.HasField("vehicle"):
+                snapshot._append(entity.id, entity.vehicle)
+        return snapshot
+
+    def _append(self, entity_id: str, v) -> None:
+        row = len(self.ids)
+        trip_id = v.trip.trip_id
+        route_id = v.trip.route_id
+
+        self.ids.append(entity_id)
+        self.trip_ids.append(trip_id)
+        self.route_ids.append(route_id)
+        self.vehicle_ids.append(v.vehicle.id)
+        self.start_times.append(v.trip.start_time)
+        self.start_dates.append(v.trip.start_date)
+        self.spatial.add(v.position.latitude, v.position.longitude)
+        self.bearing.append(v.position.bearing)
+        self.timestamp.append(v.timestamp)
+
+        if trip_id:
+            self.by_trip[trip_id] = row
+        if route_id:
+            self.by_route.setdefault(route_id, []).append(row)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def vehicle(self, row: int) -> Dict[str, Any]:
+        """Materialise one row as a dict (same keys as the old list-of-dicts API)."""
+        return {
+            'id': self.ids[row],
+            'lat': self.lat[row],
+            'lon': self.lon[row],
+            'bearing': self.bearing[row],
+            'trip_id': self.trip_ids[row],
+            'route_id': self.route_ids[row],
+            'start_time': self.start_times[row],
+            'start_date': self.start_dates[row],
+            'vehicle_id': self.vehicle_ids[row],
+            'timestamp': self.timestamp[row],
+        }
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [self.vehicle(row) for row in range(len(self.ids))]
+
+    def for_trip(self, trip_id: str) -> Optional[Dict[str, Any]]:
+        """Vehicle running a GTFS trip, or None."""
+        row = self.by_trip.get(trip_id)
+        return None if row is None else self.vehicle(row)
+
+    def for_route(self, route_id: str) -> List[Dict[str, Any]]:
+        """Vehicles on a GTFS route."""
+        return [self.vehicle(row) for row in self.by_route.get(route_id, ())]
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_km: Optional[float] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        The ``k`` vehicles closest to a point.
+
+        Args:
+            lat, lon: Query point.
+            k: Number of vehicles to return.
+            max_km: Optional search radius.
+
+        Returns:
+            List of ``(distance_km, vehicle)`` sorted by distance.
+        """
+        return [(d, self.vehicle(row)) for d, row in self.spatial.nearest(lat, lon, k, max_km)]
+
+
+class VehiclePositionService:
+    """
+    Polls the metro vehicle-positions feed in a background thread and keeps
+    the latest ``VehicleSnapshot``.
+
+    Readers just take ``service.snapshot``; each poll builds a new snapshot
+    and swaps it in, so readers never see a half-updated one. Polls are
+    diffed against the previous feed: an unchanged header timestamp keeps
+    the current snapshot, and only new or moved vehicles are re-parsed.
+    """
+
+    def __init__(self, interval: float = config.VEHICLE_POLL_INTERVAL):
+        self.interval = interval
+        self.snapshot = VehicleSnapshot()
+        self.last_poll_ok = False
+        self.last_diff: Optional[FeedDiff] = None
+        self._differ = FeedDiffer()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> bool:
+        """Fetch the feed once and swap in the new snapshot. Returns success."""
+        url = discover_feed_url()
+        try:
+            diff = self._differ.apply(gtfs.gtfsrequest_content(url))
+        except Exception as e:
+            logger.error(f"Vehicle positions request failed: {str(e)}")
+            self.last_poll_ok = False
+            return False
+
+        self.last_poll_ok = True
+        self.last_diff = diff
+        if diff is None:
+            return True  # feed hasn't been regenerated since the last poll
+        if diff or diff.timestamp != self.snapshot.feed_timestamp:
+            self.snapshot = VehicleSnapshot.from_entities(diff.timestamp, self._differ.entities.values())
+            logger.debug(f"Vehicle positions: {len(self.snapshot)} vehicles ({diff!r})")
+        return True
+
+    def start(self) -> None:
+        """Start polling every ``interval`` seconds."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+
+_service: Optional[VehiclePositionService] = None
+_service_lock = threading.Lock()
+
+def get_vehicle_service(start: bool = True) -> VehiclePositionService:
+    """Return the process-wide vehicle position service, starting it on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = VehiclePositionService()
+            if start:
+                _service.start()
+    return _service
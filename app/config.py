@@ -24,6 +24,71 @@ route_type_tram = 1
 route_type_bus = 2
 route_type_vline = 3
 
+# Departure refresh scheduling (seconds)
+REFRESH_MIN_INTERVAL = 10         # tightest poll, used when a realtime departure is imminent
+REFRESH_MAX_INTERVAL = 120        # loosest poll while services are running
+REFRESH_IDLE_INTERVAL = 600       # cap when no services are returned
+REFRESH_OVERNIGHT_INTERVAL = 1800 # cap when no services are returned overnight
+REFRESH_IMMINENT_HORIZON = 180    # next departure within this window counts as imminent
+OVERNIGHT_HOURS = (1, 5)          # local [start, end) hours treated as overnight
+
+# PTV API client resilience
+PTV_REQUEST_TIMEOUT = (3.05, 6)     # (connect, read) seconds
+PTV_CIRCUIT_FAILURE_THRESHOLD = 3   # consecutive failures before a circuit opens
+PTV_CIRCUIT_BASE_DELAY = 5          # seconds before the first retry of an open circuit
+PTV_CIRCUIT_MAX_DELAY = 300         # cap on the jittered exponential retry delay
+PTV_STALE_CACHE_SIZE = 256          # endpoints whose last good response is kept
+
+# Persistent snapshot cache (last-known-good stop data for warm starts)
+CACHE_FILE = Path(os.getenv("PTV_CACHE_FILE", Path(__file__).resolve().parent.parent / "cache" / "snapshots.sqlite3"))
+CACHE_MAX_BYTES = 2 * 1024 * 1024  # total size of cached values
+CACHE_SNAPSHOT_INTERVAL = 60       # minimum seconds between departure snapshot writes per stop
+
+# Fleet mode (several panels in one process)
+FLEET_SHARED_TTL = REFRESH_MIN_INTERVAL  # seconds a shared stop response is reused across panels
+FLEET_MAX_RESULTS = 12                   # unfiltered departures fetched per shared train stop
+
+# Batched departures (several platform/route views of one or more stops)
+BATCH_MAX_RESULTS = 12    # minimum unfiltered departures fetched per stop for a batch
+BATCH_FETCH_WORKERS = 4   # distinct stops fetched concurrently
+
+# Vehicle positions
+VEHICLE_POLL_INTERVAL = 15          # seconds between vehicle-position feed polls
+VEHICLE_DISCOVERY_TTL = 24 * 3600   # seconds the discovered feed URL is reused
+VEHICLE_GRID_DEGREES = 0.01         # spatial index cell size (~1 km)
+STOP_GRID_DEGREES = 0.01            # stop/station spatial index cell size
+PATHWAY_DEFAULT_SECONDS = 60        # walking time for pathways without a traversal_time
+
+# Async client
+ASYNC_MAX_CONCURRENCY = 16  # requests in flight at once from AsyncPTVClient
+
+# Frame pacing
+FRAME_POLL_INTERVAL = 0.05   # seconds between display-state checks while waiting for the next tick
+FRAME_STATS_INTERVAL = 300   # seconds between frame pacing stats log lines
+
+# Control web server
+WEB_SERVER = os.getenv("WEB_SERVER", "production")  # "production" (waitress or pooled wsgiref) or "dev" (Flask debug server)
+WEB_THREADS = 16                # request worker threads
+WEB_CONNECTION_LIMIT = 64       # connections in flight before new ones get a 503
+WEB_REQUEST_TIMEOUT = 30        # seconds an idle or slow client connection is kept
+WEB_ACCESS_LOG_SAMPLE = 0.05    # fraction of successful requests written to the access log
+
+# Live status events (/api/events)
+EVENTS_INTERVAL = 1.0    # seconds between status samples while a client is subscribed
+EVENTS_HEARTBEAT = 15    # seconds of quiet before a keepalive comment is sent
+EVENTS_MAX_SUBSCRIBERS = 4   # open streams (each holds a web worker) before new ones get a 503
+EVENTS_MAX_LIFETIME = 300    # seconds before a stream ends and EventSource reconnects
+
+# Memory profiling (PTV_PROFILE_MEMORY)
+MEMORY_PROFILE_INTERVAL = 600  # seconds between samples in the display loop
+MEMORY_PROFILE_TOP = 15        # allocation sites listed per sample
+MEMORY_TRACE_DEPTH = 1         # tracemalloc frames kept per allocation
+
+# Startup
+STARTUP_SPLASH_BUDGET = 0.5  # target seconds from process start to the first painted frame
+STARTUP_WEB_WAIT = 2.0       # max seconds the web server start waits for the splash
+STARTUP_PROFILE_TOP = 25     # modules listed by the PTV_PROFILE_STARTUP import profile
+
 # Tram Alert Mappings
 tram_alert_mappings = {
     "SpecialEvent": {
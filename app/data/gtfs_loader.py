@@ -1,4 +1,9 @@
 import csv
+import logging
+import re
+from pathlib import Path
+
+logger = logging.getLogger("ptv_display")
 
 def load_route_data(filename):
     routes = []
@@ -22,22 +27,100 @@ def load_route_data(filename):
 
     return routes
 
-def build_colour_map(routes_path):
-    routeinfo = load_route_data(routes_path)
-    colourMap = {}
-    for route in routeinfo:
-        route_id = route['route_id'].split('-0')[1]
-        # Remove bus replacements
-        if '-R' in route_id:
-            continue
-        route_id = route_id.split(':')[0]
-        colourMap[route_id] = "#" + route['color']
-    return colourMap
-
-def build_tram_colour_map(routes_path):
-    routeinfo = load_route_data(routes_path)
-    colourMap = {}
-    for route in routeinfo:
-        route_id = route['short_name']
-        colourMap[route_id] = {'route_col' : "#" + route['color'], 'text_col' : "#" + route['text_color']}
-    return colourMap
\ No newline at end of file
+# e.g. 'aus:vic:vic-02-ALM:' -> mode 02, line ALM; 'aus:vic:vic-03-109:' -> mode 03, line 109
+ROUTE_ID_RE = re.compile(r"vic-0*(?P<mode>\d+)-(?P<line>[^:]+?)(?P<replacement>-R)?:?$")
+
+DEFAULT_ROUTE_STYLE = ((0, 0, 0), (255, 255, 255))
+
+
+def hex_to_rgb(colour_hex):
+    """ 'B5BD00' or '#B5BD00' -> (181, 189, 0) """
+    colour_hex = colour_hex.lstrip("#")
+    return tuple(int(colour_hex[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def route_keys(gtfs_route_id):
+    """
+    Keys a route's style is stored under: the full GTFS route_id and the
+    PTV-style route_gtfs_id (e.g. '2-ALM').
+
+    Returns:
+        (list of keys, whether it's a replacement bus route)
+    """
+    match = ROUTE_ID_RE.search(gtfs_route_id)
+    if not match:
+        return [gtfs_route_id], False
+    short_id = f"{int(match['mode'])}-{match['line']}"
+    replacement = bool(match['replacement'])
+    if replacement:
+        short_id += "-R"
+    return [gtfs_route_id, short_id], replacement
+
+
+class RouteStyles:
+    """
+    Line and text colours for every route, as RGB tuples ready for pygame.
+
+    Built once from the GTFS route tables and shared by all displays, so
+    nothing parses colours while drawing. Routes can be looked up by GTFS
+    route_id, PTV route_gtfs_id (e.g. '2-ALM') or route short name (e.g.
+    '109' for trams).
+    """
+
+    def __init__(self):
+        self._styles = {}
+
+    def add(self, route):
+        try:
+            style = (hex_to_rgb(route['color']), hex_to_rgb(route['text_color']))
+        except ValueError:
+            logger.warning(f"Bad colour for route {route['route_id']}, using default")
+            style = DEFAULT_ROUTE_STYLE
+
+        keys, replacement = route_keys(route['route_id'])
+        for key in keys:
+            self._styles[key] = style
+        # Replacement buses share their line's short name
+        if not replacement and route['short_name']:
+            self._styles.setdefault(route['short_name'], style)
+
+    def __contains__(self, key):
+        return key in self._styles
+
+    def __len__(self):
+        return len(self._styles)
+
+    def get(self, key, default=DEFAULT_ROUTE_STYLE):
+        """ (line colour, text colour) for a route """
+        return self._styles.get(key, default)
+
+    def colour(self, key, default=DEFAULT_ROUTE_STYLE[0]):
+        style = self._styles.get(key)
+        return style[0] if style else default
+
+    def text_colour(self, key, default=DEFAULT_ROUTE_STYLE[1]):
+        style = self._styles.get(key)
+        return style[1] if style else default
+
+
+def load_route_styles(data_dir):
+    """
+    Build the shared route style table from the bundled train and tram
+    GTFS routes.
+
+    Args:
+        data_dir: Path to the ``app/data`` directory.
+
+    Returns:
+        ``RouteStyles``; empty if the route files can't be read.
+    """
+    data_dir = Path(data_dir)
+    styles = RouteStyles()
+    for routes_path in (data_dir / "gtfs_static" / "routes.txt", data_dir / "gtfs_static" / "tram" / "routes.txt"):
+        try:
+            for route in load_route_data(str(routes_path)):
+                styles.add(route)
+        except Exception as e:
+            logger.error(f"Failed to load route colours from {routes_path}: {str(e)}")
+    logger.info(f"Loaded route styles: {len(styles)} keys")
+    return styles
@@ -0,0 +1,216 @@
+""" Station interchange graph from static GTFS pathways and transfers """
+from array import array
+import csv
+import heapq
+import logging
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from data.service_calendar import get_service_calendar
+from data.stop_patterns import run_ref_from_trip
+
+logger = logging.getLogger("ptv_display")
+
+GTFS_DIR = Path(__file__).resolve().parent / "gtfs_static"
+
+
+class InterchangeGraph:
+    """
+    Walking graph over stops, platforms and entrances, plus the timed
+    trip-to-trip connections from ``transfers.txt``.
+
+    Edges are stored CSR-style: node ``n``'s edges are
+    ``targets[offsets[n]:offsets[n + 1]]`` with traversal times in seconds in
+    the matching slice of ``weights``, all in ``array`` columns. Walking
+    times between two stops are found with Dijkstra and memoised, and every
+    (from_trip, to_trip) connection is resolved once at load time, so
+    displays only do dict lookups.
+    """
+
+    def __init__(self):
+        self.node_ids: List[str] = []
+        self.nodes: Dict[str, int] = {}
+        self.offsets = array('I', [0])
+        self.targets = array('I')
+        self.weights = array('I')
+        self.connections: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.connections_by_trip: Dict[str, List[Tuple[str, str]]] = {}
+        self.connections_by_run: Dict[str, List[Tuple[str, str]]] = {}
+        self._walk_cache: Dict[Tuple[int, int], Optional[int]] = {}
+
+    def _node(self, stop_id: str) -> int:
+        node = self.nodes.get(stop_id)
+        if node is None:
+            node = self.nodes[stop_id] = len(self.node_ids)
+            self.node_ids.append(stop_id)
+        return node
+
+    @classmethod
+    def load(cls, gtfs_dir: Path = GTFS_DIR) -> "InterchangeGraph":
+        """Build the graph from ``pathways.txt`` and ``transfers.txt``."""
+        graph = cls()
+        edges: List[Tuple[int, int, int]] = []
+
+        with open(gtfs_dir / "pathways.txt", "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                a, b = graph._node(row["from_stop_id"]), graph._node(row["to_stop_id"])
+                seconds = int(row["traversal_time"] or config.PATHWAY_DEFAULT_SECONDS)
+                edges.append((a, b, seconds))
+                if row["is_bidirectional"] == "1":
+                    edges.append((b, a, seconds))
+
+        transfers = []
+        with open(gtfs_dir / "transfers.txt", "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                transfers.append(row)
+                # Stop-to-stop transfers with a time are walkable edges too
+                if (row["from_stop_id"] != row["to_stop_id"] and row["min_transfer_time"]
+                        and not row["from_trip_id"]):
+                    a, b = graph._node(row["from_stop_id"]), graph._node(row["to_stop_id"])
+                    edges.append((a, b, int(row["min_transfer_time"])))
+
+        graph._build_csr(edges)
+        for row in transfers:
+            if row["from_trip_id"] and row["to_trip_id"]:
+                graph._add_connection(row)
+
+        logger.info(
+            f"Loaded interchange graph: {len(graph.node_ids)} nodes, "
+            f"{len(graph.targets)} edges, {len(graph.connections)} connections"
+        )
+        return graph
+
+    def _build_csr(self, edges: List[Tuple[int, int, int]]) -> None:
+        edges.sort()
+        counts = [0] * len(self.node_ids)
+        for source, _, _ in edges:
+            counts[source] += 1
+        offsets = array('I', [0])
+        for count in counts:
+            offsets.append(offsets[-1] + count)
+        self.offsets = offsets
+        self.targets = array('I', (target for _, target, _ in edges))
+        self.weights = array('I', (weight for _, _, weight in edges))
+
+    def _add_connection(self, row: Dict[str, str]) -> None:
+        from_trip, to_trip = row["from_trip_id"], row["to_trip_id"]
+        from_stop, to_stop = row["from_stop_id"], row["to_stop_id"]
+        if row["min_transfer_time"]:
+            seconds = int(row["min_transfer_time"])
+        elif from_stop == to_stop:
+            seconds = 0
+        else:
+            seconds = self.walk_seconds(from_stop, to_stop)
+
+        key = (from_trip, to_trip)
+        self.connections[key] = {
+            "from_trip_id": from_trip,
+            "to_trip_id": to_trip,
+            "from_stop_id": from_stop,
+            "to_stop_id": to_stop,
+            "to_route_id": row["to_route_id"],
+            "transfer_type": int(row["transfer_type"] or 0),
+            "seconds": seconds,
+        }
+        self.connections_by_trip.setdefault(from_trip, []).append(key)
+        self.connections_by_run.setdefault(run_ref_from_trip(from_trip), []).append(key)
+
+    def walk_seconds(self, from_stop: str, to_stop: str) -> Optional[int]:
+        """
+        Shortest walking time in seconds between two stops (e.g. platforms),
+        or None if they aren't connected.
+        """
+        source, target = self.nodes.get(from_stop), self.nodes.get(to_stop)
+        if source is None or target is None:
+            return None
+        key = (source, target)
+        if key not in self._walk_cache:
+            self._walk_cache[key] = self._dijkstra(source, target)
+        return self._walk_cache[key]
+
+    def walk_minutes(self, from_stop: str, to_stop: str) -> Optional[int]:
+        """``walk_seconds`` rounded up to whole minutes, for display."""
+        seconds = self.walk_seconds(from_stop, to_stop)
+        return None if seconds is None else -(-seconds // 60)
+
+    def _dijkstra(self, source: int, target: int) -> Optional[int]:
+        if source == target:
+            return 0
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        best = {source: 0}
+        heap = [(0, source)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if node == target:
+                return cost
+            if cost > best.get(node, cost):
+                continue
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = targets[edge]
+                new_cost = cost + weights[edge]
+                if new_cost < best.get(neighbour, new_cost + 1):
+                    best[neighbour] = new_cost
+                    heapq.heappush(heap, (new_cost, neighbour))
+        return None
+
+    def connection(self, from_trip: str, to_trip: str) -> Optional[Dict[str, Any]]:
+        """The timed connection between two trips, or None."""
+        return self.connections.get((from_trip, to_trip))
+
+    def connections_from(self, trip_id: str) -> List[Dict[str, Any]]:
+        """Timed connections out of a trip."""
+        return [self.connections[key] for key in self.connections_by_trip.get(trip_id, ())]
+
+    def connections_for_run(self, run_ref, days: Optional[List[date]] = None) -> List[Dict[str, Any]]:
+        """
+        Timed connections out of the trip a PTV run is operating as.
+
+        Run numbers repeat across the week's timetables, so a run number
+        alone can match many trips. As in ``StopPatternGraph.trip_for_run``,
+        the trip whose service runs on the first of ``days`` is used, and
+        the first candidate if no calendar or days are available. Unlike
+        ``trip_for_run``, if none of the candidates runs on ``days`` there
+        are no connections: another day's trip would connect at the wrong
+        times, where a stopping pattern is still a useful guess.
+
+        Args:
+            run_ref: PTV ``run_ref`` (train run number).
+            days: Service days to match, most likely first (see
+                ``ServiceCalendar.service_days``).
+        """
+        candidates = list(dict.fromkeys(from_trip for from_trip, _ in self.connections_by_run.get(str(run_ref), ())))
+        if not candidates:
+            return []
+        trip_id = candidates[0]
+        if days and len(candidates) > 1:
+            calendar = get_service_calendar()
+            if calendar is not None:
+                trip_id = next(
+                    (t for day in days for t in candidates if calendar.trip_active(t, day)),
+                    None,
+                )
+                if trip_id is None:
+                    return []  # none of this run's trips operate on those days
+        return self.connections_from(trip_id)
+
+
+_graph: Optional[InterchangeGraph] = None
+_graph_failed = False
+_graph_lock = threading.Lock()
+
+def get_interchange_graph() -> Optional[InterchangeGraph]:
+    """Return the process-wide interchange graph, loading it on first use (None if unavailable)."""
+    global _graph, _graph_failed
+    if _graph is not None or _graph_failed:
+        return _graph
+    with _graph_lock:
+        if _graph is None and not _graph_failed:
+            try:
+                _graph = InterchangeGraph.load()
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Interchange graph unavailable: {str(e)}")
+                _graph_failed = True
+    return _graph
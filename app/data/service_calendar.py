@@ -0,0 +1,201 @@
+""" Which static GTFS services and trips run on a given day """
+import csv
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger("ptv_display")
+
+DATA_DIR = Path(__file__).resolve().parent
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def _parse_date(value: str) -> date:
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+class ServiceCalendar:
+    """
+    Service activity from ``calendar.txt`` and ``calendar_dates.txt``.
+
+    Each ``service_id`` gets a bit number and every day of the feed's
+    validity window is precomputed as an int bitset of the services running
+    that day, so ``active_services`` is a dict lookup. Trips are numbered by
+    their row in ``trips.txt`` and each service has a big-int mask of its
+    trips; the trips running on a day are the OR of the masks of that day's
+    services, without a per-trip Python check.
+    """
+
+    def __init__(self):
+        self.service_ids: List[str] = []
+        self.service_bits: Dict[str, int] = {}
+        self.days: Dict[date, int] = {}
+        self.start: Optional[date] = None
+        self.end: Optional[date] = None
+
+        self.trip_ids: List[str] = []
+        self.trip_rows: Dict[str, int] = {}
+        self.trip_service_bit: List[int] = []
+        self.service_trip_masks: List[int] = []
+        self._trip_masks: Dict[date, int] = {}
+        self._services: Dict[date, FrozenSet[str]] = {}
+
+    def _bit(self, service_id: str) -> int:
+        bit = self.service_bits.get(service_id)
+        if bit is None:
+            bit = self.service_bits[service_id] = len(self.service_ids)
+            self.service_ids.append(service_id)
+            self.service_trip_masks.append(0)
+        return bit
+
+    @classmethod
+    def load(cls, data_dir: Path = DATA_DIR) -> "ServiceCalendar":
+        """Build the calendar from the bundled GTFS files."""
+        cal = cls()
+        gtfs_dir = data_dir / "gtfs_static"
+
+        weekly = []
+        with open(gtfs_dir / "calendar.txt", "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                start, end = _parse_date(row["start_date"]), _parse_date(row["end_date"])
+                weekdays = [row[day] == "1" for day in WEEKDAYS]
+                weekly.append((cal._bit(row["service_id"]), start, end, weekdays))
+                cal._extend(start, end)
+
+        exceptions = []
+        with open(gtfs_dir / "calendar_dates.txt", "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                day = _parse_date(row["date"])
+                exceptions.append((cal._bit(row["service_id"]), day, row["exception_type"] == "1"))
+                cal._extend(day, day)
+
+        if cal.start is not None:
+            day = cal.start
+            while day <= cal.end:
+                cal.days[day] = 0
+                day += timedelta(days=1)
+
+        for bit, start, end, weekdays in weekly:
+            mask = 1 << bit
+            day = start
+            while day <= end:
+                if weekdays[day.weekday()]:
+                    cal.days[day] |= mask
+                day += timedelta(days=1)
+
+        for bit, day, added in exceptions:
+            if added:
+                cal.days[day] |= 1 << bit
+            else:
+                cal.days[day] &= ~(1 << bit)
+
+        cal._load_trips(data_dir / "trips.txt")
+        logger.info(
+            f"Loaded service calendar: {len(cal.service_ids)} services, "
+            f"{len(cal.trip_ids)} trips, {cal.start} to {cal.end}"
+        )
+        return cal
+
+    def _extend(self, start: date, end: date) -> None:
+        self.start = start if self.start is None else min(self.start, start)
+        self.end = end if self.end is None else max(self.end, end)
+
+    def _load_trips(self, trips_file: Path) -> None:
+        # Build each service's trip mask from per-service row lists, then
+        # convert each list to an int in one pass
+        rows_by_bit: Dict[int, List[int]] = {}
+        with open(trips_file, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                bit = self._bit(row["service_id"])
+                trip_row = len(self.trip_ids)
+                self.trip_ids.append(row["trip_id"])
+                self.trip_rows[row["trip_id"]] = trip_row
+                self.trip_service_bit.append(bit)
+                rows_by_bit.setdefault(bit, []).append(trip_row)
+
+        size = len(self.trip_ids)
+        for bit, rows in rows_by_bit.items():
+            mask = bytearray((size + 7) // 8)
+            for trip_row in rows:
+                mask[trip_row >> 3] |= 1 << (trip_row & 7)
+            self.service_trip_masks[bit] = int.from_bytes(mask, "little")
+
+    def service_mask(self, day: date) -> int:
+        """Bitset of services running on ``day`` (0 outside the feed window)."""
+        return self.days.get(day, 0)
+
+    def active_services(self, day: date) -> FrozenSet[str]:
+        """``service_id``s running on ``day``."""
+        services = self._services.get(day)
+        if services is None:
+            mask = self.service_mask(day)
+            services = frozenset(s for bit, s in enumerate(self.service_ids) if mask >> bit & 1)
+            self._services[day] = services
+        return services
+
+    def is_active(self, service_id: str, day: date) -> bool:
+        bit = self.service_bits.get(service_id)
+        return bit is not None and bool(self.service_mask(day) >> bit & 1)
+
+    def active_trip_mask(self, day: date) -> int:
+        """Bitset over ``trips.txt`` rows of the trips running on ``day``."""
+        mask = self._trip_masks.get(day)
+        if mask is None:
+            services = self.service_mask(day)
+            mask = 0
+            for bit, trip_mask in enumerate(self.service_trip_masks):
+                if services >> bit & 1:
+                    mask |= trip_mask
+            self._trip_masks = {day: mask}  # only the current day is worth keeping
+        return mask
+
+    def active_trips(self, day: date) -> List[str]:
+        """Trip IDs running on ``day``."""
+        mask = self.active_trip_mask(day)
+        trip_ids = self.trip_ids
+        data = mask.to_bytes((len(trip_ids) + 7) // 8, "little")
+        return [
+            trip_ids[(i << 3) + b]
+            for i, byte in enumerate(data) if byte
+            for b in range(8) if byte >> b & 1
+        ]
+
+    def trip_active(self, trip_id: str, day: date) -> bool:
+        """Whether a trip runs on ``day``; O(1) via its service bit."""
+        row = self.trip_rows.get(trip_id)
+        if row is None:
+            return False
+        return bool(self.service_mask(day) >> self.trip_service_bit[row] & 1)
+
+    @staticmethod
+    def service_days(now: datetime) -> List[date]:
+        """
+        GTFS service days a trip running at ``now`` (local time) may belong
+        to: today, and before 4am also yesterday, since trips after midnight
+        run on the previous day's service.
+        """
+        today = now.date()
+        if now.hour < 4:
+            return [today, today - timedelta(days=1)]
+        return [today]
+
+
+_calendar: Optional[ServiceCalendar] = None
+_calendar_failed = False
+_calendar_lock = threading.Lock()
+
+def get_service_calendar() -> Optional[ServiceCalendar]:
+    """Return the process-wide service calendar, loading it on first use (None if unavailable)."""
+    global _calendar, _calendar_failed
+    if _calendar is not None or _calendar_failed:
+        return _calendar
+    with _calendar_lock:
+        if _calendar is None and not _calendar_failed:
+            try:
+                _calendar = ServiceCalendar.load()
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Service calendar unavailable: {str(e)}")
+                _calendar_failed = True
+    return _calendar
@@ -0,0 +1,122 @@
+""" Persistent cache of last-known-good stop data for fast warm starts """
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+import config
+
+logger = logging.getLogger("ptv_display")
+
+
+class SnapshotCache:
+    """
+    Small SQLite key/value store for resolved stops, departure snapshots and
+    PID stop listings.
+
+    Values are JSON. Each write is a single transaction, so a power cut
+    leaves either the old or the new value, never a torn one. When the
+    stored values exceed ``max_bytes`` the least recently written entries
+    are evicted.
+    """
+
+    def __init__(self, path=config.CACHE_FILE, max_bytes: int = config.CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key``, or None."""
+        value, _ = self.get_with_time(key)
+        return value
+
+    def get_with_time(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """Return ``(value, updated_at)`` for ``key``, or ``(None, None)``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, updated_at FROM snapshots WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        try:
+            return json.loads(row[0]), row[1]
+        except ValueError:
+            logger.warning(f"Discarding corrupt cache entry {key}")
+            self.delete(key)
+            return None, None
+
+    def put(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key`` and enforce the size cap."""
+        data = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (key, value, size, updated_at) VALUES (?, ?, ?, ?)",
+                    (key, data, len(data), time.time()),
+                )
+                self._evict()
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:  # BEGIN itself may have failed, e.g. locked by another process
+                    self._conn.execute("ROLLBACK")
+                logger.error(f"Failed to write cache entry {key}: {str(e)}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM snapshots WHERE key = ?", (key,))
+
+    def _evict(self) -> None:
+        """Delete the oldest entries until the total size fits (caller holds the lock)."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM snapshots").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM snapshots ORDER BY updated_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM snapshots WHERE key = ?", (key,))
+            total -= size
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[SnapshotCache] = None
+_cache_lock = threading.Lock()
+_cache_failed = False
+
+def get_cache() -> Optional[SnapshotCache]:
+    """
+    Return the process-wide cache, opening it on first use.
+
+    Returns None (once logged) if the cache file can't be opened, e.g. on a
+    read-only filesystem, in which case callers just skip caching.
+    """
+    global _cache, _cache_failed
+    if _cache is not None or _cache_failed:
+        return _cache
+    with _cache_lock:
+        if _cache is None and not _cache_failed:
+            try:
+                _cache = SnapshotCache()
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Snapshot cache unavailable: {str(e)}")
+                _cache_failed = True
+    return _cache
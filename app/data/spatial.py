@@ -0,0 +1,127 @@
+""" Uniform lat/lon grid index for nearest-k and radius queries """
+from array import array
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+KM_PER_DEGREE = 111.32
+
+
+class GridIndex:
+    """
+    Points bucketed into square lat/lon cells.
+
+    Coordinates are kept in ``array`` columns indexed by row number, and
+    each cell lists the rows inside it. Queries scan cells in square rings
+    around the query point and stop as soon as no unscanned cell can hold a
+    closer point, so they touch a handful of cells rather than every point.
+    Distances are equirectangular, which is accurate to well under 1% at
+    city scale.
+    """
+
+    def __init__(self, cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self.lat = array('d')
+        self.lon = array('d')
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def add(self, lat: float, lon: float) -> int:
+        """Add a point and return its row number."""
+        row = len(self.lat)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        i, j = key = self.cell(lat, lon)
+        self.cells.setdefault(key, []).append(row)
+        if self._bounds is None:
+            self._bounds = (i, i, j, j)
+        else:
+            lo_i, hi_i, lo_j, hi_j = self._bounds
+            self._bounds = (min(lo_i, i), max(hi_i, i), min(lo_j, j), max(hi_j, j))
+        return row
+
+    def distance_km(self, row: int, lat: float, lon: float) -> float:
+        dlat = self.lat[row] - lat
+        dlon = (self.lon[row] - lon) * math.cos(math.radians(lat))
+        return KM_PER_DEGREE * math.hypot(dlat, dlon)
+
+    def _cell_km(self, lat: float) -> float:
+        """Smallest ground distance spanned by one cell at ``lat``."""
+        return self.cell_degrees * KM_PER_DEGREE * min(1.0, math.cos(math.radians(lat)))
+
+    def _max_ring(self, ci: int, cj: int) -> int:
+        lo_i, hi_i, lo_j, hi_j = self._bounds
+        return max(abs(ci - lo_i), abs(ci - hi_i), abs(cj - lo_j), abs(cj - hi_j))
+
+    def _ring(self, ci: int, cj: int, ring: int) -> Iterable[int]:
+        """Rows in the cells exactly ``ring`` cells from ``(ci, cj)``."""
+        cells = self.cells
+        for i in range(ci - ring, ci + ring + 1):
+            if abs(i - ci) == ring:
+                columns = range(cj - ring, cj + ring + 1)
+            else:
+                columns = (cj - ring, cj + ring) if ring else (cj,)
+            for j in columns:
+                yield from cells.get((i, j), ())
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_km: Optional[float] = None) -> List[Tuple[float, int]]:
+        """
+        The ``k`` rows closest to a point.
+
+        Returns:
+            List of ``(distance_km, row)`` sorted by distance.
+        """
+        if not self.cells or k <= 0:
+            return []
+
+        ci, cj = self.cell(lat, lon)
+        cell_km = self._cell_km(lat)
+        max_ring = self._max_ring(ci, cj)
+        if max_km is not None:
+            max_ring = min(max_ring, int(max_km / cell_km) + 1)
+
+        found: List[Tuple[float, int]] = []
+        for ring in range(max_ring + 1):
+            found.extend((self.distance_km(row, lat, lon), row) for row in self._ring(ci, cj, ring))
+            if len(found) >= k:
+                found.sort()
+                # Anything outside this ring is at least ``ring`` cells away
+                if found[k - 1][0] <= ring * cell_km:
+                    break
+
+        found.sort()
+        if max_km is not None:
+            found = [f for f in found if f[0] <= max_km]
+        return found[:k]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, int]]:
+        """All rows within ``radius_km`` of a point, as ``(distance_km, row)`` sorted by distance."""
+        if not self.cells:
+            return []
+        ci, cj = self.cell(lat, lon)
+        max_ring = min(self._max_ring(ci, cj), int(radius_km / self._cell_km(lat)) + 1)
+
+        found = []
+        for ring in range(max_ring + 1):
+            for row in self._ring(ci, cj, ring):
+                distance = self.distance_km(row, lat, lon)
+                if distance <= radius_km:
+                    found.append((distance, row))
+        found.sort()
+        return found
+
+    def nearest_many(self, points: Iterable[Tuple[float, float]], k: int = 1,
+                     max_km: Optional[float] = None) -> List[List[Tuple[float, int]]]:
+        """``nearest`` for each ``(lat, lon)`` in ``points``."""
+        return [self.nearest(lat, lon, k, max_km) for lat, lon in points]
+
+    def within_many(self, points: Iterable[Tuple[float, float]],
+                    radius_km: float) -> List[List[Tuple[float, int]]]:
+        """``within`` for each ``(lat, lon)`` in ``points``."""
+        return [self.within(lat, lon, radius_km) for lat, lon in points]
@@ -0,0 +1,211 @@
+""" Spatial index over the static GTFS train stops """
+import csv
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import config
+from data.spatial import GridIndex
+
+logger = logging.getLogger("ptv_display")
+
+STOPS_FILE = Path(__file__).resolve().parent / "gtfs_static" / "stops.txt"
+COMPILED_FILE = config.CACHE_FILE.parent / "stop_index.json"
+COMPILED_VERSION = 1
+
+
+class StopIndex:
+    """
+    Stations and platforms from ``stops.txt`` with nearest-k and radius
+    queries.
+
+    Platforms (rows with a ``parent_station``) are grouped into stations,
+    each placed at the mean of its platforms. Both levels get a
+    ``GridIndex``, so "stations near here" and "platforms near here" are
+    cheap. The parsed columns are written as JSON next to the snapshot cache
+    and reused until ``stops.txt`` changes.
+    """
+
+    def __init__(self, cell_degrees: float = config.STOP_GRID_DEGREES):
+        # Platform (stop) level, one row per stops.txt entry with coordinates
+        self.stop_ids: List[str] = []
+        self.stop_names: List[str] = []
+        self.parents: List[str] = []
+        self.platform_codes: List[str] = []
+        self.stops = GridIndex(cell_degrees)
+
+        # Station level
+        self.station_ids: List[str] = []
+        self.station_names: List[str] = []
+        self.station_platforms: List[List[str]] = []
+        self.stations = GridIndex(cell_degrees)
+        self.station_rows: Dict[str, int] = {}
+        self.stations_by_name: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, stops_file: Path = STOPS_FILE, compiled: Path = COMPILED_FILE) -> "StopIndex":
+        """Load the index from the compiled file, rebuilding it if ``stops.txt`` is newer."""
+        mtime = Path(stops_file).stat().st_mtime
+        rows = cls._load_compiled(compiled, mtime)
+        if rows is None:
+            rows = cls._read_stops(stops_file)
+            cls._save_compiled(compiled, mtime, rows)
+
+        index = cls()
+        for row in rows:
+            index._add(*row)
+        index._build_stations()
+        logger.info(f"Indexed {len(index.station_ids)} stations, {len(index.stop_ids)} platforms")
+        return index
+
+    @staticmethod
+    def _read_stops(stops_file: Path) -> List[Tuple[str, str, str, str, float, float]]:
+        rows = []
+        with open(stops_file, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    lat, lon = float(row["stop_lat"]), float(row["stop_lon"])
+                except (TypeError, ValueError):
+                    continue
+                rows.append((
+                    row["stop_id"],
+                    row["stop_name"],
+                    row["parent_station"] or row["stop_id"],
+                    row["platform_code"],
+                    lat,
+                    lon,
+                ))
+        return rows
+
+    @staticmethod
+    def _load_compiled(path: Path, mtime: float) -> Optional[List[tuple]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != COMPILED_VERSION or data.get("mtime") != mtime:
+            return None
+        return data["rows"]
+
+    @staticmethod
+    def _save_compiled(path: Path, mtime: float, rows: List[tuple]) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": COMPILED_VERSION, "mtime": mtime, "rows": rows}, f, separators=(",", ":"))
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning(f"Could not save compiled stop index: {str(e)}")
+
+    def _add(self, stop_id: str, name: str, parent: str, platform_code: str, lat: float, lon: float) -> None:
+        self.stop_ids.append(stop_id)
+        self.stop_names.append(name)
+        self.parents.append(parent)
+        self.platform_codes.append(platform_code)
+        self.stops.add(lat, lon)
+
+    def _build_stations(self) -> None:
+        members: Dict[str, List[int]] = {}
+        for row, parent in enumerate(self.parents):
+            members.setdefault(parent, []).append(row)
+
+        for parent, rows in members.items():
+            station = len(self.station_ids)
+            name = self.stop_names[rows[0]]
+            self.station_ids.append(parent)
+            self.station_names.append(name)
+            self.station_platforms.append(sorted(
+                {self.platform_codes[r] for r in rows if self.platform_codes[r]},
+                key=lambda code: (len(code), code),
+            ))
+            self.stations.add(
+                sum(self.stops.lat[r] for r in rows) / len(rows),
+                sum(self.stops.lon[r] for r in rows) / len(rows),
+            )
+            self.station_rows[parent] = station
+            self.stations_by_name.setdefault(self.normalise(name), station)
+
+    @staticmethod
+    def normalise(name: str) -> str:
+        return name.lower().replace(" station", "").strip()
+
+    def station(self, row: int, distance_km: Optional[float] = None) -> Dict[str, Any]:
+        """Materialise a station row as a dict."""
+        station = {
+            "station_id": self.station_ids[row],
+            "stop_name": self.station_names[row],
+            "lat": self.stations.lat[row],
+            "lon": self.stations.lon[row],
+            "platforms": self.station_platforms[row],
+        }
+        if distance_km is not None:
+            station["distance_km"] = round(distance_km, 3)
+        return station
+
+    def platform(self, row: int, distance_km: Optional[float] = None) -> Dict[str, Any]:
+        """Materialise a platform row as a dict."""
+        platform = {
+            "stop_id": self.stop_ids[row],
+            "stop_name": self.stop_names[row],
+            "station_id": self.parents[row],
+            "platform_code": self.platform_codes[row],
+            "lat": self.stops.lat[row],
+            "lon": self.stops.lon[row],
+        }
+        if distance_km is not None:
+            platform["distance_km"] = round(distance_km, 3)
+        return platform
+
+    def nearest_stations(self, lat: float, lon: float, k: int = 5,
+                         max_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The ``k`` stations closest to a point, nearest first."""
+        return [self.station(row, d) for d, row in self.stations.nearest(lat, lon, k, max_km)]
+
+    def stations_within(self, lat: float, lon: float, radius_km: float) -> List[Dict[str, Any]]:
+        """All stations within ``radius_km`` of a point, nearest first."""
+        return [self.station(row, d) for d, row in self.stations.within(lat, lon, radius_km)]
+
+    def nearest_platforms(self, lat: float, lon: float, k: int = 5,
+                          max_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The ``k`` platforms closest to a point, nearest first."""
+        return [self.platform(row, d) for d, row in self.stops.nearest(lat, lon, k, max_km)]
+
+    def nearest_stations_many(self, points: Iterable[Tuple[float, float]], k: int = 5,
+                              max_km: Optional[float] = None) -> List[List[Dict[str, Any]]]:
+        """``nearest_stations`` for each ``(lat, lon)`` in ``points``."""
+        return [[self.station(row, d) for d, row in found]
+                for found in self.stations.nearest_many(points, k, max_km)]
+
+    def stations_within_many(self, points: Iterable[Tuple[float, float]],
+                             radius_km: float) -> List[List[Dict[str, Any]]]:
+        """``stations_within`` for each ``(lat, lon)`` in ``points``."""
+        return [[self.station(row, d) for d, row in found]
+                for found in self.stations.within_many(points, radius_km)]
+
+    def platforms_for(self, stop_name: str) -> Optional[List[str]]:
+        """Platform codes at a station, by name, or None if the station is unknown."""
+        row = self.stations_by_name.get(self.normalise(stop_name))
+        return None if row is None else self.station_platforms[row]
+
+
+_index: Optional[StopIndex] = None
+_index_failed = False
+_index_lock = threading.Lock()
+
+def get_stop_index() -> Optional[StopIndex]:
+    """Return the process-wide stop index, loading it on first use (None if unavailable)."""
+    global _index, _index_failed
+    if _index is not None or _index_failed:
+        return _index
+    with _index_lock:
+        if _index is None and not _index_failed:
+            try:
+                _index = StopIndex.load()
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Stop index unavailable: {str(e)}")
+                _index_failed = True
+    return _index
@@ -0,0 +1,290 @@
+""" Stop patterns precomputed from static GTFS, for PID stop lists without the pattern API """
+import csv
+import json
+import logging
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from data.service_calendar import get_service_calendar
+
+logger = logging.getLogger("ptv_display")
+
+DATA_DIR = Path(__file__).resolve().parent
+COMPILED_FILE = config.CACHE_FILE.parent / "stop_patterns.json"
+COMPILED_VERSION = 1
+
+
+def route_code(gtfs_route_id: str) -> str:
+    """
+    PTV-style GTFS route code from a GTFS route_id.
+
+    Example: 'aus:vic:vic-02-ALM:' -> '2-ALM'
+    """
+    parts = gtfs_route_id.split(":")
+    code = parts[-2] if len(parts) >= 3 else gtfs_route_id
+    if code.startswith("vic-"):
+        code = code[4:]
+    return code.lstrip("0")
+
+
+def run_ref_from_trip(trip_id: str) -> str:
+    """
+    Train run number from a metro GTFS trip ID, matching PTV's ``run_ref``.
+
+    Example: '02-ALM--1-T2-2302' -> '2302'
+    """
+    return trip_id.rsplit("-", 1)[-1]
+
+
+def _is_subsequence(short: Tuple[str, ...], long: Tuple[str, ...]) -> bool:
+    it = iter(long)
+    return all(stop in it for stop in short)
+
+
+class StopPatternGraph:
+    """
+    Per-line stop sequences built from ``trips.txt`` and ``stop_times.txt``.
+
+    Every distinct stopping sequence (by parent station) is stored once and
+    trips point at it. An express run's skipped stops are the stations of
+    the longest sequence on the same line and direction that contains the
+    run's stops, between its first and last stop, that the run doesn't stop
+    at. Derived PID lists are memoised per sequence.
+
+    Building from CSV is slow on a Pi, so the compiled graph is written as
+    JSON next to the snapshot cache and reused until the source files change.
+    """
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+        self.patterns: List[Tuple[str, ...]] = []
+        self.lines: Dict[Tuple[str, str], List[int]] = {}
+        self.trips: Dict[str, Tuple[int, str, str]] = {}  # trip_id -> (pattern, route code, direction)
+        self.trips_by_run: Dict[str, List[str]] = {}
+        self._pid_stops: Dict[int, List[Dict[str, Any]]] = {}
+
+    @staticmethod
+    def source_files(data_dir: Path = DATA_DIR) -> Dict[str, Path]:
+        """Locations of the static GTFS inputs."""
+        stop_times = data_dir / "stop_times.txt"
+        if not stop_times.exists():
+            stop_times = data_dir / "gtfs_static" / "stop_times.txt"
+        return {
+            "trips": data_dir / "trips.txt",
+            "stop_times": stop_times,
+            "stops": data_dir / "gtfs_static" / "stops.txt",
+        }
+
+    @classmethod
+    def load(cls, data_dir: Path = DATA_DIR, compiled: Path = COMPILED_FILE) -> Optional["StopPatternGraph"]:
+        """
+        Load the compiled graph, rebuilding it if the GTFS files are newer.
+
+        Returns:
+            The graph, or None if ``stop_times.txt`` isn't available.
+        """
+        sources = cls.source_files(data_dir)
+        if not all(path.exists() for path in sources.values()):
+            logger.info("No static stop_times.txt; PID stop lists will use the pattern API")
+            return None
+
+        stamp = {name: path.stat().st_mtime for name, path in sources.items()}
+        graph = cls._load_compiled(compiled, stamp)
+        if graph is None:
+            graph = cls.build(sources)
+            graph._save_compiled(compiled, stamp)
+        logger.info(f"Loaded {len(graph.patterns)} stop patterns for {len(graph.trips)} trips")
+        return graph
+
+    @classmethod
+    def build(cls, sources: Dict[str, Path]) -> "StopPatternGraph":
+        """Build the graph from the GTFS CSV files."""
+        graph = cls()
+
+        parents: Dict[str, str] = {}
+        with open(sources["stops"], "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                parent = row["parent_station"] or row["stop_id"]
+                parents[row["stop_id"]] = parent
+                graph.names.setdefault(parent, row["stop_name"].replace(" Station", ""))
+
+        trip_lines: Dict[str, Tuple[str, str]] = {}
+        with open(sources["trips"], "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                code = route_code(row["route_id"])
+                if code.endswith("-R"):  # replacement buses
+                    continue
+                trip_lines[row["trip_id"]] = (code, row["direction_id"])
+
+        stop_seqs: Dict[str, List[Tuple[int, str]]] = {}
+        with open(sources["stop_times"], "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            trip_col = header.index("trip_id")
+            stop_col = header.index("stop_id")
+            seq_col = header.index("stop_sequence")
+            for row in reader:
+                trip_id = row[trip_col]
+                if trip_id in trip_lines:
+                    stop_seqs.setdefault(trip_id, []).append((int(row[seq_col]), row[stop_col]))
+
+        pattern_ids: Dict[Tuple[str, ...], int] = {}
+        for trip_id, seq in stop_seqs.items():
+            seq.sort()
+            stations: List[str] = []
+            for _, stop_id in seq:
+                station = parents.get(stop_id, stop_id)
+                if not stations or stations[-1] != station:
+                    stations.append(station)
+            pattern = tuple(stations)
+
+            index = pattern_ids.get(pattern)
+            line = trip_lines[trip_id]
+            if index is None:
+                index = pattern_ids[pattern] = len(graph.patterns)
+                graph.patterns.append(pattern)
+                graph.lines.setdefault(line, []).append(index)
+            graph._add_trip(trip_id, index, *line)
+        return graph
+
+    def _add_trip(self, trip_id: str, pattern: int, code: str, direction: str) -> None:
+        self.trips[trip_id] = (pattern, code, direction)
+        self.trips_by_run.setdefault(run_ref_from_trip(trip_id), []).append(trip_id)
+
+    @classmethod
+    def _load_compiled(cls, path: Path, stamp: Dict[str, float]) -> Optional["StopPatternGraph"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != COMPILED_VERSION or data.get("sources") != stamp:
+            return None
+
+        graph = cls()
+        graph.names = data["names"]
+        graph.patterns = [tuple(p) for p in data["patterns"]]
+        for key, indexes in data["lines"].items():
+            code, direction = key.split("|")
+            graph.lines[(code, direction)] = indexes
+        for trip_id, (pattern, code, direction) in data["trips"].items():
+            graph._add_trip(trip_id, pattern, code, direction)
+        return graph
+
+    def _save_compiled(self, path: Path, stamp: Dict[str, float]) -> None:
+        data = {
+            "version": COMPILED_VERSION,
+            "sources": stamp,
+            "names": self.names,
+            "patterns": self.patterns,
+            "lines": {f"{code}|{direction}": indexes for (code, direction), indexes in self.lines.items()},
+            "trips": self.trips,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            tmp.replace(path)
+        except OSError as e:
+            logger.warning(f"Could not save compiled stop patterns: {str(e)}")
+
+    def trip_for_run(self, run_ref, route_gtfs_id: Optional[str] = None,
+                     days: Optional[List[date]] = None) -> Optional[str]:
+        """
+        The GTFS trip for a PTV run.
+
+        Run numbers repeat across the week's timetables, so when ``days`` is
+        given the trip whose service runs on the first of those days is
+        preferred.
+
+        Args:
+            run_ref: PTV ``run_ref`` (train run number).
+            route_gtfs_id: Optional PTV ``route_gtfs_id`` (e.g. '2-ALM') to
+                disambiguate run numbers reused across lines.
+            days: Optional service days to match, most likely first (see
+                ``ServiceCalendar.service_days``).
+        """
+        candidates = self.trips_by_run.get(str(run_ref), [])
+        if route_gtfs_id:
+            candidates = [t for t in candidates if self.trips[t][1] == route_gtfs_id] or candidates
+        if days and len(candidates) > 1:
+            calendar = get_service_calendar()
+            if calendar is not None:
+                for day in days:
+                    running = [t for t in candidates if calendar.trip_active(t, day)]
+                    if running:
+                        return running[0]
+        return candidates[0] if candidates else None
+
+    def pid_stops(self, trip_id: str) -> List[Dict[str, Any]]:
+        """
+        Ordered stop dicts (``name``, ``is_skipped``, ``is_terminus``,
+        ``stop_id``) for a trip, including stations it runs express through.
+
+        The returned list is shared; callers must copy the dicts before
+        modifying them.
+        """
+        entry = self.trips.get(trip_id)
+        if entry is None:
+            return []
+        index, code, direction = entry
+        cached = self._pid_stops.get(index)
+        if cached is not None:
+            return cached
+
+        pattern = self.patterns[index]
+        full = pattern
+        for other in self.lines.get((code, direction), ()):
+            candidate = self.patterns[other]
+            if len(candidate) > len(full) and _is_subsequence(pattern, candidate):
+                full = candidate
+
+        stopping = set(pattern)
+        first = full.index(pattern[0])
+        last = len(full) - 1 - full[::-1].index(pattern[-1])
+        output = [
+            {
+                "name": self.names.get(station, station),
+                "is_skipped": station not in stopping,
+                "is_terminus": False,
+                "stop_id": station,
+            }
+            for station in full[first:last + 1]
+        ]
+        self._pid_stops[index] = output
+        return output
+
+
+_graph: Optional[StopPatternGraph] = None
+_graph_state = "unloaded"  # unloaded -> loading -> loaded
+_graph_lock = threading.Lock()
+
+def _load_graph() -> None:
+    global _graph, _graph_state
+    try:
+        graph = StopPatternGraph.load()
+    except Exception as e:
+        logger.error(f"Failed to load stop patterns: {str(e)}")
+        graph = None
+    with _graph_lock:
+        _graph = graph
+        _graph_state = "loaded"
+
+def get_stop_patterns() -> Optional[StopPatternGraph]:
+    """
+    Return the process-wide stop pattern graph.
+
+    The first call starts loading it in a background thread and returns
+    None, as do later calls until it's ready or if no ``stop_times.txt`` is
+    available; callers fall back to the pattern API meanwhile.
+    """
+    global _graph_state
+    with _graph_lock:
+        if _graph_state == "unloaded":
+            _graph_state = "loading"
+            threading.Thread(target=_load_graph, daemon=True).start()
+        return _graph
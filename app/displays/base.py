@@ -13,3 +13,18 @@ class Display:
 
     def draw(self, surface):
         pass
+
+    def content_key(self):
+        """
+        Hashable snapshot of everything ``draw`` shows apart from the clock.
+        The loop only redraws in full when this changes; None (the default)
+        redraws every tick.
+        """
+        return None
+
+    def draw_clock(self, surface):
+        """
+        Redraw only the clock, for ticks where ``content_key`` is unchanged.
+        Returns the dirty rects, or None to fall back to a full ``draw``.
+        """
+        return None
@@ -1,5 +1,6 @@
 import pygame
 from fonts import FontManager as Fonts
+from sprites import SpriteAtlas as Sprites
 
 class StopListings:
 
@@ -39,6 +40,8 @@ class StopListings:
         # --- Top bar ---
         pygame.draw.rect(surface, colour, (0, 0, bar_width, v_padding))
 
+        sprites = Sprites.get(colour, bar_width, stop_h, v_padding, tick)
+
         all_stops = [s for chunk in stops for s in chunk]
         skip_block_active = False
         stop_index = 0
@@ -56,23 +59,8 @@ class StopListings:
                 if stop["stop_id"] is not None:
 
                     if stop["is_terminus"]:
-                        # Terminus cap
-                        r_temp = pygame.Rect(
-                            container.x,
-                            container.y,
-                            bar_width,
-                            stop_h
-                        )
-                        r = pygame.Rect(0, 0, 9, 3)
-                        r.center = r_temp.center
-                        pygame.draw.rect(surface, colour, r)
-
-                        # Terminus bar
-                        pygame.draw.rect(
-                            surface,
-                            colour,
-                            (container.x, container.y, bar_width, round(stop_h / 2))
-                        )
+                        # Terminus cap and half bar
+                        sprites.blit(surface, "terminus", container.x, container.y)
 
                     else:
                         next_stop = (
@@ -82,36 +70,18 @@ class StopListings:
                         )
                         # Skipped logic
                         if stop["is_skipped"] and next_stop and not next_stop["is_skipped"]:
-                            StopListings.draw_express_arrow(
-                                surface, container, colour, bar_width=4, arrowtip_y=10
-                            )
+                            sprites.blit(surface, "arrow", container.x, container.y)
                             skip_block_active = False
 
                         elif stop["is_skipped"] and skip_block_active:
-                            pygame.draw.rect(
-                                surface,
-                                colour,
-                                (container.x, container.y, bar_width, stop_h)
-                            )
+                            sprites.blit(surface, "bar", container.x, container.y)
 
                         elif stop["is_skipped"] and not skip_block_active:
                             skip_block_active = True
-                            StopListings.draw_express_arrow(
-                                surface, container, colour, bar_width=4, arrowtip_y=10
-                            )
+                            sprites.blit(surface, "arrow", container.x, container.y)
 
                         elif not stop["is_skipped"] and not skip_block_active:
-                            pygame.draw.rect(
-                                surface,
-                                colour,
-                                (container.x, container.y, bar_width, stop_h)
-                            )
-
-                            # Tick
-                            r = pygame.Rect(0, 0, tick[0], tick[1])
-                            r.centery = container.centery
-                            r.x = container.x + bar_width
-                            pygame.draw.rect(surface, colour, r)
+                            sprites.blit(surface, "bar_tick", container.x, container.y)
 
                     # --- Station name ---
                     if c_idx == 0 and r_idx == 0:
@@ -139,32 +109,11 @@ class StopListings:
 
                         # Top dotted continuation
                         if r_idx == 0 and stop != all_stops[0]:
-                            pygame.draw.rect(surface, colour, (container.x, 0, bar_width, 2))
-                            pygame.draw.rect(surface, colour, (container.x, 3, bar_width, 2))
-                            pygame.draw.rect(
-                                surface,
-                                colour,
-                                (container.x, 6, bar_width, v_padding - 6)
-                            )
+                            sprites.blit(surface, "dots_top", container.x, 0)
 
                         # Bottom dotted continuation
                         if r_idx == len(stop_chunk) - 1 and stop != all_stops[-1]:
-                            base_y = container.bottom
-                            pygame.draw.rect(
-                                surface,
-                                colour,
-                                (container.x, base_y, bar_width, v_padding - 6)
-                            )
-                            pygame.draw.rect(
-                                surface,
-                                colour,
-                                (container.x, base_y + v_padding - 5, bar_width, 2)
-                            )
-                            pygame.draw.rect(
-                                surface,
-                                colour,
-                                (container.x, base_y + v_padding - 2, bar_width, 2)
-                            )
+                            sprites.blit(surface, "dots_bottom", container.x, container.bottom)
 
                 stop_index += 1
 
@@ -173,7 +122,7 @@ class StopListings:
     @staticmethod
     def draw_express_arrow(screen, container, colour, bar_width=4, arrowtip_y=10):
         """
-        Draw an express/skip arrow indicator.
+        Draw an express/skip arrow indicator from the sprite atlas.
         
         Args:
             screen: Pygame surface to draw on
@@ -182,48 +131,6 @@ class StopListings:
             bar_width: Width of the bar (should be even)
             arrowtip_y: Y offset for arrow tip
         """
-        x = container.x
-        y = container.y
-        arrowtip_y = y + arrowtip_y
-        
-        # Arrow tip
-        r = pygame.Rect(0, arrowtip_y - 0, 2, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 1, 4, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 2, 6, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 3, 8, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 4, 10, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 5, 8, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        pygame.draw.rect(screen, colour, (x, y, bar_width, r.top - y))
-        
-        # Arrow bottom
-        r = pygame.Rect(0, arrowtip_y + 3, 2, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y + 2, 1, 2)
-        r.x = x
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y + 2, 1, 2)
-        r.x = x + bar_width - 1
-        pygame.draw.rect(screen, colour, r)
-        
-        pygame.draw.rect(screen, colour, (x, r.bottom, bar_width, container.bottom - r.bottom))
\ No newline at end of file
+        Sprites.get(colour, bar_width, container.height, arrowtip_y=arrowtip_y).blit(
+            screen, "arrow", container.x, container.y
+        )
@@ -1,5 +1,6 @@
 import pygame
 from datetime import datetime
+from sprites import SpriteAtlas as Sprites
 
 class TrainUI:
     """Reusable UI drawing components for all displays."""
@@ -146,7 +147,7 @@ class TrainUI:
     @staticmethod
     def draw_express_arrow(screen, container, colour, bar_width=4, arrowtip_y=10):
         """
-        Draw an express/skip arrow indicator.
+        Draw an express/skip arrow indicator from the sprite atlas.
         
         Args:
             screen: Pygame surface to draw on
@@ -155,51 +156,9 @@ class TrainUI:
             bar_width: Width of the bar (should be even)
             arrowtip_y: Y offset for arrow tip
         """
-        x = container.x
-        y = container.y
-        arrowtip_y = y + arrowtip_y
-        
-        # Arrow tip
-        r = pygame.Rect(0, arrowtip_y - 0, 2, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 1, 4, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 2, 6, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 3, 8, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 4, 10, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y - 5, 8, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        pygame.draw.rect(screen, colour, (x, y, bar_width, r.top - y))
-        
-        # Arrow bottom
-        r = pygame.Rect(0, arrowtip_y + 3, 2, 1)
-        r.centerx = x + bar_width // 2
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y + 2, 1, 2)
-        r.x = x
-        pygame.draw.rect(screen, colour, r)
-        
-        r = pygame.Rect(0, arrowtip_y + 2, 1, 2)
-        r.x = x + bar_width - 1
-        pygame.draw.rect(screen, colour, r)
-        
-        pygame.draw.rect(screen, colour, (x, r.bottom, bar_width, container.bottom - r.bottom))
+        Sprites.get(colour, bar_width, container.height, arrowtip_y=arrowtip_y).blit(
+            screen, "arrow", container.x, container.y
+        )
     
 
     @staticmethod
@@ -14,15 +14,16 @@ class DefaultDisplay(Display):
     def on_show(self):
         self.last_update = 0  # force refresh on entry
 
-    def _to_rgb(self, colour_hex):
-        if not colour_hex:
-            return (0, 0, 0)
-        return pygame.Color(colour_hex)
-
     def update(self, now):
         if now - self.last_update >= 10:
             self.last_update = now
 
+    def content_key(self):
+        return ()
+
+    def draw_clock(self, screen):
+        return []
+
     def draw(self, screen):
         config = self.ctx["config"]
 
@@ -1,3 +1,4 @@
+import time
 import pygame
 from pathlib import Path
 from datetime import datetime
@@ -8,6 +9,7 @@ from .components.serviceHeaders import ServiceHeaders
 from .components.stopListings import StopListings
 import utils
 from fonts import FontManager as Fonts
+from refresh import RefreshScheduler, BackgroundFetch
 
 
 class PlatformDisplay(Display):
@@ -15,29 +17,76 @@ class PlatformDisplay(Display):
         super().__init__(ctx)
         self.departures = []
         self.stops = []
-        self.last_update = 0
+        self.stops_run_id = None
+        self.scheduler = RefreshScheduler()
+        self.refresh = BackgroundFetch(self.scheduler, self._fetch, name="platform-refresh")
         self.platform = platform
         if self.platform == ['']:
             self.platform = None
 
     def on_show(self):
-        self.last_update = 0  # force refresh on entry
-
-    def _to_rgb(self, colour_hex):
-        if not colour_hex:
-            return (0, 0, 0)
-        return pygame.Color(colour_hex)
+        self.scheduler.force()  # force refresh on entry
+
+        # Paint the last known departures straight away; the live refresh
+        # runs in the background shortly after.
+        stop = self.ctx['stop']
+        departures, next_run = stop.get_cached_departures(3, self.platform, return_next_run = True)
+        stops = stop.get_cached_pid_stops(next_run) if departures else []
+        if stops:
+            self.departures = departures
+            self.stops = stops
+            self.stops_run_id = next_run.get("run_id")
+            self.scheduler.defer(time.time(), 1)
 
     def update(self, now):
-        if now - self.last_update >= 10 or not self.departures:
-            self.departures, next_run = self.ctx['stop'].get_next_departures(3, self.platform, return_next_run = True)
-            if self.departures != []:
-                self.stops = self.ctx['stop'].get_pid_stops(next_run)
-            self.last_update = now
+        done = self.refresh.poll(now, self.stops_run_id, self.stops)
+        if done is not None:
+            started, (self.departures, self.stops, self.stops_run_id, ok) = done
+            self.scheduler.schedule(started, self.departures, ok=ok)
+        utils.refresh_countdowns(self.departures, now)
+
+    def _fetch(self, stops_run_id, stops):
+        """Fetch departures, and the stopping pattern if the next run changed, off the render thread."""
+        stop = self.ctx['stop']
+        departures, next_run = stop.get_next_departures(3, self.platform, return_next_run = True)
+        if departures != [] and next_run:
+            # The stopping pattern only changes when the next run does
+            if next_run.get("run_id") != stops_run_id or not stops:
+                stops = stop.get_pid_stops(next_run)
+                stops_run_id = next_run.get("run_id")
+        return departures, stops, stops_run_id, stop.last_fetch_ok
+
+    CLOCK_RECT = pygame.Rect(369, 216, 102, 46)
+
+    def content_key(self):
+        return (
+            self.stops_run_id,
+            len(self.stops),
+            tuple(
+                None if dep is None else (
+                    dep.get("route_gtfs_id"), dep.get("departure_time"), dep.get("destination"),
+                    dep.get("time_to_departure"), dep.get("platform"),
+                    dep.get("express_note"), dep.get("departure_note"),
+                )
+                for dep in self.departures
+            ),
+        )
+
+    def draw_clock(self, screen):
+        if self.departures == []:
+            return []  # the no-trains screen has no clock
+        self._draw_clock(screen)
+        return [self.CLOCK_RECT]
+
+    def _draw_clock(self, screen):
+        config = self.ctx["config"]
+        current_time = utils.get_current_time_string()
+        r = self.CLOCK_RECT
+        TrainUI.draw_clock(screen, config, r.x, r.y, r.w, r.h, 1, Fonts.get("medium", 14), current_time)
 
     def draw(self, screen):
         config = self.ctx["config"]
-        colourMap = self.ctx["colourMap"]
+        routeStyles = self.ctx["routeStyles"]
 
         # If no departures, overwrite screen with no trains
         if self.departures == []:
@@ -53,7 +102,7 @@ class PlatformDisplay(Display):
         for i in range(1,3): 
             dep = self.departures[i]
             if dep:
-                colour = self._to_rgb(colourMap.get(dep["route_gtfs_id"]))
+                colour = routeStyles.colour(dep["route_gtfs_id"])
                 y = TrainUI.draw_departure_item(
                 screen, config, colour, y, 
                 departure_time=dep["departure_time"],
@@ -85,8 +134,7 @@ class PlatformDisplay(Display):
             y = y + gap
         
         # Clock drawn always
-        current_time = utils.get_current_time_string()
-        TrainUI.draw_clock(screen, config, 369, 216, 102, 46, 1, Fonts.get("medium", 14), current_time)
+        self._draw_clock(screen)
 
         # Check if no departures
         if all(x is None for x in self.departures):
@@ -107,7 +155,7 @@ class PlatformDisplay(Display):
             return
 
         departure = self.departures[0]
-        colour = self._to_rgb(colourMap.get(departure["route_gtfs_id"]))
+        colour = routeStyles.colour(departure["route_gtfs_id"])
 
         # Header Bar
         header_bar = BasicComponents.headerBar(config.SCREEN_RES[0], 10, colour)
@@ -1,34 +1,70 @@
+import time
 import pygame
 import utils
 from datetime import datetime
 from .base import Display
 from .components.tramUI import TramUI
 from fonts import FontManager as Fonts
+from refresh import RefreshScheduler, BackgroundFetch
 
 class TramDisplay(Display):
     def __init__(self, ctx):
         super().__init__(ctx)
         self.departures = []
         self.stops = []
-        self.last_update = 0
+        self.scheduler = RefreshScheduler()
+        self.refresh = BackgroundFetch(self.scheduler, self._fetch, name="tram-refresh")
         self.alerts = []
 
     def on_show(self):
-        self.last_update = 0  # force refresh on entry
+        self.scheduler.force()  # force refresh on entry
 
-    def _to_rgb(self, colour_hex):
-        if not colour_hex:
-            return (0, 0, 0)
-        return pygame.Color(colour_hex)
+        # Paint the last known departures straight away; the live refresh
+        # runs in the background shortly after.
+        departures, alerts = self.ctx['stop'].get_cached_departures_per_route(4)
+        if departures:
+            self.departures, self.alerts = departures, alerts
+            self.scheduler.defer(time.time(), 1)
 
     def update(self, now):
-        if now - self.last_update >= 10 or not self.departures:
-            self.departures, self.alerts = self.ctx['stop'].get_next_departures_per_route(4)
-            self.last_update = now
+        done = self.refresh.poll(now)
+        if done is not None:
+            started, (self.departures, self.alerts, ok) = done
+            self.scheduler.schedule(started, self.departures, ok=ok)
+        utils.refresh_countdowns(self.departures, now, unit="")
+
+    def _fetch(self):
+        """Fetch departures and alerts off the render thread."""
+        stop = self.ctx['stop']
+        departures, alerts = stop.get_next_departures_per_route(4)
+        return departures, alerts, stop.last_fetch_ok
+
+    def content_key(self):
+        alert = self.alerts[0] if self.alerts else None
+        return (
+            tuple(
+                (dep["route_number"], dep["destination"], dep["time_to_departure"])
+                for dep in self.departures
+            ),
+            None if alert is None else (alert["header"], alert["description"]),
+        )
+
+    def draw_clock(self, screen):
+        return [self._draw_footer(screen)]
+
+    def _draw_footer(self, screen):
+        config = self.ctx["config"]
+        current_time = utils.get_current_time_string()
+        footer = TramUI.tram_footer(320,30,current_time,config,Fonts.get("regular", 9),h_padding=10)
+        footer = pygame.transform.rotate(footer, 90)
+        footer_rect = footer.get_rect()
+        footer_rect.bottomright = (480,320)
+        screen.blit(footer, footer_rect.topleft)
+        return footer_rect
 
     def draw(self, screen):
         config = self.ctx["config"]
-        colourMap = self.ctx["colourMap"]
+        routeStyles = self.ctx["routeStyles"]
         screen.fill(config.LIGHT_WARM_GREY)
 
         # Departure items
@@ -38,8 +74,7 @@ class TramDisplay(Display):
             destination = departure["destination"]
             time_to_departure = departure["time_to_departure"]
             route_number = departure["route_number"] 
-            colour = self._to_rgb(colourMap.get(route_number)["route_col"])
-            text_colour = self._to_rgb(colourMap.get(route_number)["text_col"])
+            colour, text_colour = routeStyles.get(route_number)
             font = Fonts.get("medium", 14)
             destination_padding = 10
             dep_item = TramUI.tram_departure_item(config, 320, 60, route_number, destination, time_to_departure, colour, text_colour, font, destination_padding)
@@ -50,12 +85,7 @@ class TramDisplay(Display):
         
 
         # Footer
-        current_time = utils.get_current_time_string()
-        footer = TramUI.tram_footer(320,30,current_time,config,Fonts.get("regular", 9),h_padding=10)
-        footer = pygame.transform.rotate(footer, 90)
-        footer_rect = footer.get_rect()
-        footer_rect.bottomright = (480,320)
-        screen.blit(footer, footer_rect.topleft)
+        footer_rect = self._draw_footer(screen)
 
         # alert area
         n_departures = len(self.departures)
@@ -64,9 +94,12 @@ class TramDisplay(Display):
         alert_area_height = footer_left - departures_right
 
         # Alerts icon
+        if not self.alerts:
+            return
         alert = self.alerts[0]
-        icon_path = config.tram_alert_mappings.get(alert["header"])["icon_path"]
-        header = config.tram_alert_mappings.get(alert["header"])["header"]
+        mapping = config.tram_alert_mappings.get(alert["header"]) or config.tram_alert_mappings["SpecialEvent"]
+        icon_path = mapping["icon_path"]
+        header = mapping["header"] if alert["header"] in config.tram_alert_mappings else alert["header"]
 
         alert_screen = TramUI.alert( config, header, alert["description"], icon_path, 320, alert_area_height)
 
@@ -0,0 +1,408 @@
+""" Fleet mode: several logical displays in one process sharing stop data """
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pygame
+
+import config
+import startup
+from api import ptv_api
+from data import gtfs_loader
+from displays.platform import PlatformDisplay
+from displays.tram_display import TramDisplay
+from displays.default_display import DefaultDisplay
+from models.train_stop import TrainStop, fetch_departures_many
+from models.tram_stop import TramStop
+
+logger = logging.getLogger("ptv_display")
+app_dir = Path(__file__).resolve().parent
+
+TRAIN = "Metropolitan-Train"
+TRAM = "Tram"
+
+
+class DepartureStore:
+    """
+    Process-wide store of stop models and their latest departure responses.
+
+    Every panel showing the same stop shares one model and one unfiltered
+    departures response, reused for ``ttl`` seconds. Platform filtering and
+    formatting happen locally per panel, so API load scales with the number
+    of unique stops rather than the number of screens. Stale train stops are
+    refreshed together with ``fetch_departures_many``. A platform whose
+    departures were cut off by ``max_results`` at a busy station gets its
+    own platform-filtered response, shared the same way.
+    """
+
+    PATTERN_CACHE_SIZE = 64
+
+    def __init__(self, ttl: float = config.FLEET_SHARED_TTL, max_results: int = config.FLEET_MAX_RESULTS):
+        self.ttl = ttl
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._stops: Dict[Tuple[str, Any], Any] = {}
+        self._responses: Dict[Tuple[str, Any], Tuple[float, Any]] = {}
+        self._patterns: Dict[Tuple[Any, Any], List[List[Dict[str, Any]]]] = {}
+
+        self.fetch_count = 0
+        self.hit_count = 0
+
+    def stop(self, transit_type: str, stop_id) -> Any:
+        """Return the shared ``TrainStop``/``TramStop`` for a stop, resolving it once."""
+        key = (transit_type, str(stop_id))
+        with self._lock:
+            stop = self._stops.get(key)
+        if stop is not None:
+            return stop
+
+        stop = TrainStop(stop_id) if transit_type == TRAIN else TramStop(stop_id)
+        with self._lock:
+            return self._stops.setdefault(key, stop)
+
+    def response(self, transit_type: str, stop_id, now: Optional[float] = None) -> Any:
+        """
+        Return the shared departures payload for a stop, fetching it if the
+        cached copy is older than ``ttl``.
+
+        Train payloads are the raw departures response; tram payloads are a
+        ``(response, alerts)`` tuple.
+        """
+        now = time.time() if now is None else now
+        key = (transit_type, str(stop_id))
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached and now - cached[0] < self.ttl:
+                self.hit_count += 1
+                return cached[1]
+
+        stop = self.stop(transit_type, stop_id)
+        if transit_type == TRAIN:
+            return self._refresh_trains(stop, now)
+
+        result = stop.fetch_departures()
+        payload = (result, stop.get_alerts(result) if result is not None else [])
+
+        with self._lock:
+            self.fetch_count += 1
+            self._responses[key] = (now, payload)
+        return payload
+
+    def _refresh_trains(self, stop: TrainStop, now: float) -> Any:
+        """
+        Refresh ``stop`` together with every other stale train stop in one
+        batch, so panels on different stations share a round trip instead of
+        each stalling the frame in turn; returns ``stop``'s response.
+        """
+        key = (TRAIN, str(stop.stop_id))
+        with self._lock:
+            stale = [stop] + [
+                s for k, s in self._stops.items()
+                if k[0] == TRAIN and k != key
+                and now - self._responses.get(k, (float("-inf"),))[0] >= self.ttl
+            ]
+
+        results = fetch_departures_many(stale, self.max_results)
+        with self._lock:
+            for stop_id, result in results.items():
+                self.fetch_count += 1
+                self._responses[(TRAIN, stop_id)] = (now, result)
+        return results[str(stop.stop_id)]
+
+    def platform_response(self, stop_id, platform, now: Optional[float] = None) -> Any:
+        """
+        Return a departures response for a train stop filtered to
+        ``platform`` by the API, fetching it if the cached copy is older
+        than ``ttl``. Used for platforms the shared response comes up short
+        for.
+        """
+        now = time.time() if now is None else now
+        key = (TRAIN, str(stop_id), TrainStop._platform_key(platform))
+        with self._lock:
+            cached = self._responses.get(key)
+            if cached and now - cached[0] < self.ttl:
+                self.hit_count += 1
+                return cached[1]
+
+        result = self.stop(TRAIN, stop_id).fetch_departures(self.max_results, platform)
+        with self._lock:
+            self.fetch_count += 1
+            self._responses[key] = (now, result)
+        return result
+
+    def pid_stops(self, stop: TrainStop, run: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        """Return the PID stop listing for a run, shared across panels."""
+        key = (stop.stop_id, run.get("run_id"))
+        with self._lock:
+            stops = self._patterns.get(key)
+        if stops is not None:
+            return stops
+
+        stops = stop.get_pid_stops(run)
+        with self._lock:
+            if len(self._patterns) >= self.PATTERN_CACHE_SIZE:
+                self._patterns.pop(next(iter(self._patterns)))
+            self._patterns[key] = stops
+        return stops
+
+
+class SharedTrainStop:
+    """``TrainStop`` stand-in for a panel, backed by a ``DepartureStore``."""
+
+    def __init__(self, store: DepartureStore, stop_id):
+        self.store = store
+        self.stop = store.stop(TRAIN, stop_id)
+
+    @property
+    def last_fetch_ok(self) -> bool:
+        return self.stop.last_fetch_ok
+
+    def get_next_departures(self, n_departures: int, platform=None, return_next_run: bool = False):
+        result = self.store.response(TRAIN, self.stop.stop_id)
+        departures, next_run = self.stop.build_departures(result, n_departures, platform, return_next_run)
+        if platform and self.stop.view_came_up_short(result, departures, n_departures, self.store.max_results):
+            filtered = self.store.platform_response(self.stop.stop_id, platform)
+            if filtered is not None:
+                departures, next_run = self.stop.build_departures(filtered, n_departures, platform, return_next_run)
+        return departures, next_run
+
+    def get_pid_stops(self, run: dict) -> List[List[Dict[str, Any]]]:
+        return self.store.pid_stops(self.stop, run)
+
+    def get_cached_departures(self, n_departures: int, platform=None, return_next_run: bool = False):
+        return self.stop.get_cached_departures(n_departures, platform, return_next_run)
+
+    def get_cached_pid_stops(self, run: dict) -> List[List[Dict[str, Any]]]:
+        return self.stop.get_cached_pid_stops(run)
+
+
+class SharedTramStop:
+    """``TramStop`` stand-in for a panel, backed by a ``DepartureStore``."""
+
+    def __init__(self, store: DepartureStore, stop_id):
+        self.store = store
+        self.stop = store.stop(TRAM, stop_id)
+
+    @property
+    def last_fetch_ok(self) -> bool:
+        return self.stop.last_fetch_ok
+
+    def get_next_departures_per_route(self, n_departures: int):
+        result, alerts = self.store.response(TRAM, self.stop.stop_id)
+        if result is None:
+            return [], []
+        return self.stop.build_departures_per_route(result, n_departures), alerts
+
+    def get_cached_departures_per_route(self, n_departures: int):
+        return self.stop.get_cached_departures_per_route(n_departures)
+
+
+class OffscreenTarget:
+    """Render target that only keeps the panel surface in memory."""
+
+    def __init__(self, size):
+        self.surface = pygame.Surface(size)
+
+    def present(self):
+        pass
+
+
+class WindowTarget:
+    """Render target for a region of the shared pygame window."""
+
+    def __init__(self, window, rect):
+        self.surface = window.subsurface(rect)
+
+    def present(self):
+        pass  # the window is flipped once per frame by the fleet loop
+
+
+class FramebufferTarget:
+    """
+    Render target that writes raw pixels to a Linux framebuffer device.
+
+    16 bpp devices receive RGB565 and 32 bpp devices BGRA, matching the
+    common SPI and HDMI panels on a Pi.
+    """
+
+    def __init__(self, size, device: str):
+        self.surface = pygame.Surface(size)
+        self.device = device
+        self.bpp = self._read_bpp(device)
+        self._fb = open(device, "wb", buffering=0)
+        if self.bpp == 16:
+            self._converted = pygame.Surface(size, 0, 16)
+
+    @staticmethod
+    def _read_bpp(device: str) -> int:
+        sysfs = Path("/sys/class/graphics") / Path(device).name / "bits_per_pixel"
+        try:
+            return int(sysfs.read_text().strip())
+        except (OSError, ValueError):
+            return 16
+
+    def present(self):
+        if self.bpp == 16:
+            self._converted.blit(self.surface, (0, 0))
+            data = bytes(self._converted.get_buffer())
+        else:
+            data = pygame.image.tobytes(self.surface, "BGRA")
+        self._fb.seek(0)
+        self._fb.write(data)
+
+
+class Panel:
+    """One logical display: a ``Display`` instance plus where it renders."""
+
+    def __init__(self, name: str, display, target):
+        self.name = name
+        self.display = display
+        self.target = target
+
+    @property
+    def surface(self):
+        return self.target.surface
+
+
+def load_fleet_config(path) -> List[Dict[str, Any]]:
+    """
+    Load panel definitions from a JSON file.
+
+    Each entry has ``transit_type``, ``stop_id`` and ``display_type`` as in
+    the web control panel, plus optional ``name``, ``platforms``, ``target``
+    (``"window"``, ``"offscreen"`` or ``"framebuffer"``), ``device`` for
+    framebuffer targets and ``size``.
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        panels = json.load(fh)
+    if not isinstance(panels, list):
+        raise ValueError(f"Fleet config {path} must contain a list of panels")
+    return panels
+
+
+def build_display(spec: Dict[str, Any], store: DepartureStore, ctx_base: Dict[str, Any]):
+    """Build the ``Display`` for a panel spec, using shared stop views."""
+    transit_type = spec.get("transit_type")
+    display_type = spec.get("display_type")
+
+    if transit_type == TRAIN and display_type == "platform":
+        stop = SharedTrainStop(store, spec["stop_id"])
+        platforms = spec.get("platforms") or None
+        return PlatformDisplay({**ctx_base, "stop": stop}, platforms)
+    if transit_type == TRAM and display_type == "tram_display":
+        stop = SharedTramStop(store, spec["stop_id"])
+        return TramDisplay({**ctx_base, "stop": stop})
+
+    logger.warning(f"Unsupported panel {transit_type}/{display_type}, showing default display")
+    return DefaultDisplay(ctx_base)
+
+
+def _layout_windows(specs: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Size of the shared window holding every ``"window"`` panel side by side."""
+    sizes = [tuple(s.get("size", config.SCREEN_RES)) for s in specs if s.get("target", "window") == "window"]
+    if not sizes:
+        return (0, 0)
+    return (sum(w for w, _ in sizes), max(h for _, h in sizes))
+
+
+def run_fleet_loop(display_state, config_path):
+    """
+    Run several logical displays in a single pygame loop.
+
+    Window panels are tiled left to right in one window; offscreen and
+    framebuffer panels render to their own surfaces. All panels share one
+    ``DepartureStore``.
+
+    Args:
+        display_state: Shared ``DisplayStateStore``; the loop exits when
+            ``running`` is cleared.
+        config_path: Path to the fleet JSON config.
+    """
+    try:
+        try:
+            config.validate_required_env_vars()
+        except EnvironmentError as e:
+            logger.error(str(e))
+            return
+
+        specs = load_fleet_config(config_path)
+        pygame.init()
+
+        window_size = _layout_windows(specs)
+        if window_size[0]:
+            window = pygame.display.set_mode(window_size)
+        else:
+            # Image conversion needs a video mode even when nothing is shown
+            window = pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        window.fill(config.BACKGROUND_COLOR)
+        pygame.display.flip()
+        startup.splash_painted(config.STARTUP_SPLASH_BUDGET)
+
+        store = DepartureStore()
+        ctx_base = {
+            "ptv_api": ptv_api,
+            "config": config,
+            "routeStyles": gtfs_loader.load_route_styles(app_dir / "data"),
+        }
+
+        panels: List[Panel] = []
+        x = 0
+        for i, spec in enumerate(specs):
+            size = tuple(spec.get("size", config.SCREEN_RES))
+            kind = spec.get("target", "window")
+            if kind == "window":
+                target = WindowTarget(window, pygame.Rect((x, 0), size))
+                x += size[0]
+            elif kind == "framebuffer":
+                target = FramebufferTarget(size, spec["device"])
+            else:
+                target = OffscreenTarget(size)
+
+            display = build_display(spec, store, ctx_base)
+            display.on_show()
+            panels.append(Panel(spec.get("name", f"panel-{i}"), display, target))
+
+        logger.info(f"Fleet loop started with {len(panels)} panels")
+        display_state.running = True
+        clock = pygame.time.Clock()
+        frame_count = 0
+
+        while display_state.running:
+            now = time.time()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    display_state.running = False
+                    logger.info("Quit event received")
+
+            for panel in panels:
+                try:
+                    panel.display.update(now)
+                    panel.display.draw(panel.surface)
+                    panel.target.present()
+                except Exception as e:
+                    logger.error(f"Error in panel {panel.name}: {str(e)}")
+                    panel.surface.fill(config.BACKGROUND_COLOR)
+
+            if window_size[0]:
+                pygame.display.flip()
+
+            clock.tick(config.FPS)
+            frame_count += 1
+
+            if frame_count % 300 == 0:
+                logger.debug(
+                    f"Fleet loop: {frame_count} frames, "
+                    f"{store.fetch_count} shared fetches, {store.hit_count} reused"
+                )
+
+    except KeyboardInterrupt:
+        logger.info("Fleet loop: KeyboardInterrupt received")
+    except Exception as e:
+        logger.critical(f"Critical error in fleet loop: {str(e)}", exc_info=True)
+    finally:
+        display_state.running = False
+        pygame.quit()
+        logger.info("Fleet loop closed")
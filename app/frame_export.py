@@ -0,0 +1,144 @@
+""" PNG snapshots of the rendered frame for the web server """
+import io
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import pygame
+
+logger = logging.getLogger("ptv_display")
+
+
+class FrameExporter:
+    """
+    Hands rendered frames from the display loop to ``/api/frame.png``.
+
+    ``capture`` copies the screen into one of two buffers: never the one the
+    encoder is reading, so a copy of a few hundred KB is all the render
+    thread pays. PNG encoding happens on a worker thread, only when a
+    request asks for a frame newer than the last encoded one, so each
+    frame is encoded at most once and not at all while nobody is looking.
+    ETags combine a per-process nonce with the frame version, so unchanged
+    frames are answered with 304 before anything is encoded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encoded = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._buffers = [None, None]
+        self._front: Optional[int] = None  # buffer holding the latest frame
+        self._reading: Optional[int] = None  # buffer the worker is encoding
+        self.version = 0
+        self._png: Optional[Tuple[int, bytes]] = None
+        self._nonce = os.urandom(4).hex()
+        self._worker: Optional[threading.Thread] = None
+
+        self.captures = 0
+        self.encodes = 0
+        self.encode_seconds = 0.0
+        self.encode_max = 0.0
+        self.requests = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+
+    def capture(self, surface) -> None:
+        """Copy ``surface`` as the latest frame. Called by the render thread after it draws."""
+        with self._lock:
+            index = 1 - self._reading if self._reading is not None else (
+                0 if self._front is None else 1 - self._front
+            )
+            buffer = self._buffers[index]
+            if buffer is None or buffer.get_size() != surface.get_size():
+                buffer = self._buffers[index] = pygame.Surface(surface.get_size())
+            buffer.blit(surface, (0, 0))
+            self._front = index
+            self.version += 1
+            self.captures += 1
+
+    def etag(self, version: Optional[int] = None) -> str:
+        return f"{self._nonce}-{self.version if version is None else version}"
+
+    def current_etag(self) -> Optional[str]:
+        """ETag of the latest captured frame, or None before the first capture."""
+        with self._lock:
+            return None if self._front is None else self.etag()
+
+    def png(self, timeout: float = 2.0) -> Optional[Tuple[str, bytes]]:
+        """
+        The latest frame as ``(etag, png_bytes)``, encoding it on the worker
+        if it hasn't been yet.
+
+        Returns:
+            None if nothing has been captured or encoding timed out.
+        """
+        with self._lock:
+            self.requests += 1
+            if self._front is None:
+                return None
+            if self._png is not None and self._png[0] == self.version:
+                self.cache_hits += 1
+                return self.etag(self._png[0]), self._png[1]
+            self._ensure_worker()
+            wanted = self.version
+            self._wake.set()
+            self._encoded.wait_for(lambda: self._png is not None and self._png[0] >= wanted, timeout)
+            if self._png is None or self._png[0] < wanted:
+                return None
+            return self.etag(self._png[0]), self._png[1]
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.not_modified += 1
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="frame-encoder", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                if self._front is None or (self._png is not None and self._png[0] == self.version):
+                    continue
+                index, version = self._front, self.version
+                self._reading = index
+
+            start = time.perf_counter()
+            try:
+                out = io.BytesIO()
+                pygame.image.save(self._buffers[index], out, "frame.png")
+                data = out.getvalue()
+            except Exception as e:
+                logger.error(f"Frame encoding failed: {str(e)}")
+                data = None
+            spent = time.perf_counter() - start
+
+            with self._lock:
+                self._reading = None
+                if data is not None:
+                    self._png = (version, data)
+                    self.encodes += 1
+                    self.encode_seconds += spent
+                    self.encode_max = max(self.encode_max, spent)
+                self._encoded.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            served = self.requests or 1
+            return {
+                "version": self.version,
+                "captures": self.captures,
+                "encodes": self.encodes,
+                "encode_mean_ms": self.encode_seconds / self.encodes * 1000 if self.encodes else 0.0,
+                "encode_max_ms": self.encode_max * 1000,
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "not_modified": self.not_modified,
+                "hit_rate": (self.cache_hits + self.not_modified) / served,
+            }
@@ -0,0 +1,198 @@
+""" Opt-in memory profiling for long-running displays (PTV_PROFILE_MEMORY) """
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+import pygame
+
+import config
+
+logger = logging.getLogger("ptv_display")
+
+# lru_caches in utils, reported by entry count
+_UTILS_CACHES = ("parse_ptv_utc", "_text_width", "_wrap_text")
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm", "r") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current, in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def surface_stats() -> Tuple[int, int]:
+    """
+    Count and pixel bytes of live ``pygame.Surface`` objects.
+
+    Surfaces aren't tracked by the garbage collector, so they are found
+    through the containers and instances that hold them; temporaries only
+    referenced from a running frame's locals are missed.
+    """
+    seen = set()
+    count = nbytes = 0
+    for obj in gc.get_objects():
+        for ref in gc.get_referents(obj):
+            if isinstance(ref, pygame.Surface) and id(ref) not in seen:
+                seen.add(id(ref))
+                count += 1
+                try:
+                    nbytes += ref.get_bytesize() * ref.get_width() * ref.get_height()
+                except pygame.error:
+                    pass  # surface of a closed display
+    return count, nbytes
+
+
+def cache_sizes() -> Dict[str, int]:
+    """Entry counts of the process-wide caches in modules that are loaded."""
+    sizes = {}
+    fonts = sys.modules.get("fonts")
+    if fonts is not None:
+        sizes["fonts"] = len(fonts.FontManager._cache)
+    sprites = sys.modules.get("sprites")
+    if sprites is not None:
+        sizes["sprite_atlases"] = len(sprites.SpriteAtlas._cache)
+    utils = sys.modules.get("utils")
+    if utils is not None:
+        for name in _UTILS_CACHES:
+            func = getattr(utils, name, None)
+            if func is not None and hasattr(func, "cache_info"):
+                sizes[name.lstrip("_")] = func.cache_info().currsize
+    ptv_api = sys.modules.get("api.ptv_api")
+    if ptv_api is not None:
+        sizes["ptv_stale"] = ptv_api.stale_cache_size()
+    return sizes
+
+
+class MemoryProfiler:
+    """
+    Periodic memory sampler for the display loop.
+
+    Each sample runs a full collection, then records tracemalloc's traced
+    Python memory, RSS, live pygame surfaces (whose pixels tracemalloc
+    can't see), cache sizes and the allocation sites that grew most since
+    the baseline. A sample walks every object in the process and can stall
+    the frame for a few hundred milliseconds; keep ``interval`` in minutes.
+    """
+
+    def __init__(self,
+                 interval: float = config.MEMORY_PROFILE_INTERVAL,
+                 top: int = config.MEMORY_PROFILE_TOP,
+                 trace_depth: int = config.MEMORY_TRACE_DEPTH):
+        self.interval = interval
+        self.top = top
+        self.trace_depth = trace_depth
+        self.samples = 0
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._next_at = 0.0
+
+    def start(self, now: Optional[float] = None) -> "MemoryProfiler":
+        """Start tracing and take the baseline that growth is reported against."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_depth)
+        self.reset_baseline()
+        self._next_at = (time.time() if now is None else now) + self.interval
+        return self
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._baseline = None
+
+    def reset_baseline(self) -> None:
+        """Report growth from now on, e.g. after the caches have warmed up."""
+        gc.collect()
+        self._baseline = self._snapshot()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def due(self, now: float) -> bool:
+        return now >= self._next_at
+
+    def sample(self) -> Dict[str, Any]:
+        """
+        Take one sample.
+
+        Returns:
+            Dict with ``traced``, ``traced_peak`` and ``rss`` (bytes),
+            ``surfaces`` and ``surface_bytes``, ``gc_garbage``, ``caches``
+            (name -> entries) and ``top``, a list of ``(site, size_diff,
+            count_diff)`` for the allocation sites that grew most.
+        """
+        gc.collect()
+        snapshot = self._snapshot()
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        surfaces, surface_bytes = surface_stats()
+
+        top: List[Tuple[str, int, int]] = []
+        if self._baseline is not None:
+            for stat in snapshot.compare_to(self._baseline, "lineno")[:self.top]:
+                frame = stat.traceback[0]
+                top.append((f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.count_diff))
+
+        self.samples += 1
+        return {
+            "traced": traced,
+            "traced_peak": traced_peak,
+            "rss": rss_bytes(),
+            "surfaces": surfaces,
+            "surface_bytes": surface_bytes,
+            "gc_garbage": len(gc.garbage),
+            "caches": cache_sizes(),
+            "top": top,
+        }
+
+    def log_sample(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Take a sample, log it and schedule the next one."""
+        start = time.perf_counter()
+        sample = self.sample()
+        self._next_at = (time.time() if now is None else now) + self.interval
+
+        rss = f"{sample['rss'] / 2**20:.1f} MiB" if sample["rss"] is not None else "n/a"
+        caches = ", ".join(f"{name} {size}" for name, size in sample["caches"].items())
+        lines = [
+            f"Memory: traced {sample['traced'] / 2**20:.2f} MiB (peak {sample['traced_peak'] / 2**20:.2f}), "
+            f"RSS {rss}, {sample['surfaces']} surfaces ({sample['surface_bytes'] / 2**20:.2f} MiB), "
+            f"{sample['gc_garbage']} uncollectable; sampled in {(time.perf_counter() - start) * 1000:.0f} ms",
+            f"Memory caches: {caches}",
+        ]
+        if sample["top"]:
+            lines.append("Memory growth by allocation site since baseline:")
+            lines.extend(f"  {size / 1024:+9.1f} KiB {count:+7d} blocks  {site}" for site, size, count in sample["top"])
+        logger.info("\n".join(lines))
+        return sample
+
+
+def profile_from_env() -> Optional[MemoryProfiler]:
+    """
+    Start a memory profiler if ``PTV_PROFILE_MEMORY`` is set: ``1`` samples
+    every ``MEMORY_PROFILE_INTERVAL`` seconds, a number every that many.
+    """
+    value = os.getenv("PTV_PROFILE_MEMORY", "").strip().lower()
+    if value in ("", "0", "false", "no"):
+        return None
+    interval = config.MEMORY_PROFILE_INTERVAL
+    if value not in ("1", "true", "yes"):
+        try:
+            interval = float(value)
+        except ValueError:
+            logger.warning(f"Invalid PTV_PROFILE_MEMORY={value!r}, sampling every {interval:g} s")
+    logger.info(f"Memory profiling every {interval:g} s (PTV_PROFILE_MEMORY)")
+    return MemoryProfiler(interval=interval).start()
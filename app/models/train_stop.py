@@ -1,14 +1,21 @@
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
 import re
+import time
 import logging
+import threading
 
 import pytz
 
-from api.ptv_api import send_ptv_request
-from utils import parse_departure_time
+from api.ptv_api import send_ptv_request, send_ptv_request_with_age
+from utils import format_departure_times, departure_epoch
+from data.snapshot_cache import get_cache
+from data.stop_patterns import get_stop_patterns
+from data.stop_index import get_stop_index
+from data.service_calendar import ServiceCalendar
 import config
 
 logger = logging.getLogger("ptv_display")
@@ -19,12 +26,14 @@ class TrainStop:
     """
     Represents a PTV metro train stop and provides departure lookup functionality.
     """
-    def __init__(self, stop_id, platforms: Optional[List[str]] = None):
+    def __init__(self, stop_id, platforms: Optional[List[str]] = None, resolve: bool = True):
         """
         Initialise a Stop object and resolve it against the PTV API.
 
         :param name: User-provided stop name
         :param platforms: List of platform numbers to filter departures
+        :param resolve: Resolve metadata now (from the cache or API). Pass False
+            when the caller resolves it itself, e.g. the async client.
         """
 
         # Validate and clean platforms
@@ -45,11 +54,114 @@ class TrainStop:
         self.stop_longitude = None
         self.stop_sequence = None
         self.stop_landmark = None
+        self.available_platforms: Optional[List[str]] = None
 
         # Non-metadata
         self.stop_id_gtfs = None
+        self.last_fetch_ok = True
+        self.last_fetch_age: Optional[float] = None
+        self.last_fetch_at: Optional[float] = None
 
-        self.resolve_stop()
+        # Snapshot cache for warm starts
+        self._cache = get_cache()
+        self._last_snapshot = 0.0
+
+        if resolve and not self._load_cached_stop():
+            self.resolve_stop()
+
+    def _cache_key(self, kind: str, *parts) -> str:
+        return ":".join(str(p) for p in (kind, config.route_type_train, self.stop_id) + parts)
+
+    def _load_cached_stop(self) -> bool:
+        """
+        Populate metadata from the snapshot cache, if present, and refresh it
+        from the API in the background.
+
+        :return: True if cached metadata was applied
+        """
+        cached = self._cache.get(self._cache_key("stop")) if self._cache else None
+        if not cached:
+            return False
+        try:
+            self._apply_stop(cached)
+        except (KeyError, TypeError):
+            return False
+
+        logger.info(f'Loaded stop {self.stop_id} from cache, refreshing in background')
+        threading.Thread(target=self._refresh_stop, daemon=True).start()
+        return True
+
+    def _refresh_stop(self) -> None:
+        try:
+            self.resolve_stop()
+        except Exception as e:
+            logger.warning(f"Background refresh of stop {self.stop_id} failed: {str(e)}")
+
+    def _apply_stop(self, train_stop: Dict[str, Any]) -> None:
+        """
+        Populate metadata from a ``stop`` object returned by the API.
+
+        Every field is read before any is assigned, then all are swapped in
+        with one dict update, so a frame drawing while the background
+        refresh runs never sees a new name with the old routes.
+        """
+        name = train_stop['stop_name']
+        metadata = {
+            "route_type": train_stop['route_type'],
+            "name": name,
+            "routes": train_stop['routes'],
+            "stop_suburb": train_stop["stop_location"]["suburb"],
+            "stop_latitude": train_stop["stop_location"]["gps"]['latitude'],
+            "stop_longitude": train_stop["stop_location"]["gps"]['longitude'],
+            "stop_landmark": train_stop['stop_landmark'],
+            "available_platforms": self._resolve_platforms(name),
+        }
+        self.__dict__.update(metadata)
+
+    def _resolve_platforms(self, name: Optional[str]) -> Optional[List[str]]:
+        """
+        Look up a station's platforms in the static stop index and warn
+        about configured platform filters that don't exist there.
+
+        :return: The station's platforms, or None if it isn't in the index
+        """
+        index = get_stop_index()
+        if index is None or not name:
+            return self.available_platforms
+        available_platforms = index.platforms_for(name)
+        if available_platforms is None:
+            logger.debug(f"Stop {name} not found in static stop index")
+            return None
+        unknown = [p for p in (self.platform or []) if p not in available_platforms]
+        if unknown:
+            logger.warning(
+                f"Platforms {unknown} not found at {name} "
+                f"(known platforms: {available_platforms})"
+            )
+        return available_platforms
+
+    def stop_endpoint(self) -> str:
+        """API endpoint for this stop's metadata."""
+        return (
+            f"/v3/stops/{self.stop_id}/route_type/0"
+            f"?stop_location=true&stop_amenities=true&stop_accessibility=true"
+            f"&stop_contact=true&stop_ticket=true&stop_staffing=true&stop_disruptions=true"
+        )
+
+    def apply_stop_response(self, result: Optional[Dict[str, Any]]) -> None:
+        """
+        Populate metadata from a stop response and cache it.
+
+        :raises ValueError: If the response has no stop
+        """
+        if not result or not result.get("stop"):
+            raise ValueError(f"Could not resolve train stop {self.stop_id}")
+        train_stop = result["stop"]
+
+        # Populate Metadata
+        self._apply_stop(train_stop)
+        if self._cache:
+            self._cache.put(self._cache_key("stop"), train_stop)
 
     def resolve_stop(self) -> None:
         """
@@ -59,22 +171,8 @@ class TrainStop:
         try:
 
             # Resolve Metro
-            endpoint = (
-                f"/v3/stops/{self.stop_id}/route_type/0"
-                f"?stop_location=true&stop_amenities=true&stop_accessibility=true"
-                f"&stop_contact=true&stop_ticket=true&stop_staffing=true&stop_disruptions=true"
-            )
-            result = send_ptv_request(endpoint)
-            train_stop = result.get("stop")
-
-            # Populate Metadata
-            self.route_type = train_stop['route_type']
-            self.name = train_stop['stop_name']
-            self.routes = train_stop['routes']
-            self.stop_suburb = train_stop["stop_location"]["suburb"]
-            self.stop_latitude = train_stop["stop_location"]["gps"]['latitude']
-            self.stop_longitude = train_stop["stop_location"]["gps"]['longitude']
-            self.stop_landmark = train_stop['stop_landmark']
+            result = send_ptv_request(self.stop_endpoint())
+            self.apply_stop_response(result)
         
         except ValueError:
             raise
@@ -94,39 +192,160 @@ class TrainStop:
         :param return_next_run: Whether to return the full run object
         :return: List of departure dictionaries (optionally plus next run)
         """
+        result = self.fetch_departures(n_departures, platform)
+        return self.build_departures(result, n_departures, return_next_run=return_next_run)
+
+    def fetch_departures(self, max_results: int, platform = None) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the raw departures response for this stop.
+
+        :param max_results: ``max_results`` passed to the API
+        :param platform: Optional list of platform numbers to filter on server side
+        :return: Parsed API response, or None on error
+        """
+        result, age = send_ptv_request_with_age(self.departures_endpoint(max_results, platform))
+        self.record_departures(result, age, platform)
+        return result
+
+    def departures_endpoint(self, max_results: int, platform = None) -> str:
+        """API endpoint for this stop's departures."""
         platform_str = ""
         if platform and platform != ['']:
             for platform_no in platform:
                 platform_str += f"&platform_numbers={platform_no}"
 
-        endpoint = (
+        return (
             f"/v3/departures/route_type/0/stop/{self.stop_id}"
-            f"?max_results={n_departures}"
+            f"?max_results={max_results}"
             f"&expand=0"
             f"&include_skipped_stops=true"
             f"{platform_str}"
         )
 
-        result = send_ptv_request(endpoint)
+    def record_departures(self, result: Optional[Dict[str, Any]], age: Optional[float], platform = None) -> None:
+        """
+        Record the outcome of a departures fetch and snapshot fresh responses.
+
+        :param result: Parsed response, or None on error
+        :param age: Response age in seconds (0 for fresh)
+        :param platform: Platform filter the response was fetched with
+        """
+        now = time.time()
+        self.last_fetch_ok = result is not None and not age
+        self.last_fetch_age = age
+        self.last_fetch_at = now
+        if self._cache and self.last_fetch_ok and now - self._last_snapshot >= config.CACHE_SNAPSHOT_INTERVAL:
+            self._cache.put(self._cache_key("departures", self._platform_key(platform)), result)
+            self._last_snapshot = now
+
+    @staticmethod
+    def view_came_up_short(result: Optional[Dict[str, Any]],
+                           departures: List[Optional[Dict[str, Any]]],
+                           n_departures: int,
+                           max_results: int) -> bool:
+        """
+        Whether a view filtered locally from an unfiltered response may be
+        missing departures: it has fewer than ``n_departures`` and the
+        response was full, so ``max_results`` may have cut off later
+        services for this platform or route.
+
+        :param result: The unfiltered response the view was built from
+        :param departures: The view, as returned by ``build_departures``
+        :param n_departures: Departures the view wanted
+        :param max_results: ``max_results`` the response was fetched with
+        """
+        if result is None:
+            return False
+        shown = sum(1 for d in departures if d is not None)
+        return shown < n_departures and len(result.get("departures", [])) >= max_results
+
+    def view_max_results(self, max_results: int, route_ids = None) -> int:
+        """
+        ``max_results`` for a route-filtered view, scaled by the share of
+        this stop's routes it shows (the API can't filter a stop's
+        departures by several routes).
+        """
+        if not route_ids or not self.routes:
+            return max_results
+        share = max(len(self.routes) // max(len(route_ids), 1), 1)
+        return max_results * share
+
+    @staticmethod
+    def _platform_key(platform) -> str:
+        if platform and platform != ['']:
+            return ",".join(sorted(str(p) for p in platform))
+        return "all"
+
+    def get_cached_departures(self,
+                              n_departures: int,
+                              platform = None,
+                              return_next_run: bool = False
+    ):
+        """
+        Build departures from the last snapshot in the cache, without any
+        network access. Falls back to the unfiltered snapshot, filtered
+        locally, if there is none for this platform filter.
+
+        :return: Same as ``get_next_departures``; empty if nothing is cached
+        """
+        if not self._cache:
+            return [], []
+        result = self._cache.get(self._cache_key("departures", self._platform_key(platform)))
+        if result is None:
+            result = self._cache.get(self._cache_key("departures", "all"))
+        return self.build_departures(result, n_departures, platform, return_next_run)
+
+    def get_cached_pid_stops(self, run: dict) -> List[Dict[str, Any]]:
+        """Return the cached PID stop listing for a run, or an empty list."""
+        if not self._cache or not run:
+            return []
+        return self._cache.get(self._cache_key("pid_stops", run.get("run_id"))) or []
+
+    def build_departures(self,
+                         result: Optional[Dict[str, Any]],
+                         n_departures: int,
+                         platform = None,
+                         return_next_run: bool = False,
+                         route_ids = None
+    ):
+        """
+        Build display departures from a raw departures response.
+
+        No network access happens here, so one unfiltered response can be
+        shared by several views of the same stop.
+
+        :param result: Response from ``fetch_departures``
+        :param n_departures: Number of departures to return
+        :param platform: Optional list of platform numbers to filter locally
+        :param return_next_run: Whether to return the full run object
+        :param route_ids: Optional PTV route IDs to filter locally
+        :return: List of departure dictionaries (optionally plus next run)
+        """
         if not result:
             return [], []
 
-        departures = result.get("departures", [])[:n_departures]
+        # Drop services that have already left (a stale response may hold some)
+        cutoff = time.time() - 60
+        departures = sorted(
+            (d for d in result.get("departures", []) if (departure_epoch(d) or cutoff) >= cutoff),
+            key=lambda d: d.get("scheduled_departure_utc") or "",
+        )
+        if platform and platform != ['']:
+            platforms = {str(p) for p in platform}
+            departures = [d for d in departures if str(d.get("platform_number")) in platforms]
+        if route_ids:
+            routes = {int(r) for r in route_ids}
+            departures = [d for d in departures if d.get("route_id") in routes]
+        departures = departures[:n_departures]
         runs = result.get("runs", {}) or {}
         
         if departures == []:
             return [], []
         
         departures_list: List[Dict[str, Any]] = []
-        now_local = datetime.now(tz)
-
-        for departure in departures:
-            departure_time, time_to_departure = parse_departure_time(
-                departure=departure,
-                now_local=now_local,
-            )
+        times = format_departure_times(departures, time.time())
 
-    
+        for departure, (departure_time, time_to_departure, epoch) in zip(departures, times):
             run_id = departure.get("run_id")
             run_info = runs.get(str(run_id), {})
 
@@ -152,6 +371,8 @@ class TrainStop:
                     "destination": destination,
                     "departure_time": departure_time,
                     "time_to_departure": time_to_departure,
+                    "departure_epoch": epoch,
+                    "is_estimated": bool(departure.get("estimated_departure_utc")),
                     "departure_note": departure.get("departure_note"),
                     "express_note": express_note,
                     "route_gtfs_id": route_gtfs_id,
@@ -184,16 +405,29 @@ class TrainStop:
         try:
             interchange = run.get("interchange") or {}
             distributor = interchange.get("distributor")
-            stops = self._get_stops_for_run(run["run_id"])
+            stops = (
+                self._get_static_stops_for_run(run.get("run_ref"), run.get("route_id"))
+                or self._get_stops_for_run(run["run_id"])
+            )
 
             if distributor and distributor.get("advertised"):
-                second_leg = self._get_stops_for_run(distributor['run_ref'])
+                second_leg = (
+                    self._get_static_stops_for_run(distributor['run_ref'], distributor.get("route_id"))
+                    or self._get_stops_for_run(distributor['run_ref'])
+                )
                 stops.extend(second_leg)
             
             start_index = next(
                 (i for i, stop in enumerate(stops) if stop["stop_id"] == str(self.stop_id)), 
                 None
             )
+            if start_index is None:
+                # Static patterns use GTFS station IDs, so match on name
+                own_name = self.name.replace(" Station", "")
+                start_index = next(
+                    (i for i, stop in enumerate(stops) if stop["name"] == own_name and not stop["is_skipped"]),
+                    None
+                )
             
             if start_index is None:
                 logger.warning(f"Start stop {self.stop_id} not found in route")
@@ -212,6 +446,8 @@ class TrainStop:
 
             stops[-1]["is_terminus"] = True
             stops = self._chunk_stops(stops, 7)
+            if self._cache:
+                self._cache.put(self._cache_key("pid_stops", run["run_id"]), stops)
             return stops
 
         except Exception as e:
@@ -246,6 +482,33 @@ class TrainStop:
 
         return chunks
         
+    def _get_static_stops_for_run(self, run_ref, route_id=None) -> List[Dict[str, Any]]:
+        """
+        Return the ordered stop list for a run from the precomputed static
+        GTFS stop patterns, without an API call.
+
+        Args:
+            run_ref: PTV run reference (train run number)
+            route_id: Optional PTV route ID, used to pick the right line
+
+        Returns:
+            List of stops in order for this run, or an empty list if the
+            patterns aren't available or don't know the run
+        """
+        patterns = get_stop_patterns()
+        if patterns is None or not run_ref:
+            return []
+
+        route_gtfs_id = next(
+            (r.get("route_gtfs_id") for r in self.routes if r.get("route_id") == route_id),
+            None
+        )
+        days = ServiceCalendar.service_days(datetime.now(tz))
+        trip_id = patterns.trip_for_run(run_ref, route_gtfs_id, days)
+        if trip_id is None:
+            return []
+        return [dict(stop) for stop in patterns.pid_stops(trip_id)]
+
     def _get_stops_for_run(self, run_id: int) -> List[Dict[str, Any]]:
         """
         Return ordered list of stop dicts with keys: name, is_skipped, is_terminus, stop_id
@@ -414,4 +677,89 @@ class TrainStop:
 
         return filtered
 
-    
\ No newline at end of file
+
+class DepartureView:
+    """
+    One list of departures a panel wants from a stop: a platform and/or
+    route filter, a length, and whether the next run is returned with it.
+    """
+
+    def __init__(self,
+                 stop: TrainStop,
+                 n_departures: int,
+                 platform: Optional[List[str]] = None,
+                 route_ids: Optional[List[int]] = None,
+                 return_next_run: bool = False):
+        self.stop = stop
+        self.n_departures = n_departures
+        self.platform = platform
+        self.route_ids = route_ids
+        self.return_next_run = return_next_run
+
+
+def fetch_departures_many(stops: Iterable[TrainStop],
+                          max_results: int = config.BATCH_MAX_RESULTS
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch unfiltered departures for several stops with one request each.
+
+    Duplicate stops are fetched once, and distinct stops concurrently (up to
+    ``config.BATCH_FETCH_WORKERS``), so a panel spanning several stops waits
+    for the slowest request rather than the sum of them.
+
+    :param stops: Stops to refresh
+    :param max_results: ``max_results`` passed to the API for every stop
+    :return: Dict of stop ID to departures response (None on error)
+    """
+    unique: Dict[str, TrainStop] = {}
+    for stop in stops:
+        unique.setdefault(str(stop.stop_id), stop)
+    if len(unique) <= 1:
+        return {key: stop.fetch_departures(max_results) for key, stop in unique.items()}
+
+    workers = min(len(unique), config.BATCH_FETCH_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="departures") as pool:
+        results = pool.map(lambda stop: stop.fetch_departures(max_results), unique.values())
+        return dict(zip(unique.keys(), results))
+
+
+def get_departures_batch(views: List[DepartureView],
+                         max_results: int = config.BATCH_MAX_RESULTS
+) -> List[Tuple[List[Optional[Dict[str, Any]]], Any]]:
+    """
+    Departures for several views of one or more stops, with the fewest PTV
+    calls.
+
+    Rather than one platform-filtered request per view, every stop is
+    fetched once unfiltered and each view is cut from that response locally
+    by platform and route. At a busy station ``max_results`` can cut the
+    unfiltered response off before a narrow view fills; such a view is
+    fetched again on its own, with the platform filter applied by the API
+    and ``max_results`` scaled for its routes.
+
+    :param views: The views to build
+    :param max_results: Minimum ``max_results`` for each stop's request
+    :return: ``(departures, next_run)`` per view, in order, as returned by
+        ``TrainStop.get_next_departures``
+    """
+    if not views:
+        return []
+    max_results = max([max_results] + [view.n_departures for view in views])
+    responses = fetch_departures_many((view.stop for view in views), max_results)
+
+    built = []
+    for view in views:
+        stop = view.stop
+        result = responses[str(stop.stop_id)]
+        departures, next_run = stop.build_departures(
+            result, view.n_departures, view.platform, view.return_next_run, view.route_ids,
+        )
+        if (view.platform or view.route_ids) and stop.view_came_up_short(
+                result, departures, view.n_departures, max_results):
+            result = stop.fetch_departures(stop.view_max_results(max_results, view.route_ids), view.platform)
+            if result is not None:
+                departures, next_run = stop.build_departures(
+                    result, view.n_departures, view.platform, view.return_next_run, view.route_ids,
+                )
+        built.append((departures, next_run))
+    return built
@@ -2,14 +2,17 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 import os
 import re
+import time
 import logging
+import threading
 import api.gtfs
 
 import pytz
 from collections import defaultdict
 
-from api.ptv_api import send_ptv_request
-from utils import parse_departure_time
+from api.ptv_api import send_ptv_request, send_ptv_request_with_age
+from utils import format_departure_times, departure_epoch
+from data.snapshot_cache import get_cache
 import config
 
 logger = logging.getLogger("ptv_display")
@@ -19,11 +22,13 @@ class TramStop:
     """
     Represents a PTV tram stop and provides departure lookup functionality.
     """
-    def __init__(self, stop_id):
+    def __init__(self, stop_id, resolve: bool = True):
         """
         Initialise a Stop object and resolve it against the PTV API.
 
         :param name: User-provided stop name
+        :param resolve: Resolve metadata now (from the cache or API). Pass False
+            when the caller resolves it itself, e.g. the async client.
         :raises ValueError: If stop cannot be resolved
         """
 
@@ -42,8 +47,86 @@ class TramStop:
 
         # Non-metadata
         self.stop_id_gtfs: Optional[str] = None
+        self.last_fetch_ok = True
+        self.last_fetch_age: Optional[float] = None
+        self.last_fetch_at: Optional[float] = None
 
-        self.resolve_stop()
+        # Snapshot cache for warm starts
+        self._cache = get_cache()
+        self._last_snapshot = 0.0
+
+        if resolve and not self._load_cached_stop():
+            self.resolve_stop()
+
+    def _cache_key(self, kind: str) -> str:
+        return f"{kind}:{config.route_type_tram}:{self.stop_id}"
+
+    def _load_cached_stop(self) -> bool:
+        """
+        Populate metadata from the snapshot cache, if present, and refresh it
+        from the API in the background.
+
+        :return: True if cached metadata was applied
+        """
+        cached = self._cache.get(self._cache_key("stop")) if self._cache else None
+        if not cached:
+            return False
+        try:
+            self._apply_stop(cached)
+        except (KeyError, TypeError):
+            return False
+
+        logger.info(f'Loaded tram stop {self.stop_id} from cache, refreshing in background')
+        threading.Thread(target=self._refresh_stop, daemon=True).start()
+        return True
+
+    def _refresh_stop(self) -> None:
+        try:
+            self.resolve_stop()
+        except Exception as e:
+            logger.warning(f"Background refresh of tram stop {self.stop_id} failed: {str(e)}")
+
+    def _apply_stop(self, tram_stop: Dict[str, Any]) -> None:
+        """
+        Populate metadata from a ``stop`` object returned by the API.
+
+        Fields are read first and swapped in with one dict update, so a
+        frame drawing during the background refresh sees all old or all new.
+        """
+        metadata = {
+            "route_type": tram_stop['route_type'],
+            "name": tram_stop['stop_name'],
+            "routes": tram_stop.get('routes', []),
+            "stop_suburb": tram_stop.get('stop_suburb'),
+            "stop_latitude": tram_stop.get('stop_latitude'),
+            "stop_longitude": tram_stop.get('stop_longitude'),
+            "stop_sequence": tram_stop.get('stop_sequence'),
+            "stop_landmark": tram_stop.get('stop_landmark'),
+        }
+        self.__dict__.update(metadata)
+
+    def stop_endpoint(self) -> str:
+        """API endpoint for this stop's metadata."""
+        return (
+            f"/v3/stops/{self.stop_id}/route_type/{config.route_type_tram}"
+            f"?stop_location=true&stop_amenities=true&stop_accessibility=true"
+            f"&stop_contact=true&stop_ticket=true&stop_staffing=true&stop_disruptions=true"
+        )
+
+    def apply_stop_response(self, result: Optional[Dict[str, Any]]) -> None:
+        """
+        Populate metadata from a stop response and cache it.
+
+        :raises ValueError: If the response has no stop
+        :raises KeyError: If required fields are missing
+        """
+        if not result:
+            raise ValueError(f"Could not resolve tram stop {self.stop_id}")
+        tram_stop = result['stop']
+        # Populate Metadata
+        self._apply_stop(tram_stop)
+        if self._cache:
+            self._cache.put(self._cache_key("stop"), tram_stop)
 
     def resolve_stop(self) -> None:
         """
@@ -55,28 +138,16 @@ class TramStop:
 
         try:   
             # Resolve Tram
-            endpoint = (
-                f"/v3/stops/{self.stop_id}/route_type/{config.route_type_tram}"
-                f"?stop_location=true&stop_amenities=true&stop_accessibility=true"
-                f"&stop_contact=true&stop_ticket=true&stop_staffing=true&stop_disruptions=true"
-            )
-            result = send_ptv_request(endpoint)
-            tram_stop = result['stop']
-            # Populate Metadata
-            self.route_type = tram_stop['route_type']
-            self.name = tram_stop['stop_name']
-            self.routes = tram_stop.get('routes', [])
-            self.stop_suburb = tram_stop.get('stop_suburb')
-            self.stop_latitude = tram_stop.get('stop_latitude')
-            self.stop_longitude = tram_stop.get('stop_longitude')
-            self.stop_sequence = tram_stop.get('stop_sequence')
-            self.stop_landmark = tram_stop.get('stop_landmark')
+            result = send_ptv_request(self.stop_endpoint())
+            self.apply_stop_response(result)
         
         except KeyError as e:
             logger.error(f"Missing expected field in API response: {str(e)}")
-            raise ValueError(f"Invalid API response for stop '{self._input_name}'")
+            raise ValueError(f"Invalid API response for stop '{self.stop_id}'")
+        except ValueError:
+            raise
         except Exception as e:
-            logger.error(f"Unexpected error resolving stop '{self._input_name}': {str(e)}")
+            logger.error(f"Unexpected error resolving stop '{self.stop_id}': {str(e)}")
             raise
 
     def get_next_departures_per_route(self, n_departures: int) -> List[Dict[str, Any]]:
@@ -90,23 +161,93 @@ class TramStop:
         :param n_departures: Requested number of departures (for compatibility)
         :return: List of departure dictionaries sorted by route_number
         """
-        endpoint = (
+        result = self.fetch_departures()
+        if result is None:
+            logger.warning(f"API returned None for departures from stop {self.stop_id}")
+            return [], []
+
+        alerts = self.get_alerts(result)
+        return self.build_departures_per_route(result, n_departures), alerts
+
+    def fetch_departures(self, max_results: int = 20) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the raw departures response for this stop.
+
+        :param max_results: ``max_results`` passed to the API
+        :return: Parsed API response, or None on error
+        """
+        result, age = send_ptv_request_with_age(self.departures_endpoint(max_results))
+        self.record_departures(result, age)
+        return result
+
+    def departures_endpoint(self, max_results: int = 20) -> str:
+        """API endpoint for this stop's departures."""
+        return (
             f"/v3/departures/route_type/1/stop/{self.stop_id}"
-            f"?max_results={20}"
+            f"?max_results={max_results}"
             f"&expand=0"
         )
 
-        result = send_ptv_request(endpoint)
+    def record_departures(self, result: Optional[Dict[str, Any]], age: Optional[float]) -> None:
+        """
+        Record the outcome of a departures fetch and snapshot fresh responses.
+
+        :param result: Parsed response, or None on error
+        :param age: Response age in seconds (0 for fresh)
+        """
+        now = time.time()
+        self.last_fetch_ok = result is not None and not age
+        self.last_fetch_age = age
+        self.last_fetch_at = now
+        if self._cache and self.last_fetch_ok and now - self._last_snapshot >= config.CACHE_SNAPSHOT_INTERVAL:
+            self._cache.put(self._cache_key("departures"), result)
+            self._last_snapshot = now
+
+    def get_cached_departures_per_route(self, n_departures: int):
+        """
+        Build departures and alerts from the last snapshot in the cache,
+        without any network access.
+
+        :return: Same as ``get_next_departures_per_route``; empty if nothing is cached
+        """
+        if not self._cache:
+            return [], []
+        result = self._cache.get(self._cache_key("departures"))
         if result is None:
-            logger.warning(f"API returned None for departures from stop {self.stop_id}")
+            return [], []
+        alerts = self._cache.get(self._cache_key("alerts")) or []
+        return self.build_departures_per_route(result, n_departures), alerts
+
+    def get_alerts(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Fetch service alerts for the routes in a departures response.
+
+        :param result: Response from ``fetch_departures``
+        :return: List of alert dictionaries
+        """
+        try:
+            service_updates = api.gtfs.tram_service_updates(self.route_numbers(result))
+        except Exception as e:
+            logger.error(f"Failed to fetch tram service alerts: {str(e)}")
             return []
-    
+        return self.apply_service_updates(service_updates)
+
+    @staticmethod
+    def route_numbers(result: Dict[str, Any]) -> List[str]:
+        """Route numbers serving this stop, from a departures response."""
         # disruptions
         # get route numbers
-        routes = result.get("routes", []) 
-        route_numbers = [info['route_number'] for info in routes.values()]
-        service_updates = api.gtfs.tram_service_updates(route_numbers)
+        routes = result.get("routes", {}) 
+        return [info['route_number'] for info in routes.values()]
 
+    def apply_service_updates(self, service_updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convert service updates for this stop's routes into display alerts
+        and cache them.
+
+        :param service_updates: Output of ``api.gtfs.tram_service_updates``
+        :return: List of alert dictionaries
+        """
         alerts = []
         for service_update in service_updates:
             alerts.append({
@@ -114,9 +255,27 @@ class TramStop:
                 "description": service_update['description'],
                 "url": service_update['url']
             })
+        if self._cache:
+            self._cache.put(self._cache_key("alerts"), alerts)
+        return alerts
 
+    def build_departures_per_route(self, result: Dict[str, Any], n_departures: int) -> List[Dict[str, Any]]:
+        """
+        Build display departures from a raw departures response.
+
+        No network access happens here, so one response can be shared by
+        several views of the same stop.
+
+        :param result: Response from ``fetch_departures``
+        :param n_departures: Requested number of departures
+        :return: List of departure dictionaries sorted by route_number
+        """
         # Group Departures by route_id
-        raw_departures = result.get('departures', [])
+        # Drop services that have already left (a stale response may hold some)
+        cutoff = time.time() - 60
+        raw_departures = [
+            d for d in result.get('departures', []) if (departure_epoch(d) or cutoff) >= cutoff
+        ]
         grouped_departures = defaultdict(list)
         for dep in raw_departures:
             grouped_departures[dep['route_id']].append(dep)
@@ -159,17 +318,12 @@ class TramStop:
             selected_departures.append(grouped_departures[earliest_route_id].pop(0))
 
         directions = result.get("directions", {}) or {}
-        now_local = datetime.now(tz)
+        times = format_departure_times(selected_departures, time.time(), unit="")
 
         # Build the departures list with full details
         departures_list: List[Dict[str, Any]] = []
         
-        for departure in selected_departures:
-            departure_time, time_to_departure = parse_departure_time(
-                departure=departure,
-                now_local=now_local,
-            )
-            time_to_departure = time_to_departure.replace(" min", "")
+        for departure, (departure_time, time_to_departure, epoch) in zip(selected_departures, times):
             direction_id = departure.get("direction_id")
             run_id = departure.get("run_id")
             direction_info = directions.get(str(direction_id), {})
@@ -191,6 +345,8 @@ class TramStop:
                     "destination": destination,
                     "departure_time": departure_time,
                     "time_to_departure": time_to_departure,
+                    "departure_epoch": epoch,
+                    "is_estimated": bool(departure.get("estimated_departure_utc")),
                     "departure_note": departure.get("departure_note"),
                     "route_gtfs_id": route_gtfs_id,
                     "route_number": route_number,
@@ -203,7 +359,7 @@ class TramStop:
         # Sort by route_id so routes are grouped together on display
         departures_list.sort(key=lambda x: int(x["route_number"]) if x["route_number"].isdigit() else float('inf'))
             
-        return departures_list, alerts
+        return departures_list
 
 
     @staticmethod
@@ -0,0 +1,137 @@
+""" Frame pacing: clock ticks on second boundaries, events and state checks in between """
+import logging
+import math
+import time
+from typing import Any, Dict, List, Tuple
+
+import pygame
+
+import config
+
+logger = logging.getLogger("ptv_display")
+
+TICK = "tick"
+EVENT = "event"
+POLL = "poll"
+
+
+class FramePacer:
+    """
+    Decides when the display loop wakes.
+
+    The loop used to sleep a whole frame in ``clock.tick``, so the clock
+    drifted against the wall clock and input and state changes waited up to
+    a second. Instead the pacer:
+
+    - wakes on wall-clock period boundaries (every whole second at
+      ``config.FPS = 1``) so the clock region changes exactly when the time
+      does (``TICK``),
+    - returns as soon as a pygame event arrives (``EVENT``),
+    - and otherwise wakes every ``poll_interval`` so the loop can notice
+      display state changes from the web server (``POLL``).
+
+    It records how late each tick woke (drift), how much work the loop did
+    per wake by reason, and what kind of redraw each wake needed.
+    """
+
+    def __init__(self, period: float = 1 / config.FPS, poll_interval: float = config.FRAME_POLL_INTERVAL):
+        self.period = period
+        self.poll_interval = poll_interval
+        self.next_tick = self._boundary_after(time.time())
+        self._woke_at = None
+        self._reason = None
+        self.reset_stats()
+
+    def _boundary_after(self, now: float) -> float:
+        return (math.floor(now / self.period) + 1) * self.period
+
+    def reset_stats(self) -> None:
+        self.stats_since = time.time()
+        self.wakes = {TICK: 0, EVENT: 0, POLL: 0}
+        self.work = {TICK: 0.0, EVENT: 0.0, POLL: 0.0}
+        self.max_work = {TICK: 0.0, EVENT: 0.0, POLL: 0.0}
+        self.drift_total = 0.0
+        self.drift_max = 0.0
+        self.missed_ticks = 0
+        self.draws = {"full": 0, "clock": 0, "none": 0}
+
+    def wait(self) -> Tuple[str, List[Any], float]:
+        """
+        Block until the next tick, event or poll.
+
+        Returns:
+            ``(reason, events, now)``, where ``events`` are the pygame
+            events received (always drained on ticks) and ``now`` is the
+            wake time in epoch seconds.
+        """
+        self._end_work()
+        while True:
+            now = time.time()
+            remaining = self.next_tick - now
+            if remaining <= 0:
+                drift = -remaining
+                self.drift_total += drift
+                self.drift_max = max(self.drift_max, drift)
+                following = self._boundary_after(now)
+                self.missed_ticks += int(round((following - self.next_tick) / self.period)) - 1
+                self.next_tick = following
+                return self._wake(TICK, pygame.event.get(), now)
+
+            if remaining < 0.002:
+                # Finer than event.wait's millisecond timeout
+                time.sleep(remaining)
+                continue
+
+            timeout = min(remaining, self.poll_interval)
+            event = pygame.event.wait(max(1, int(timeout * 1000)))
+            if event.type != pygame.NOEVENT:
+                return self._wake(EVENT, [event] + pygame.event.get(), time.time())
+            if timeout < remaining:
+                return self._wake(POLL, [], time.time())
+
+    def _wake(self, reason: str, events: List[Any], now: float) -> Tuple[str, List[Any], float]:
+        self._reason = reason
+        self._woke_at = time.perf_counter()
+        self.wakes[reason] += 1
+        return reason, events, now
+
+    def _end_work(self) -> None:
+        if self._woke_at is None:
+            return
+        spent = time.perf_counter() - self._woke_at
+        self.work[self._reason] += spent
+        self.max_work[self._reason] = max(self.max_work[self._reason], spent)
+        self._woke_at = None
+
+    def record_draw(self, kind: str) -> None:
+        """Count a wake's redraw: ``full``, ``clock`` or ``none``."""
+        self.draws[kind] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        ticks = self.wakes[TICK]
+        return {
+            "seconds": time.time() - self.stats_since,
+            "wakes": dict(self.wakes),
+            "missed_ticks": self.missed_ticks,
+            "drift_mean_ms": self.drift_total / ticks * 1000 if ticks else 0.0,
+            "drift_max_ms": self.drift_max * 1000,
+            "work_mean_ms": {
+                reason: self.work[reason] / count * 1000 if count else 0.0
+                for reason, count in self.wakes.items()
+            },
+            "work_max_ms": {reason: spent * 1000 for reason, spent in self.max_work.items()},
+            "draws": dict(self.draws),
+        }
+
+    def log_stats(self, reset: bool = True) -> None:
+        s = self.stats()
+        logger.info(
+            f"Frame pacing over {s['seconds']:.0f}s: "
+            f"{s['wakes'][TICK]} ticks ({s['missed_ticks']} missed), "
+            f"drift mean {s['drift_mean_ms']:.1f} ms max {s['drift_max_ms']:.1f} ms; "
+            f"work per tick {s['work_mean_ms'][TICK]:.1f} ms (max {s['work_max_ms'][TICK]:.1f}), "
+            f"{s['wakes'][EVENT]} event and {s['wakes'][POLL]} poll wakes; "
+            f"redraws {s['draws']['full']} full, {s['draws']['clock']} clock-only, {s['draws']['none']} skipped"
+        )
+        if reset:
+            self.reset_stats()
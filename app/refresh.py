@@ -0,0 +1,211 @@
+""" Adaptive departure refresh scheduling """
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import threading
+
+import config
+import utils
+
+logger = logging.getLogger("ptv_display")
+
+
+class RefreshScheduler:
+    """
+    Decides when a display should next poll the PTV API.
+
+    The interval is derived from how soon the next departure is, whether
+    realtime estimates are present, the recent API error rate and the local
+    time of day:
+
+    - An imminent departure with a realtime estimate polls at the minimum
+      interval, since estimates move in the last few minutes.
+    - Further out, the display polls at a fraction of the time remaining
+      (a smaller fraction when estimates are present), so a train 20 minutes
+      away is checked a handful of times rather than every 10 seconds.
+    - With no services, polling backs off exponentially up to the idle cap,
+      or the larger overnight cap between ``config.OVERNIGHT_HOURS``.
+    - Failed requests back off exponentially and a high recent error rate
+      stretches the healthy interval too.
+
+    Countdown labels are recomputed locally between polls with
+    ``utils.refresh_countdowns``, so longer intervals don't leave stale text
+    on screen.
+    """
+
+    ERROR_RATE_ALPHA = 0.3
+
+    def __init__(
+        self,
+        min_interval: float = config.REFRESH_MIN_INTERVAL,
+        max_interval: float = config.REFRESH_MAX_INTERVAL,
+        idle_interval: float = config.REFRESH_IDLE_INTERVAL,
+        overnight_interval: float = config.REFRESH_OVERNIGHT_INTERVAL,
+        imminent_horizon: float = config.REFRESH_IMMINENT_HORIZON,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_interval = idle_interval
+        self.overnight_interval = overnight_interval
+        self.imminent_horizon = imminent_horizon
+
+        self.next_refresh = 0.0
+        self.last_interval: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.consecutive_empty = 0
+
+    def force(self) -> None:
+        """Make the next call to ``due`` return True."""
+        self.next_refresh = 0.0
+
+    def defer(self, now: float, seconds: float) -> None:
+        """Set the next poll ``seconds`` after ``now``."""
+        self.next_refresh = now + seconds
+
+    def due(self, now: float) -> bool:
+        """Return True if a poll should happen at ``now`` (epoch seconds)."""
+        return now >= self.next_refresh
+
+    def is_overnight(self, now: float) -> bool:
+        """Return True if ``now`` falls in the configured overnight window."""
+        start, end = config.OVERNIGHT_HOURS
+        hour = datetime.fromtimestamp(now, utils.tz).hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def schedule(
+        self,
+        now: float,
+        departures: List[Optional[Dict[str, Any]]],
+        ok: bool = True,
+    ) -> float:
+        """
+        Record the outcome of a poll and set the time of the next one.
+
+        Args:
+            now: Time of the poll (epoch seconds).
+            departures: Departure dicts (``None`` padding allowed) carrying
+                ``departure_epoch`` and ``is_estimated``.
+            ok: False if the API request failed.
+
+        Returns:
+            The chosen interval in seconds.
+        """
+        self.error_rate += self.ERROR_RATE_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+
+        if not ok:
+            self.consecutive_failures += 1
+            interval = min(
+                self.min_interval * (2 ** self.consecutive_failures),
+                self.max_interval,
+            )
+            return self._set(now, interval)
+
+        self.consecutive_failures = 0
+        upcoming = []
+        for departure in departures:
+            if not departure:
+                continue
+            if departure.get("departure_epoch") is not None:
+                upcoming.append((departure["departure_epoch"] - now, departure.get("is_estimated", False)))
+
+        if not upcoming:
+            self.consecutive_empty += 1
+            cap = self.overnight_interval if self.is_overnight(now) else self.idle_interval
+            interval = min(self.min_interval * (2 ** (self.consecutive_empty + 1)), cap)
+            return self._set(now, interval)
+
+        self.consecutive_empty = 0
+        horizon, estimated = min(upcoming, key=lambda u: u[0])
+
+        if horizon <= self.imminent_horizon and estimated:
+            interval = self.min_interval
+        else:
+            interval = max(horizon, 0) / (3 if estimated else 2)
+
+        # Back off while the API is unhealthy, even on a successful poll.
+        interval *= 1 + 3 * self.error_rate
+        interval = max(self.min_interval, min(interval, self.max_interval))
+        return self._set(now, interval)
+
+    def _set(self, now: float, interval: float) -> float:
+        if interval != self.last_interval:
+            logger.debug(f"Next departure refresh in {interval:.0f}s")
+        self.last_interval = interval
+        self.next_refresh = now + interval
+        return interval
+
+
+class BackgroundFetch:
+    """
+    Runs a display's departure fetch on a worker thread when its
+    ``RefreshScheduler`` is due, so a slow or retrying PTV request never
+    stalls the frame.
+
+    The display calls ``poll`` from ``update`` on the render thread: it
+    starts a fetch if one is due and none is running, and hands back the
+    result of a finished one, which the display then swaps in. Nothing the
+    display draws is touched from the worker.
+    """
+
+    def __init__(self, scheduler: RefreshScheduler, fetch: Callable[..., Any], name: str = "refresh"):
+        self.scheduler = scheduler
+        self._fetch = fetch
+        self._name = name
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done: Optional[Tuple[float, Any, Optional[BaseException]]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait for a running fetch to finish, so the next ``poll`` collects it.
+        For tools that need a deterministic frame sequence, not the display loop.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def poll(self, now: float, *args) -> Optional[Tuple[float, Any]]:
+        """
+        Collect a finished fetch, or start one if the scheduler is due.
+
+        Args:
+            now: Current time (epoch seconds).
+            *args: Passed to the fetch function if one is started.
+
+        Returns:
+            ``(started, result)`` once for each fetch that finished, where
+            ``started`` is the ``now`` it was started at; otherwise None.
+
+        Raises:
+            Whatever the fetch raised, after recording it with the
+            scheduler as a failed poll so the retry backs off.
+        """
+        with self._lock:
+            done, self._done = self._done, None
+        if done is not None:
+            self._thread = None
+            started, result, error = done
+            if error is not None:
+                self.scheduler.schedule(started, [], ok=False)
+                raise error
+            return started, result
+
+        if self._thread is None and self.scheduler.due(now):
+            self._thread = threading.Thread(target=self._run, args=(now,) + args, name=self._name, daemon=True)
+            self._thread.start()
+        return None
+
+    def _run(self, started: float, *args) -> None:
+        try:
+            done = (started, self._fetch(*args), None)
+        except Exception as e:
+            done = (started, None, e)
+        with self._lock:
+            self._done = done
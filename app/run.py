@@ -1,37 +1,40 @@
 import os
-import sys
-import time
 import logging
-import threading
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 
 import pygame
 
-# Add parent directory to path for imports from server
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 import config
-from api import ptv_api
-from data import gtfs_loader
-from displays.platform import PlatformDisplay
-from displays.tram_display import TramDisplay
-from displays.default_display import DefaultDisplay
-from models.train_stop import TrainStop
-from models.tram_stop import TramStop
+import startup
+import memprofile
+from fonts import FontManager as Fonts
+from pacing import FramePacer, TICK
 
-from server.app import display_state as display_state
+# The API client, displays and stop models are imported after the splash is
+# painted (or on first use) so a power-cycled panel shows something quickly;
+# see startup.py and PTV_PROFILE_STARTUP.
 
 logger = config.setup_logging()
 app_dir = Path(__file__).resolve().parent
 
-def run_display_loop(display_state):
+def paint_splash(screen):
+    """ Paint a minimal first frame while the rest of the app loads """
+    screen.fill(config.BACKGROUND_COLOR)
+    text = Fonts.get("regular", 18).render("Starting\u2026", True, config.LIGHT_WARM_GREY)
+    screen.blit(text, text.get_rect(center=screen.get_rect().center))
+    pygame.display.flip()
+
+def run_display_loop(display_state, frame_exporter=None):
     """
     Run the main Pygame display loop.
     Runs in a separate thread from the Flask web server.
     
     Args:
-        display_state: Shared dictionary with display configuration
+        display_state: ``DisplayStateStore`` shared with the web server
+        frame_exporter: Optional ``FrameExporter`` given a copy of every
+            changed frame, for ``/api/frame.png``
     """
     try:
         # Validate Environment
@@ -60,87 +63,150 @@ def run_display_loop(display_state):
             screen = pygame.display.set_mode(config.SCREEN_RES)
             logger.info(f"Running in windowed mode ({config.SCREEN_RES[0]}x{config.SCREEN_RES[1]})")
 
-        clock = pygame.time.Clock()
-        running = True
+        paint_splash(screen)
+        startup.splash_painted(config.STARTUP_SPLASH_BUDGET)
 
-        screen.fill(config.BACKGROUND_COLOR)
+        from api import ptv_api
+        from data import gtfs_loader
+        from displays.default_display import DefaultDisplay
 
-        # Route Colour Map (hex strings)
-        try:
-            colourMap_metropolitan_train = gtfs_loader.build_colour_map(str(app_dir / "data" / "gtfs_static" / "routes.txt"))
-            colourMap_tram = gtfs_loader.build_tram_colour_map(str(app_dir / "data" / "gtfs_static" / "tram" / "routes.txt"))
-            logger.info(f"Loaded color maps: {len(colourMap_metropolitan_train)} train routes, {len(colourMap_tram)} tram routes")
-        except Exception as e:
-            logger.error(f"Failed to load color maps: {str(e)}")
-            colourMap_metropolitan_train = {}
-            colourMap_tram = {}
+        running = True
+
+        # Route colours (RGB tuples), shared by every display
+        route_styles = gtfs_loader.load_route_styles(app_dir / "data")
 
         ctx_base = {
             "ptv_api": ptv_api,
             "config": config,
+            "routeStyles": route_styles,
         }
 
         display = DefaultDisplay(ctx_base)
         display.on_show()
     
 
-        display_state['running'] = True
+        display_state.running = True
 
         logger.info(f"Display loop started")
-
-        # Main Loop
-        frame_count = 0
-        last_version = display_state.get('version', 0)
-        while running and display_state['running']:
-            now = time.time()
-            for event in pygame.event.get():
+        startup.mark("display loop started")
+        startup.log_profile(config.STARTUP_PROFILE_TOP)
+
+        # Main Loop: content updates on clock ticks, events and state
+        # changes as they arrive, full redraws only when content changes
+        pacer = FramePacer()
+        memory = memprofile.profile_from_env()
+        last_version = display_state.version
+        last_key = None
+        redraw = True
+        failed = False
+        stop = None
+        last_fetch_at = None
+        display_state.report(shown_version=last_version, display_type=type(display).__name__, stop=None, error=None)
+        while running and display_state.running:
+            reason, events, now = pacer.wait()
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                     logger.info("Quit event received")
+                display.handle_event(event)
 
-            # Check if display_state has changed
-            if display_state.get('version', 0) != last_version:
+            # Check if display_state has changed; the snapshot is one
+            # consistent selection even while requests are updating it
+            state = display_state.snapshot()
+            if state.version != last_version:
                 logger.info(f'Display state changed')
-                if display_state['transit_type'] == 'Metropolitan-Train':
-                    stop = TrainStop(display_state['stop_id'], display_state['train_platforms'])
-                    if display_state['display_type'] == 'platform':
-                        display = PlatformDisplay({**ctx_base, "stop": stop, "colourMap": colourMap_metropolitan_train}, display_state['train_platforms'])
-                        display.on_show()
-
-                elif display_state['transit_type'] == 'Tram':
-                    stop = TramStop(display_state['stop_id'])
-                    if display_state['display_type'] == 'tram_display':
-                        display = TramDisplay({**ctx_base, "stop": stop, "colourMap": colourMap_tram})
+                stop = None
+                error = None
+                try:
+                    if state.transit_type == 'Metropolitan-Train':
+                        from models.train_stop import TrainStop
+                        from displays.platform import PlatformDisplay
+                        stop = TrainStop(state.stop_id, list(state.train_platforms))
+                        if state.display_type == 'platform':
+                            display = PlatformDisplay({**ctx_base, "stop": stop}, list(state.train_platforms))
+                            display.on_show()
+
+                    elif state.transit_type == 'Tram':
+                        from models.tram_stop import TramStop
+                        from displays.tram_display import TramDisplay
+                        stop = TramStop(state.stop_id)
+                        if state.display_type == 'tram_display':
+                            display = TramDisplay({**ctx_base, "stop": stop})
+                            display.on_show()
+                    else: 
+                        display = DefaultDisplay(ctx_base)
                         display.on_show()
-                else: 
+                except Exception as e:
+                    logger.error(f"Failed to switch display: {str(e)}")
+                    error = f"Failed to switch display: {str(e)}"
+                    stop = None
                     display = DefaultDisplay(ctx_base)
                     display.on_show()
                 
-                last_version = display_state['version']
-
-            try:
-                display.update(now)
-                display.draw(screen)
-                pygame.display.flip()
-            except Exception as e:
-                logger.error(f"Error in display loop: {str(e)}")
-                screen.fill(config.BACKGROUND_COLOR)
-                pygame.display.flip()
-
-            
-
-
-            clock.tick(config.FPS)
-            frame_count += 1
-
-            if frame_count % 300 == 0:  # Every 5 minutes at 1 FPS
-                logger.debug(f"Display loop running normally ({frame_count} frames)")
+                last_version = state.version
+                last_fetch_at = None
+                redraw = True
+                display_state.report(
+                    shown_version=state.version,
+                    display_type=type(display).__name__,
+                    stop=state.stop if stop is not None else None,
+                    last_refresh=None,
+                    last_fetch_ok=None,
+                    last_fetch_age=None,
+                    error=error,
+                    error_at=time.time() if error else None,
+                )
+
+            drawn = "none"
+            # After an error, wait for the next tick (or a display switch) to retry
+            if not failed or redraw or reason == TICK:
+                try:
+                    if reason == TICK or redraw:
+                        display.update(now)
+                        if stop is not None and stop.last_fetch_at != last_fetch_at:
+                            last_fetch_at = stop.last_fetch_at
+                            display_state.report(
+                                last_refresh=last_fetch_at,
+                                last_fetch_ok=stop.last_fetch_ok,
+                                last_fetch_age=stop.last_fetch_age,
+                            )
+                    key = display.content_key()
+                    if redraw or failed or (key is None and reason == TICK) or (key is not None and key != last_key):
+                        display.draw(screen)
+                        pygame.display.flip()
+                        drawn = "full"
+                    elif reason == TICK:
+                        dirty = display.draw_clock(screen)
+                        if dirty is None:
+                            display.draw(screen)
+                            pygame.display.flip()
+                            drawn = "full"
+                        elif dirty:
+                            pygame.display.update(dirty)
+                            drawn = "clock"
+                    last_key = key
+                    redraw = failed = False
+                except Exception as e:
+                    logger.error(f"Error in display loop: {str(e)}")
+                    display_state.report(error=f"Error in display loop: {str(e)}", error_at=time.time())
+                    screen.fill(config.BACKGROUND_COLOR)
+                    pygame.display.flip()
+                    redraw = False
+                    failed = True
+            pacer.record_draw(drawn)
+            if frame_exporter is not None and drawn != "none":
+                frame_exporter.capture(screen)
+
+            if now - pacer.stats_since >= config.FRAME_STATS_INTERVAL:
+                pacer.log_stats()
+            if memory is not None and memory.due(now):
+                memory.log_sample(now)
 
     except KeyboardInterrupt:
         logger.info("Display loop: KeyboardInterrupt received")
     except Exception as e:
         logger.critical(f"Critical error in display loop: {str(e)}", exc_info=True)
     finally:
-        display_state['running'] = False
+        display_state.running = False
         pygame.quit()
         logger.info("Display loop closed")
\ No newline at end of file
@@ -0,0 +1,127 @@
+""" Pre-rendered line glyphs for stop listings """
+import pygame
+
+
+def draw_arrow(surface, container, colour, bar_width=4, arrowtip_y=10):
+    """
+    Draw the express/skip arrow pixel row by pixel row. Used to render the
+    atlas; displays should blit ``SpriteAtlas`` glyphs instead.
+
+    Args:
+        surface: Pygame surface to draw on
+        container: Pygame Rect for the stop's row
+        colour: Colour for the arrow
+        bar_width: Width of the bar (should be even)
+        arrowtip_y: Y offset for arrow tip
+    """
+    x = container.x
+    y = container.y
+    arrowtip_y = y + arrowtip_y
+
+    # Arrow tip, widening upwards
+    for row, width in enumerate((2, 4, 6, 8, 10, 8)):
+        r = pygame.Rect(0, arrowtip_y - row, width, 1)
+        r.centerx = x + bar_width // 2
+        pygame.draw.rect(surface, colour, r)
+
+    pygame.draw.rect(surface, colour, (x, y, bar_width, r.top - y))
+
+    # Arrow bottom
+    r = pygame.Rect(0, arrowtip_y + 3, 2, 1)
+    r.centerx = x + bar_width // 2
+    pygame.draw.rect(surface, colour, r)
+
+    r = pygame.Rect(0, arrowtip_y + 2, 1, 2)
+    r.x = x
+    pygame.draw.rect(surface, colour, r)
+
+    r = pygame.Rect(0, arrowtip_y + 2, 1, 2)
+    r.x = x + bar_width - 1
+    pygame.draw.rect(surface, colour, r)
+
+    pygame.draw.rect(surface, colour, (x, r.bottom, bar_width, container.bottom - r.bottom))
+
+
+class SpriteAtlas:
+    """
+    Line glyphs for one (route colour, bar width) pre-rendered into a
+    single surface.
+
+    Glyphs are drawn once with ``pygame.draw`` when the atlas is built and
+    afterwards cost one blit each, where drawing them directly takes up to a
+    dozen rect calls. Atlases are cached per colour and geometry, like
+    ``FontManager`` caches fonts.
+
+    Glyphs, each positioned by the left edge of the bar and the top of the
+    stop's row:
+        bar: full-height bar
+        bar_tick: bar with a stopping tick
+        terminus: half-height bar with a cap
+        arrow: express arrow for the first or last skipped stop
+        dots_top / dots_bottom: dotted continuation between columns
+    """
+
+    GLYPHS = ("bar", "bar_tick", "terminus", "arrow", "dots_top", "dots_bottom")
+
+    # Room left of the bar for the arrow and cap, which overhang it
+    MARGIN = 8
+
+    _cache = {}
+
+    @classmethod
+    def get(cls, colour, bar_width=4, stop_h=15, v_padding=7, tick=(3, 2), arrowtip_y=10):
+        """Get the atlas for a colour and geometry, rendering it on first use."""
+        key = (tuple(colour), bar_width, stop_h, v_padding, tuple(tick), arrowtip_y)
+        atlas = cls._cache.get(key)
+        if atlas is None:
+            atlas = cls._cache[key] = cls(*key)
+        return atlas
+
+    @classmethod
+    def clear(cls):
+        cls._cache.clear()
+
+    def __init__(self, colour, bar_width, stop_h, v_padding, tick, arrowtip_y):
+        self.colour = colour
+        self.bar_width = bar_width
+        self.stop_h = stop_h
+        self.v_padding = v_padding
+
+        cell_w = self.MARGIN * 2 + bar_width + tick[0]
+        cell_h = max(stop_h, v_padding)
+        self.surface = pygame.Surface((cell_w * len(self.GLYPHS), cell_h), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        self.rects = {
+            name: pygame.Rect(i * cell_w, 0, cell_w, cell_h)
+            for i, name in enumerate(self.GLYPHS)
+        }
+
+        for name, cell in self.rects.items():
+            x = cell.x + self.MARGIN
+            row = pygame.Rect(x, 0, bar_width, stop_h)
+            if name in ("bar", "bar_tick"):
+                pygame.draw.rect(self.surface, colour, row)
+                if name == "bar_tick":
+                    r = pygame.Rect(0, 0, tick[0], tick[1])
+                    r.centery = row.centery
+                    r.x = x + bar_width
+                    pygame.draw.rect(self.surface, colour, r)
+            elif name == "terminus":
+                r = pygame.Rect(0, 0, 9, 3)
+                r.center = row.center
+                pygame.draw.rect(self.surface, colour, r)
+                pygame.draw.rect(self.surface, colour, (x, 0, bar_width, round(stop_h / 2)))
+            elif name == "arrow":
+                draw_arrow(self.surface, row, colour, bar_width, arrowtip_y)
+            elif name == "dots_top":
+                pygame.draw.rect(self.surface, colour, (x, 0, bar_width, 2))
+                pygame.draw.rect(self.surface, colour, (x, 3, bar_width, 2))
+                pygame.draw.rect(self.surface, colour, (x, 6, bar_width, v_padding - 6))
+            elif name == "dots_bottom":
+                pygame.draw.rect(self.surface, colour, (x, 0, bar_width, v_padding - 6))
+                pygame.draw.rect(self.surface, colour, (x, v_padding - 5, bar_width, 2))
+                pygame.draw.rect(self.surface, colour, (x, v_padding - 2, bar_width, 2))
+
+    def blit(self, surface, name, x, y):
+        """Blit a glyph with its bar's left edge at ``x`` and its top at ``y``."""
+        surface.blit(self.surface, (x - self.MARGIN, y), self.rects[name])
@@ -0,0 +1,163 @@
+""" Startup timing: boot clock, splash signal and an optional per-module import profile """
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Imported first by the entry point, so this is as close to process start as Python code gets
+PROCESS_START = time.perf_counter()
+
+logger = logging.getLogger("ptv_display")
+
+_marks: List[Tuple[str, float]] = []
+_splash = threading.Event()
+
+
+def elapsed() -> float:
+    """Seconds since the process started."""
+    return time.perf_counter() - PROCESS_START
+
+
+def mark(name: str) -> float:
+    """Record a named boot milestone and return its time since process start."""
+    at = elapsed()
+    _marks.append((name, at))
+    logger.info(f"Startup: {name} at {at * 1000:.0f} ms")
+    return at
+
+
+def marks() -> List[Tuple[str, float]]:
+    return list(_marks)
+
+
+def splash_painted(budget: float) -> None:
+    """
+    Record that the first frame is on screen and release anyone waiting
+    on ``wait_for_splash``.
+
+    Args:
+        budget: Target seconds from process start; a warning is logged when
+            the splash took longer.
+    """
+    at = mark("splash painted")
+    if at > budget:
+        logger.warning(f"Splash took {at * 1000:.0f} ms, over the {budget * 1000:.0f} ms startup budget")
+    _splash.set()
+
+
+def wait_for_splash(timeout: float) -> bool:
+    """Block until the splash is painted or ``timeout`` seconds pass."""
+    return _splash.wait(timeout)
+
+
+class ImportProfiler:
+    """
+    Meta-path hook timing every module import.
+
+    Each found module's loader is wrapped so ``exec_module`` is timed.
+    Cumulative time includes the module's own imports; self time excludes
+    them, which is what points at the modules worth deferring. The real
+    loader is put back on the module once it has executed.
+    """
+
+    def __init__(self):
+        self.cumulative: Dict[str, float] = {}
+        self.self_time: Dict[str, float] = {}
+        self._local = threading.local()
+
+    # MetaPathFinder protocol
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(self, spec.loader)
+                return spec
+        return None
+
+    def invalidate_caches(self):
+        pass
+
+    def _exec(self, loader, module) -> None:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        name = module.__name__
+        stack.append(0.0)  # time spent in nested imports
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += total
+            self.cumulative[name] = total
+            self.self_time[name] = total - nested
+            module.__loader__ = loader
+            if getattr(module, "__spec__", None) is not None:
+                module.__spec__.loader = loader
+
+    def install(self) -> "ImportProfiler":
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def top(self, n: int = 20, by_self: bool = True) -> List[Tuple[str, float, float]]:
+        """The ``n`` slowest imports as ``(module, self_s, cumulative_s)``."""
+        key = self.self_time if by_self else self.cumulative
+        names = sorted(key, key=key.get, reverse=True)[:n]
+        return [(name, self.self_time[name], self.cumulative[name]) for name in names]
+
+    def report(self, n: int = 20) -> str:
+        lines = [f"{'self ms':>9} {'cumul ms':>9}  module"]
+        for name, own, total in self.top(n):
+            lines.append(f"{own * 1000:9.1f} {total * 1000:9.1f}  {name}")
+        lines.append(f"{len(self.cumulative)} modules imported, {sum(self.self_time.values()) * 1000:.0f} ms total")
+        return "\n".join(lines)
+
+
+class _TimedLoader:
+    """Loader proxy that reports ``exec_module`` timings to an ``ImportProfiler``."""
+
+    def __init__(self, profiler: ImportProfiler, loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec) if hasattr(self._loader, "create_module") else None
+
+    def exec_module(self, module):
+        self._profiler._exec(self._loader, module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+_profiler: Optional[ImportProfiler] = None
+
+def profile_from_env() -> Optional[ImportProfiler]:
+    """Install the import profiler if ``PTV_PROFILE_STARTUP`` is set."""
+    global _profiler
+    if _profiler is None and os.getenv("PTV_PROFILE_STARTUP", "").lower() in ("1", "true", "yes"):
+        _profiler = ImportProfiler().install()
+    return _profiler
+
+def get_profiler() -> Optional[ImportProfiler]:
+    return _profiler
+
+def log_profile(n: int = 20) -> None:
+    """Log boot milestones and, in profile mode, the slowest imports so far."""
+    if _profiler is None:
+        return
+    for name, at in _marks:
+        logger.info(f"Startup mark {name}: {at * 1000:.0f} ms")
+    logger.info("Startup import profile (slowest by self time):\n" + _profiler.report(n))
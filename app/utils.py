@@ -1,4 +1,7 @@
 from datetime import datetime, timezone
+from bisect import bisect_right
+from functools import lru_cache
+import calendar
 import pygame
 from typing import Any, Dict, List, Optional, Tuple
 import pytz
@@ -8,6 +11,133 @@ tz = pytz.timezone(os.getenv("TIMEZONE"))
 utc = pytz.utc
 
 
+@lru_cache(maxsize=2048)
+def parse_ptv_utc(timestamp: str) -> int:
+    """
+    Parse a PTV UTC timestamp into integer epoch seconds.
+
+    PTV always sends ``YYYY-MM-DDTHH:MM:SSZ``, which is parsed with fixed
+    slices and integer arithmetic. Anything else falls back to
+    ``datetime.fromisoformat``. Results are memoised since the same
+    timestamps come back on every poll.
+    """
+    if len(timestamp) == 20 and timestamp[10] == "T" and timestamp[19] == "Z":
+        year = int(timestamp[0:4])
+        month = int(timestamp[5:7])
+        day = int(timestamp[8:10])
+        seconds = int(timestamp[11:13]) * 3600 + int(timestamp[14:16]) * 60 + int(timestamp[17:19])
+        return _days_from_civil(year, month, day) * 86400 + seconds
+
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=utc)
+    return int(parsed.timestamp())
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    """Days since 1970-01-01 for a proleptic Gregorian date."""
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+class LocalOffsetTable:
+    """
+    UTC offset lookup for a timezone, keyed by epoch seconds.
+
+    For pytz zones with DST the zone's transition list is converted to epoch
+    seconds once and searched with ``bisect``; the interval of the last hit
+    is remembered, so consecutive lookups (a whole departures list) are a
+    range check. Zones without transitions use a single fixed offset.
+    """
+
+    def __init__(self, tzinfo):
+        transitions = getattr(tzinfo, "_utc_transition_times", None)
+        info = getattr(tzinfo, "_transition_info", None)
+        if transitions and info:
+            self._starts = [calendar.timegm(t.timetuple()) for t in transitions]
+            self._offsets = [int(i[0].total_seconds()) for i in info]
+        else:
+            offset = datetime.now(tzinfo).utcoffset()
+            self._starts = [-(2 ** 62)]
+            self._offsets = [int(offset.total_seconds()) if offset else 0]
+        self._last = (1, 0, 0)  # empty interval, forces the first search
+
+    def offset(self, epoch: int) -> int:
+        """Return the UTC offset in seconds in effect at ``epoch``."""
+        start, end, offset = self._last
+        if start <= epoch < end:
+            return offset
+
+        i = max(bisect_right(self._starts, epoch) - 1, 0)
+        start = self._starts[i]
+        end = self._starts[i + 1] if i + 1 < len(self._starts) else 2 ** 62
+        offset = self._offsets[i]
+        self._last = (start, end, offset)
+        return offset
+
+
+_local_offsets = LocalOffsetTable(tz)
+_minute_labels: Dict[int, str] = {}
+_MINUTE_LABEL_LIMIT = 4096
+
+def local_time_label(epoch: int) -> str:
+    """
+    Format epoch seconds as a local ``%I:%M%p`` label (e.g. ``"09:05am"``).
+
+    Labels are cached per local minute.
+    """
+    local_minute = (epoch + _local_offsets.offset(epoch)) // 60
+    label = _minute_labels.get(local_minute)
+    if label is None:
+        if len(_minute_labels) >= _MINUTE_LABEL_LIMIT:
+            _minute_labels.clear()
+        hour, minute = divmod(local_minute % 1440, 60)
+        label = f"{(hour % 12) or 12:02d}:{minute:02d}{'am' if hour < 12 else 'pm'}"
+        _minute_labels[local_minute] = label
+    return label
+
+def departure_epoch(departure: Dict[str, Any]) -> Optional[int]:
+    """Epoch seconds of the estimated departure if present, otherwise the scheduled one."""
+    departure_utc_str = departure.get("estimated_departure_utc") or departure.get("scheduled_departure_utc")
+    if not departure_utc_str:
+        return None
+    return parse_ptv_utc(departure_utc_str)
+
+def format_countdown(diff_seconds: float, unit: str = " min") -> str:
+    """Format a countdown in seconds as a PID label ("now" or "5 min")."""
+    if diff_seconds < 60:
+        return "now"
+    return f"{int(diff_seconds // 60)}{unit}"
+
+def format_departure_times(
+    departures: List[Dict[str, Any]],
+    now: float,
+    unit: str = " min",
+) -> List[Tuple[str, str, Optional[int]]]:
+    """
+    Format a whole list of API departures in one call.
+
+    Args:
+        departures: Departure dicts from the PTV API.
+        now: Current time in epoch seconds.
+        unit: Suffix for countdown minutes.
+
+    Returns:
+        A list of ``(departure_time_str, time_to_departure_str, epoch)``
+        tuples, one per departure.
+    """
+    formatted = []
+    for departure in departures:
+        epoch = departure_epoch(departure)
+        if epoch is None:
+            formatted.append(("--:--", "-", None))
+        else:
+            formatted.append((local_time_label(epoch), format_countdown(epoch - now, unit), epoch))
+    return formatted
+
 def parse_departure_time(
     departure: Dict[str, Any],
     now_local: datetime,
@@ -23,68 +153,106 @@ def parse_departure_time(
         A tuple of:
             (departure_time_str, time_to_departure_str)
     """
-    scheduled_utc_str: Optional[str] = departure.get("scheduled_departure_utc")
-    estimated_utc_str: Optional[str] = departure.get("estimated_departure_utc")
-
-    if not scheduled_utc_str and not estimated_utc_str:
-        return "--:--", "-"
-
-    # Prefer estimated time when present.
-    departure_utc_str = estimated_utc_str or scheduled_utc_str
-
-    # Parse ISO string and normalize to UTC tz-aware datetime.
-    departure_utc = datetime.fromisoformat(departure_utc_str.replace("Z", "+00:00"))
-    departure_utc = departure_utc.replace(tzinfo=utc)
-
-    # Convert to local timezone.
-    departure_local = departure_utc.astimezone(tz)
-
-    # Compute countdown label.
-    diff_seconds = (departure_local - now_local).total_seconds()
+    departure_time, time_to_departure, _ = format_departure_times(
+        [departure], now_local.timestamp()
+    )[0]
+    return departure_time, time_to_departure
 
-    if diff_seconds < 60:
-        time_to_departure = "now"
-    else:
-        mins = int(diff_seconds // 60)
-        time_to_departure = f"{mins} min"
+def refresh_countdowns(departures: List[Optional[Dict[str, Any]]], now: float, unit: str = " min") -> None:
+    """
+    Recompute ``time_to_departure`` labels in place from each departure's
+    ``departure_epoch`` field, so countdowns stay current between API polls.
+    """
+    for departure in departures:
+        if not departure or departure.get("departure_epoch") is None:
+            continue
+        departure["time_to_departure"] = format_countdown(departure["departure_epoch"] - now, unit)
 
-    departure_time = departure_local.strftime("%I:%M%p").lower()
-    return departure_time, time_to_departure
+@lru_cache(maxsize=4096)
+def _text_width(font, text):
+    return font.size(text)[0]
 
 def wrap_text(text, font, width):
     """Wrap text to fit inside a given width when rendered.
 
+    Results are memoised per (text, font, width), so calling this every
+    frame for unchanged text costs a dict lookup.
+
     :param text: The text to be wrapped.
     :param font: The font the text will be rendered in.
     :param width: The width to wrap to.
 
     """
+    return list(_wrap_text(text, font, width))
+
+@lru_cache(maxsize=256)
+def _wrap_text(text, font, width):
     text_lines = text.replace('\t', '    ').split('\n')
     if width is None or width == 0:
-        return text_lines
+        return tuple(text_lines)
 
     wrapped_lines = []
     for line in text_lines:
-        line = line.rstrip() + ' '
-        if line == ' ':
-            wrapped_lines.append(line)
-            continue
+        wrapped_lines.extend(_wrap_line(line, font, width))
+    return tuple(wrapped_lines)
+
+def _wrap_line(line, font, width):
+    """
+    Greedily break one paragraph at spaces.
+
+    Each word is measured once (widths are cached per font) and summed to
+    estimate where each line breaks, found by binary search. The estimate
+    is confirmed by measuring the line and the next candidate; kerning can
+    make summed widths differ from the real rendered width by a pixel or
+    two, so if either check fails the break is found by binary search on
+    real measurements instead.
+    """
+    line = line.rstrip() + ' '
+    if line == ' ':
+        return [line]
+
+    spaces = [i for i, c in enumerate(line) if c == ' ']
+    space_width = _text_width(font, ' ')
+    # estimates[i]: summed width of line[:spaces[i]]
+    estimates = []
+    total = 0
+    for word in line.split(' ')[:-1]:
+        total += _text_width(font, word) if word else 0
+        estimates.append(total)
+        total += space_width
+
+    def fits(base, i):
+        return font.size(line[base:spaces[i]])[0] <= width
+
+    wrapped_lines = []
+    last = len(spaces) - 1
+    # Leftmost space ignoring leading whitespace
+    start = bisect_right(spaces, len(line) - len(line.lstrip()) - 1)
+    base = 0
+    base_estimate = 0
+    while start < last:
+        # Furthest candidate break whose estimated width fits
+        end = bisect_right(estimates, base_estimate + width, start + 1, last + 1) - 1
+        if not ((end == start or fits(base, end)) and (end == last or not fits(base, end + 1))):
+            lo, hi = start + 1, last
+            end = start
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                if fits(base, mid):
+                    end, lo = mid, mid + 1
+                else:
+                    hi = mid - 1
+        if end == last:
+            start = end
+            break
+        wrapped_lines.append(line[base:spaces[end]])
+        base = spaces[end] + 1
+        base_estimate = estimates[end] + space_width
+        start = end + 1
 
-        # Get the leftmost space ignoring leading whitespace
-        start = len(line) - len(line.lstrip())
-        start = line.index(' ', start)
-        while start + 1 < len(line):
-            # Get the next potential splitting point
-            next = line.index(' ', start + 1)
-            if font.size(line[:next])[0] <= width:
-                start = next
-            else:
-                wrapped_lines.append(line[:start])
-                line = line[start+1:]
-                start = line.index(' ')
-        line = line[:-1]
-        if line:
-            wrapped_lines.append(line)
+    line = line[base:-1]
+    if line:
+        wrapped_lines.append(line)
     return wrapped_lines
 
 
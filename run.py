@@ -6,6 +6,11 @@ Starts both the web server and the display in separate threads.
 
 import os
 import sys
+
+# Add app directory to path, and start the boot clock before anything heavy is imported
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+import startup
+
 import threading
 import time
 import logging
@@ -16,6 +21,10 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# PTV_PROFILE_STARTUP=1 logs per-module import times once the display is up
+startup.profile_from_env()
+import config
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,9 +32,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger('ptv_display_main')
 
-# Add app directory to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
-
 # Global flag for shutdown
 shutdown_event = threading.Event()
 
@@ -36,40 +42,27 @@ def signal_handler(signum, frame):
 
 def get_display_config():
     """
-    Return default display_state - controlled via webpage only.
+    Return the default display state store - controlled via webpage only.
     """
-    display_state = {
-        'stop': False,
-        'stop_id': None,
-        'transit_type': False,
-        'display_type': 'default_display',
-        'train_platforms': [],
-        'running': False,
-        'version': 0,
-    }
+    from server.state import DisplayStateStore
+    display_state = DisplayStateStore()
     
     logger.info("Display state initialized - awaiting webpage control")
     return display_state
 
-def start_flask_server(display_state):
+def start_flask_server(display_state, frame_exporter):
     """Start Flask web server in a separate thread."""
     try:
         from server.app import app
         
-        # Share the display_state with Flask app
+        # Share the display_state and rendered frames with Flask app
         import server.app as server_app
         server_app.display_state = display_state
+        server_app.frame_exporter = frame_exporter
         
-        logger.info("Starting Flask web server on http://0.0.0.0:5000")
-        
-        # Run Flask with threading enabled
-        app.run(
-            host='0.0.0.0',
-            port=5000,
-            debug=True,
-            use_reloader=False,
-            threaded=True
-        )
+        # Production WSGI server unless WEB_SERVER=dev (see server/serving.py)
+        from server.serving import serve
+        serve(app, host='0.0.0.0', port=5000)
     except ImportError as e:
         logger.error(f"Failed to import Flask server: {e}")
         logger.error("Make sure Flask is installed: pip install -r requirements.txt")
@@ -78,12 +71,12 @@ def start_flask_server(display_state):
     finally:
         shutdown_event.set()
 
-def start_display_loop(display_state):
+def start_display_loop(display_state, frame_exporter):
     """Start display loop in a separate thread."""
     try:
         from app.run import run_display_loop
         logger.info("Starting display loop")
-        run_display_loop(display_state)
+        run_display_loop(display_state, frame_exporter)
     except ImportError as e:
         logger.error(f"Failed to import display loop: {e}")
     except Exception as e:
@@ -91,6 +84,19 @@ def start_display_loop(display_state):
     finally:
         shutdown_event.set()
 
+def start_fleet_loop(display_state, config_path):
+    """Start fleet mode (several panels in one process) in a separate thread."""
+    try:
+        from app.fleet import run_fleet_loop
+        logger.info(f"Starting fleet loop from {config_path}")
+        run_fleet_loop(display_state, config_path)
+    except ImportError as e:
+        logger.error(f"Failed to import fleet loop: {e}")
+    except Exception as e:
+        logger.critical(f"Fleet loop error: {e}", exc_info=True)
+    finally:
+        shutdown_event.set()
+
 def main():
     """Main entry point."""
     # Register signal handler for Ctrl+C
@@ -104,15 +110,24 @@ def main():
         logger.error("Configuration failed")
         sys.exit(1)
     
+    # Rendered frames for /api/frame.png (single-display mode only)
+    from frame_export import FrameExporter
+    frame_exporter = FrameExporter()
+
     # Create threads as daemons so they exit when main exits
-    flask_thread = threading.Thread(target=start_flask_server, args=(display_state,), daemon=True)
-    display_thread = threading.Thread(target=start_display_loop, args=(display_state,), daemon=True)
+    flask_thread = threading.Thread(target=start_flask_server, args=(display_state, frame_exporter), daemon=True)
+    fleet_config = os.getenv("FLEET_CONFIG")
+    if fleet_config:
+        display_thread = threading.Thread(target=start_fleet_loop, args=(display_state, fleet_config), daemon=True)
+    else:
+        display_thread = threading.Thread(target=start_display_loop, args=(display_state, frame_exporter), daemon=True)
     
     try:
         logger.info("Starting application threads...")
-        flask_thread.start()
-        time.sleep(1)  # Give Flask a moment to start
+        # The display goes first so the splash isn't competing with Flask's imports
         display_thread.start()
+        startup.wait_for_splash(config.STARTUP_WEB_WAIT)
+        flask_thread.start()
         
         logger.info("All threads started successfully")
         logger.info("Web interface available at http://localhost:5000")
@@ -123,7 +138,7 @@ def main():
             time.sleep(0.5)
         
         # Signal threads to stop
-        display_state['running'] = False
+        display_state.running = False
         
         # Wait for threads to finish (with timeout)
         logger.info("Waiting for threads to shut down...")
@@ -134,7 +149,7 @@ def main():
         logger.critical(f"Fatal error: {e}", exc_info=True)
         sys.exit(1)
     finally:
-        display_state['running'] = False
+        display_state.running = False
         logger.info("Application closed")
         sys.exit(0)
 
@@ -1,5 +1,3 @@
-from hashlib import sha1
-import hmac
 from dotenv import load_dotenv
 import os
 import requests
@@ -7,21 +5,21 @@ import logging
 from typing import Any, Dict, List, Optional
 import json
 
+# The shared signer lives in app/, which run.py puts on the path
+from api.signing import get_signer
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 devId = os.getenv("USER_ID")
 key = os.getenv("API_KEY")
-BASE_URL = "https://timetableapi.ptv.vic.gov.au"
 
 train_stop_id = os.getenv("TRAIN_STOP_ID")
 
 def getUrl(endpoint: str) -> str:
     """Generate a properly signed PTV API URL."""
-    request_str = endpoint + ('&' if '?' in endpoint else '?') + f"devid={devId}"
-    signature = hmac.new(key.encode(), request_str.encode(), sha1).hexdigest()
-    return f"{BASE_URL}{request_str}&signature={signature}"
+    return get_signer().sign(endpoint)
 
 def send_ptv_request(endpoint: str) -> Optional[Dict[str, Any]]:
     """
@@ -70,7 +68,7 @@ def get_stops(route_type_id):
     stops = []
     routes = get_routes(route_type_id)
     for route in routes["routes"]:
-        endpoint = f"/v3/stops/route/{route["route_id"]}/route_type/{route_type_id}"
+        endpoint = f"/v3/stops/route/{route['route_id']}/route_type/{route_type_id}"
         result = send_ptv_request(endpoint)
         for stop in result["stops"]:
             stops.append({
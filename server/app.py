@@ -1,23 +1,25 @@
 import os
+import sys
 import json
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response
 from pathlib import Path
 import server.gtfs as gtfs
+from server.state import DisplayStateStore
+from server.events import broadcaster
 
+# The stop index lives in app/, which uses top-level imports
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import config
 
 app = Flask(__name__, template_folder='templates', static_folder='static', static_url_path='/static')
 
 
-# Global State - shared with display process
-display_state = {
-    'stop': False,
-    'stop_id': None,
-    'transit-type': False,
-    'display-type': 'default_display',
-    'train_platforms': [],
-    'running': True,
-    'version': 0,
-    }
+# Global State - shared with display process (run.py replaces it with its own store)
+display_state = DisplayStateStore()
+
+# Rendered frames from the display loop, set by run.py (None when not running)
+frame_exporter = None
 
 @app.route('/')
 def index():
@@ -34,6 +36,102 @@ def api_stops():
         data = json.load(fh)
     return jsonify(data)
 
+@app.route('/api/stops/near')
+def api_stops_near():
+    """
+    Train stations near a point, nearest first.
+
+    Query args: ``lat``, ``lon``, optional ``k`` (default 5, max 50) and
+    ``radius`` in km. With ``radius`` every station inside it is returned
+    (up to ``k``). Each station includes its platforms and, where the name
+    matches, the PTV ``stop_id`` used by ``/api/send-to-display``.
+    """
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        k = min(int(request.args.get('k', 5)), 50)
+        radius = request.args.get('radius')
+        radius = float(radius) if radius else None
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lon are required numbers; k and radius are optional numbers'}), 400
+
+    from data.stop_index import get_stop_index
+    index = get_stop_index()
+    if index is None:
+        return jsonify({'error': 'stop index unavailable'}), 503
+
+    if radius is not None:
+        stations = index.stations_within(lat, lon, radius)[:k]
+    else:
+        stations = index.nearest_stations(lat, lon, k)
+
+    ptv_ids = _ptv_train_stop_ids()
+    for station in stations:
+        station['stop_id'] = ptv_ids.get(index.normalise(station['stop_name']))
+    return jsonify(stations)
+
+_train_stop_ids = None
+
+def _ptv_train_stop_ids():
+    """Map normalised station name to PTV stop ID, from the bundled stop list."""
+    global _train_stop_ids
+    if _train_stop_ids is None:
+        from data.stop_index import StopIndex
+        with Path('server/data/Metropolitan-Train-Stops.json').open('r', encoding='utf-8') as fh:
+            _train_stop_ids = {StopIndex.normalise(s['stop_name']): s['stop_id'] for s in json.load(fh)}
+    return _train_stop_ids
+
+@app.route('/api/frame.png')
+def api_frame():
+    """
+    The frame currently on the display as a PNG.
+
+    Frames are encoded at most once per change and carry an ETag, so
+    polling with ``If-None-Match`` returns 304 until the screen changes.
+    """
+    if frame_exporter is None:
+        return jsonify({'error': 'frame export unavailable'}), 503
+
+    etag = frame_exporter.current_etag()
+    if etag is not None and etag in request.if_none_match:
+        frame_exporter.record_not_modified()
+        response = Response(status=304)
+    else:
+        frame = frame_exporter.png()
+        if frame is None:
+            return jsonify({'error': 'no frame rendered yet'}), 503
+        etag, png = frame
+        response = Response(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/frame/stats')
+def api_frame_stats():
+    """Frame capture and PNG encoding counters, including the cache hit rate."""
+    if frame_exporter is None:
+        return jsonify({'error': 'frame export unavailable'}), 503
+    return jsonify(frame_exporter.stats())
+
+@app.route('/api/events')
+def api_events():
+    """
+    Server-Sent Events stream of the display's state, status and PTV API
+    health; see ``server.events.EventBroadcaster``.
+    """
+    stream = broadcaster.open_stream()
+    if stream is None:
+        # Each stream holds a worker thread; keep some for the rest of the API
+        response = jsonify({'error': 'too many open status streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(config.EVENTS_HEARTBEAT))
+        return response
+    broadcaster.start(display_state)
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let a reverse proxy hold events back
+    return response
+
 @app.route('/api/send-to-display', methods=['POST'])
 def send_to_display():
     data = request.json
@@ -42,11 +140,12 @@ def send_to_display():
     stop_id = data.get('stopId')      # match JS
     display_type = data.get('displayType')
 
-    display_state['transit_type'] = transit_type
-    display_state['stop'] = stop
-    display_state['stop_id'] = stop_id
-    display_state['display_type'] = display_type
-
-    display_state['version'] += 1
+    # One atomic update, so the display never sees half of a selection
+    display_state.update(
+        transit_type=transit_type,
+        stop=stop,
+        stop_id=stop_id,
+        display_type=display_type,
+    )
 
     return jsonify({'message': f'Sent {stop} ({display_type}) to display'})
\ No newline at end of file
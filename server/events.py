@@ -0,0 +1,181 @@
+""" Server-Sent Events fan-out of display status for the control page """
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Settings live in app/config.py, which uses top-level imports
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroadcaster:
+    """
+    One producer publishing display status to any number of SSE streams.
+
+    A single producer thread watches the display state store (waking at
+    once on a version change) and samples the display loop's status and
+    the PTV API latency and errors every ``interval`` seconds, publishing
+    only what changed. Each event type keeps just its latest payload, so
+    a slow client skips straight to the current status rather than
+    queueing. The producer sleeps while nobody is subscribed.
+
+    Every open stream holds a web server worker thread for as long as it
+    is open, so streams are capped at ``max_subscribers`` (well below
+    ``WEB_THREADS``, leaving workers for the rest of the API) and end
+    after ``max_lifetime`` seconds; EventSource then reconnects, which
+    frees the worker and lets a waiting tab take the slot.
+
+    Events:
+        state: the requested selection and its version
+        status: what the display loop reports it is showing, its last
+            refresh and last error
+        api: PTV API latency, failures and last error
+    """
+
+    def __init__(self,
+                 interval: float = config.EVENTS_INTERVAL,
+                 heartbeat: float = config.EVENTS_HEARTBEAT,
+                 max_subscribers: int = config.EVENTS_MAX_SUBSCRIBERS,
+                 max_lifetime: float = config.EVENTS_MAX_LIFETIME):
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.max_lifetime = max_lifetime
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._latest: Dict[str, Tuple[int, str]] = {}
+        self._producer: Optional[threading.Thread] = None
+        self.subscribers = 0
+        self.published = 0
+        self.rejected = 0
+
+    def publish(self, event: str, data: Dict[str, Any]) -> bool:
+        """Publish an event if its payload changed; returns whether it was sent."""
+        payload = json.dumps(data, sort_keys=True, default=str)
+        with self._cond:
+            latest = self._latest.get(event)
+            if latest is not None and latest[1] == payload:
+                return False
+            self._seq += 1
+            self._latest[event] = (self._seq, payload)
+            self.published += 1
+            self._cond.notify_all()
+            return True
+
+    def start(self, store) -> None:
+        """Start the producer for a ``DisplayStateStore`` if it isn't running."""
+        with self._cond:
+            if self._producer is None or not self._producer.is_alive():
+                self._producer = threading.Thread(target=self._produce, args=(store,), name="events", daemon=True)
+                self._producer.start()
+
+    def _produce(self, store) -> None:
+        version = None
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.subscribers > 0)
+            try:
+                # Imported here so a failed import is retried, not fatal
+                from api import ptv_api
+
+                state = store.wait_for_change(version, timeout=self.interval) if version is not None else store.snapshot()
+                version = state.version
+                self.publish("state", state.to_dict())
+                self.publish("status", store.status())
+
+                stats = ptv_api.get_request_stats()
+                self.publish("api", {
+                    **stats["last_request"],
+                    "requests": stats["requests"],
+                    "failures": stats["failures"],
+                    "stale_served": stats["stale_served"],
+                    "open_circuits": sorted(name for name, s in stats["circuits"].items() if s != "closed"),
+                })
+            except Exception as e:
+                logger.error(f"Event producer error: {str(e)}")
+                time.sleep(self.interval)
+
+    def open_stream(self) -> Optional["EventStream"]:
+        """
+        Subscribe a new client.
+
+        Returns:
+            The client's ``EventStream``, or None if ``max_subscribers``
+            streams are already open.
+        """
+        with self._cond:
+            if self.subscribers >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            self.subscribers += 1
+            self._cond.notify_all()
+        return EventStream(self)
+
+    def _unsubscribe(self) -> None:
+        with self._cond:
+            self.subscribers -= 1
+
+    def _messages(self) -> Iterator[str]:
+        """
+        SSE-formatted messages for one subscriber: the current value of
+        every event first, then changes as they're published, with a
+        comment line every ``heartbeat`` seconds so dead connections are
+        noticed. Ends after ``max_lifetime`` seconds.
+        """
+        last = 0
+        deadline = time.monotonic() + self.max_lifetime
+        yield f"retry: {int(self.heartbeat * 1000)}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield "retry: 1000\n\n"  # reconnect promptly to a fresh stream
+                return
+            with self._cond:
+                self._cond.wait_for(lambda: self._seq > last, min(self.heartbeat, remaining))
+                pending = sorted(
+                    (seq, event, payload)
+                    for event, (seq, payload) in self._latest.items()
+                    if seq > last
+                )
+                last = self._seq
+            if not pending:
+                yield ": keepalive\n\n"
+            for seq, event, payload in pending:
+                yield f"id: {seq}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class EventStream:
+    """
+    One subscriber's response body.
+
+    The WSGI server calls ``close`` when the response ends or the client
+    goes away, even if iteration never started, so the subscriber slot is
+    always released.
+    """
+
+    def __init__(self, broadcaster: EventBroadcaster):
+        self._broadcaster = broadcaster
+        self._messages = broadcaster._messages()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[str]:
+        return self._messages
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._messages.close()
+        self._broadcaster._unsubscribe()
+
+
+broadcaster = EventBroadcaster()
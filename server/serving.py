@@ -0,0 +1,174 @@
+""" WSGI serving for the control server: Flask's dev server or a production threaded server """
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+# Server settings live in app/config.py, which uses top-level imports
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import config
+
+logger = logging.getLogger(__name__)
+
+DEV = 'dev'
+PRODUCTION = 'production'
+
+
+class SampledAccessLog:
+    """
+    WSGI middleware logging a sample of requests with status and latency.
+
+    Logging every request costs more than serving most of the API on a Pi,
+    so only ``sample_rate`` of successful requests are logged; server
+    errors are always logged. Latency runs until the response is closed, so
+    streamed responses report their full duration.
+    """
+
+    def __init__(self, app, sample_rate: float = config.WEB_ACCESS_LOG_SAMPLE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        status = []
+
+        def capture(code, headers, exc_info=None):
+            status.append(code)
+            return start_response(code, headers, exc_info)
+
+        return _LoggedResponse(self.app(environ, capture), environ, status, start, self.sample_rate)
+
+
+class _LoggedResponse:
+    def __init__(self, iterable, environ, status, start, sample_rate):
+        self._iterable = iterable
+        self._environ = environ
+        self._status = status
+        self._start = start
+        self._sample_rate = sample_rate
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            status = self._status[0] if self._status else '-'
+            if status.startswith('5') or random.random() < self._sample_rate:
+                environ = self._environ
+                path = environ.get('PATH_INFO', '')
+                if environ.get('QUERY_STRING'):
+                    path += '?' + environ['QUERY_STRING']
+                logger.info(
+                    f"{environ.get('REMOTE_ADDR', '-')} {environ.get('REQUEST_METHOD', '-')} {path} "
+                    f"{status} {(time.perf_counter() - self._start) * 1000:.1f} ms"
+                )
+
+
+class _QuietHandler(WSGIRequestHandler):
+    # Reads from slow or stalled clients time out instead of holding a worker
+    timeout = config.WEB_REQUEST_TIMEOUT
+
+    def log_message(self, format, *args):
+        pass  # SampledAccessLog does access logging
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    ``wsgiref`` server with a fixed worker pool and a connection limit.
+
+    Used for production serving when ``waitress`` isn't installed.
+    Connections beyond ``connection_limit`` (in flight or queued for a
+    worker) get an immediate 503 rather than piling up.
+    """
+
+    request_queue_size = 64  # listen backlog
+
+    def __init__(self, address, threads: int = config.WEB_THREADS,
+                 connection_limit: int = config.WEB_CONNECTION_LIMIT):
+        super().__init__(address, _QuietHandler)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='web')
+        self._slots = threading.BoundedSemaphore(connection_limit)
+        self.rejected = 0
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            try:
+                request.sendall(b'HTTP/1.0 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self._pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (socket.timeout, ConnectionError)):
+            return
+        logger.exception(f"Error handling request from {client_address[0]}")
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def serve(app, host: str = '0.0.0.0', port: int = 5000, mode: str = config.WEB_SERVER) -> None:
+    """
+    Serve a Flask app until the process exits.
+
+    Args:
+        app: The Flask app.
+        host, port: Address to listen on.
+        mode: ``'dev'`` for Flask's debug server, or ``'production'`` for
+            waitress (if installed) or ``PooledWSGIServer``, both with the
+            ``config.WEB_*`` limits and sampled access logging.
+    """
+    if mode == DEV:
+        logger.info(f"Serving with the Flask development server on http://{host}:{port}")
+        app.run(host=host, port=port, debug=True, use_reloader=False, threaded=True)
+        return
+
+    wsgi_app = SampledAccessLog(app)
+    try:
+        import waitress
+    except ImportError:
+        waitress = None
+
+    if waitress is not None:
+        logger.info(f"Serving with waitress on http://{host}:{port}")
+        waitress.serve(
+            wsgi_app,
+            host=host,
+            port=port,
+            threads=config.WEB_THREADS,
+            connection_limit=config.WEB_CONNECTION_LIMIT,
+            channel_timeout=config.WEB_REQUEST_TIMEOUT,
+            ident=None,
+            _quiet=True,
+        )
+        return
+
+    server = PooledWSGIServer((host, port))
+    server.set_app(wsgi_app)
+    logger.info(f"Serving with the pooled WSGI server on http://{host}:{port} (install waitress for keep-alive)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,113 @@
+""" Versioned, immutable display state shared by the web server and the display loop """
+from dataclasses import dataclass, replace
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class DisplayState:
+    """One consistent selection of what the panel should show."""
+    transit_type: Optional[str] = None
+    stop: Optional[str] = None
+    stop_id: Any = None
+    display_type: str = 'default_display'
+    train_platforms: Tuple[str, ...] = ()
+    version: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'transit_type': self.transit_type,
+            'stop': self.stop,
+            'stop_id': self.stop_id,
+            'display_type': self.display_type,
+            'train_platforms': list(self.train_platforms),
+            'version': self.version,
+        }
+
+
+class DisplayStateStore:
+    """
+    Holder of the current ``DisplayState``.
+
+    Request threads used to write the shared dict field by field, so the
+    display loop could read a new ``stop_id`` with the old
+    ``transit_type``, and ``version += 1`` could lose increments. Here every
+    change publishes a whole new frozen snapshot with the next version:
+
+    - ``snapshot`` is a plain attribute read, so readers never lock and
+      always see one complete state.
+    - ``compare_and_set`` replaces the state only if it is still the one the
+      caller read; ``update`` retries that until it wins, so concurrent
+      writers never lose a version.
+    - ``wait_for_change`` blocks until the version moves on.
+
+    ``running`` is a lifecycle flag and ``report``/``status`` carry what the
+    display loop says it is showing; neither is part of the selection and
+    changing them doesn't bump the version.
+    """
+
+    def __init__(self, initial: Optional[DisplayState] = None):
+        self._state = initial or DisplayState()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._running = threading.Event()
+        self._status: Dict[str, Any] = {}
+
+    def snapshot(self) -> DisplayState:
+        """The current state; never blocks."""
+        return self._state
+
+    @property
+    def version(self) -> int:
+        return self._state.version
+
+    def compare_and_set(self, expected: DisplayState, new: DisplayState) -> Optional[DisplayState]:
+        """
+        Publish ``new`` (with the next version) if the current state is still
+        ``expected``.
+
+        Returns:
+            The published state, or None if another writer got there first.
+        """
+        with self._lock:
+            if self._state is not expected:
+                return None
+            self._state = replace(new, version=expected.version + 1)
+            self._changed.notify_all()
+            return self._state
+
+    def update(self, **changes) -> DisplayState:
+        """Atomically apply field changes and bump the version; returns the new state."""
+        if 'train_platforms' in changes:
+            changes['train_platforms'] = tuple(changes['train_platforms'] or ())
+        while True:
+            current = self._state
+            published = self.compare_and_set(current, replace(current, **changes))
+            if published is not None:
+                return published
+
+    def wait_for_change(self, version: int, timeout: Optional[float] = None) -> DisplayState:
+        """Block until the version differs from ``version`` (or ``timeout``); returns the current state."""
+        with self._lock:
+            self._changed.wait_for(lambda: self._state.version != version, timeout)
+            return self._state
+
+    def report(self, **fields) -> None:
+        """Merge status fields from the display loop (shown version, last refresh, errors)."""
+        with self._lock:
+            self._status = {**self._status, **fields}
+
+    def status(self) -> Dict[str, Any]:
+        """The display loop's latest status; never blocks, don't modify."""
+        return self._status
+
+    @property
+    def running(self) -> bool:
+        return self._running.is_set()
+
+    @running.setter
+    def running(self, value: bool) -> None:
+        if value:
+            self._running.set()
+        else:
+            self._running.clear()
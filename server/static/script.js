@@ -83,3 +83,62 @@ async function send_to_display() {
     const data = await response.json();
     alert(data.message || 'Sent to display');
 }
+
+
+// Live display status pushed by /api/events; EventSource reconnects on its own
+const displayStatus = { state: null, status: {}, api: {} };
+
+function format_time(epoch) {
+    return epoch ? new Date(epoch * 1000).toLocaleTimeString() : '-';
+}
+
+function render_status() {
+    const { state, status, api } = displayStatus;
+    let showing = status.stop || 'default display';
+    if (state && status.shown_version !== undefined && status.shown_version !== state.version) {
+        showing += ' (switching...)';
+    }
+    document.getElementById('status-showing').textContent = showing;
+
+    let refresh = format_time(status.last_refresh);
+    if (status.last_fetch_ok === false) {
+        refresh += status.last_fetch_age ? ` (stale, ${Math.round(status.last_fetch_age)}s old)` : ' (failed)';
+    }
+    document.getElementById('status-refresh').textContent = refresh;
+
+    let latency = api.mean_latency_ms != null ? `${Math.round(api.mean_latency_ms)} ms` : '-';
+    if (api.open_circuits && api.open_circuits.length) {
+        latency += ` (circuit open: ${api.open_circuits.join(', ')})`;
+    }
+    document.getElementById('status-api').textContent = latency;
+
+    const errors = [
+        [status.error, status.error_at],
+        [api.error, api.error_at],
+    ].filter(([message]) => message).sort((a, b) => (b[1] || 0) - (a[1] || 0));
+    document.getElementById('status-error').textContent =
+        errors.length ? `${errors[0][0]} at ${format_time(errors[0][1])}` : 'none';
+}
+
+function connect_status() {
+    const events = new EventSource('/api/events');
+    const connection = document.getElementById('status-connection');
+    ['state', 'status', 'api'].forEach(name => {
+        events.addEventListener(name, e => {
+            displayStatus[name] = JSON.parse(e.data);
+            render_status();
+        });
+    });
+    events.onopen = () => { connection.textContent = 'live'; };
+    events.onerror = () => {
+        connection.textContent = 'reconnecting...';
+        // EventSource gives up on a 503 (too many open streams); try again later
+        if (events.readyState === EventSource.CLOSED) {
+            setTimeout(connect_status, 15000);
+        }
+    };
+}
+
+if (window.EventSource) {
+    connect_status();
+}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for PTV URL signing.
+
+Compares the per-request CPU cost of the original getUrl (a fresh
+HMAC-SHA1 per call) with PTVSigner on a cache miss (copied keyed state)
+and a cache hit. Run it on the target device, e.g. a Raspberry Pi:
+
+    python tools/bench_signing.py
+"""
+from hashlib import sha1
+import hmac
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+from api.signing import PTVSigner, BASE_URL
+
+DEV_ID = "3001234"
+KEY = "a1b2c3d4-e5f6-7a8b-9c0d-e1f2a3b4c5d6"
+ENDPOINTS = [
+    f"/v3/departures/route_type/0/stop/{stop_id}?max_results=3&expand=0&include_skipped_stops=true"
+    for stop_id in (1071, 1181, 1162, 1144)
+] + [
+    f"/v3/stops/{stop_id}/route_type/0?stop_location=true&stop_amenities=true"
+    for stop_id in (1071, 1181)
+]
+
+
+def legacy_get_url(endpoint: str) -> str:
+    request_str = endpoint + ('&' if '?' in endpoint else '?') + f"devid={DEV_ID}"
+    signature = hmac.new(KEY.encode(), request_str.encode(), sha1).hexdigest()
+    return f"{BASE_URL}{request_str}&signature={signature}"
+
+
+def cpu_per_call(fn, iterations: int) -> float:
+    """Return CPU microseconds per call of fn over the endpoint mix."""
+    n = len(ENDPOINTS)
+    start = time.process_time()
+    for i in range(iterations):
+        fn(ENDPOINTS[i % n])
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main(iterations: int = 200_000):
+    signer = PTVSigner(DEV_ID, KEY)
+    assert signer.sign(ENDPOINTS[0]) == legacy_get_url(ENDPOINTS[0])
+
+    results = {
+        "legacy getUrl": cpu_per_call(legacy_get_url, iterations),
+        "signer, cache miss": cpu_per_call(signer._sign, iterations),
+        "signer, cache hit": cpu_per_call(signer.sign, iterations),
+    }
+
+    print(f"{platform.machine()} / Python {platform.python_version()} / {iterations} calls")
+    baseline = results["legacy getUrl"]
+    for name, us in results.items():
+        print(f"  {name:<20} {us:7.2f} us/call  ({baseline / us:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
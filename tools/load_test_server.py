@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Load test of the control server's /api/stops in dev and production modes.
+
+Each mode is started in its own subprocess on a free local port, then
+hammered by concurrent clients; throughput, latency percentiles and
+errors are reported per mode. Run it from the repository root:
+
+    python tools/load_test_server.py
+    python tools/load_test_server.py --clients 32 --requests 2000 --modes production
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = """
+import logging, sys
+sys.path.insert(0, {root!r})
+logging.basicConfig(level=logging.WARNING)
+from server.app import app
+from server.serving import serve
+serve(app, host='127.0.0.1', port={port}, mode={mode!r})
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 15) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not start")
+
+
+def run_load(url: str, clients: int, requests: int):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_client = requests // clients
+
+    def client():
+        mine, failed = [], 0
+        for _ in range(per_client):
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=10) as response:
+                    response.read()
+                mine.append(time.perf_counter() - start)
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, sorted(latencies), sum(errors)
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=1000, help='total requests per mode')
+    parser.add_argument('--modes', nargs='+', default=['dev', 'production'])
+    parser.add_argument('--path', default='/api/stops?type=Metropolitan-Train')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('TIMEZONE', 'Australia/Melbourne')
+
+    for mode in args.modes:
+        port = free_port()
+        url = f'http://127.0.0.1:{port}{args.path}'
+        proc = subprocess.Popen(
+            [sys.executable, '-c', SERVER.format(root=ROOT, port=port, mode=mode)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for(url)
+            elapsed, latencies, errors = run_load(url, args.clients, args.requests)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+        done = len(latencies)
+        print(f"{mode:>10}: {done} ok, {errors} errors in {elapsed:.2f}s = {done / elapsed:.0f} req/s; "
+              f"latency p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 95) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
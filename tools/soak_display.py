@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Memory soak test for the platform and tram displays.
+
+Runs a display for thousands of simulated frames against a synthetic PTV
+API (no network; every refresh returns new runs, so run dicts, PID stop
+listings and alerts keep changing), sampling memory with
+``memprofile.MemoryProfiler``. Growth after the warm-up is checked against
+thresholds and the run fails if any is exceeded. Simulated time advances
+by one frame period per frame, so departures refresh as they would over
+hours of real running. Each frame waits for the display's background
+fetch, so a run doesn't depend on thread timing. The size-capped caches
+(the timestamp and minute-label caches in ``utils`` and the PTV API's
+last-good responses, which gain a stopping pattern per run) are emptied
+before every sample: they fill for longer than any practical warm-up and
+would otherwise be reported as growth. Run it from the repository root:
+
+    python tools/soak_display.py
+    python tools/soak_display.py --display tram --frames 50000 --max-traced-kb 256
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('TIMEZONE', 'Australia/Melbourne')
+os.environ.setdefault('PTV_CACHE_FILE', os.path.join(tempfile.mkdtemp(prefix='ptv-soak-'), 'snapshots.sqlite3'))
+
+import pygame
+
+import config
+import memprofile
+import utils
+from api import gtfs, ptv_api
+from data import gtfs_loader
+
+TRAIN_STOP = {
+    'route_type': 0,
+    'stop_name': 'Flinders Street Station',
+    'routes': [{'route_id': 6, 'route_gtfs_id': '2-FKN'}, {'route_id': 11, 'route_gtfs_id': '2-SDM'}],
+    'stop_location': {'suburb': 'Melbourne', 'gps': {'latitude': -37.8183, 'longitude': 144.9671}},
+    'stop_landmark': '',
+}
+TRAM_STOP = {
+    'route_type': 1,
+    'stop_name': 'Swanston St/Flinders St',
+    'routes': [{'route_id': 1, 'route_gtfs_id': '3-1', 'route_number': '1'},
+               {'route_id': 2, 'route_gtfs_id': '3-109', 'route_number': '109'}],
+}
+
+
+class SyntheticPTV:
+    """Stand-in for ``ptv_api._send_ptv_request`` returning fresh runs on every call."""
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.next_run = 1000
+        self.calls = 0
+
+    @staticmethod
+    def _iso(minutes: float) -> str:
+        return (datetime.now(timezone.utc) + timedelta(minutes=minutes)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def _runs(self, n: int):
+        start = self.next_run
+        self.next_run += n
+        return range(start, start + n)
+
+    def __call__(self, endpoint: str):
+        self.calls += 1
+        path = endpoint.split('?')[0]
+        if path.startswith('/v3/stops/'):
+            return {'stop': TRAIN_STOP if '/route_type/0' in path else TRAM_STOP}, False
+        if path.startswith('/v3/departures/route_type/0'):
+            runs = list(self._runs(12))
+            departures = [{
+                'run_id': run_id,
+                'run_ref': str(run_id),
+                'route_id': self.rng.choice((6, 11)),
+                'platform_number': str(1 + i % 3),
+                'scheduled_departure_utc': self._iso(1 + 4 * i),
+                'estimated_departure_utc': self._iso(1 + 4 * i) if i < 2 else None,
+                'flags': '',
+                'departure_note': self.rng.choice(('', 'Change at Caulfield')),
+            } for i, run_id in enumerate(runs)]
+            return {
+                'departures': departures,
+                'runs': {str(r): {'run_id': r, 'run_ref': str(r), 'route_id': 6,
+                                  'destination_name': self.rng.choice(('Frankston', 'Sandringham')),
+                                  'express_stop_count': self.rng.randrange(3)} for r in runs},
+            }, False
+        if path.startswith('/v3/departures/route_type/1'):
+            departures = [{
+                'run_id': run_id, 'route_id': 1 + i % 2, 'direction_id': 5,
+                'scheduled_departure_utc': self._iso(1 + 3 * i),
+                'estimated_departure_utc': self._iso(1 + 3 * i) if i % 2 else None, 'flags': '',
+            } for i, run_id in enumerate(self._runs(8))]
+            return {
+                'departures': departures,
+                'routes': {'1': {'route_number': '1'}, '2': {'route_number': '109'}},
+                'directions': {'5': {'direction_name': 'Box Hill'}},
+            }, False
+        if path.startswith('/v3/pattern/run/'):
+            n = self.rng.randrange(6, 20)
+            departures = [{'stop_id': 1071 + i, 'route_id': 6, 'departure_sequence': i, 'skipped_stops': []}
+                          for i in range(n)]
+            return {'stops': {str(1071 + i): {'stop_name': f'Stop {i} Station'} for i in range(n)},
+                    'departures': departures}, False
+        return None, True
+
+    def tram_service_updates(self, routes):
+        return [{'header': 'Disruption', 'url': '',
+                 'description': f'Route {self.rng.choice(routes or ["1"])} trams are delayed '
+                                f'by {self.rng.randrange(5, 40)} minutes due to an incident.'}]
+
+
+def clear_bounded_caches() -> None:
+    """Empty the size-capped caches whose fill isn't a leak; see the module docstring."""
+    utils.parse_ptv_utc.cache_clear()
+    utils._minute_labels.clear()
+    ptv_api.clear_stale_cache()
+
+
+def build_display(kind: str):
+    ctx = {
+        'ptv_api': ptv_api,
+        'config': config,
+        'routeStyles': gtfs_loader.load_route_styles(os.path.join(ROOT, 'app', 'data')),
+    }
+    if kind == 'tram':
+        from models.tram_stop import TramStop
+        from displays.tram_display import TramDisplay
+        return TramDisplay({**ctx, 'stop': TramStop(2500)})
+    from models.train_stop import TrainStop
+    from displays.platform import PlatformDisplay
+    return PlatformDisplay({**ctx, 'stop': TrainStop(1071)}, None)
+
+
+def mib(n) -> str:
+    return 'n/a' if n is None else f'{n / 2**20:.2f}'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--display', choices=['platform', 'tram'], default='platform')
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--warmup', type=int, default=6000,
+                        help='frames before the growth baseline; long enough for the fixed caches (fonts, sprites) to fill')
+    parser.add_argument('--sample-every', type=int, default=2000, help='frames between samples')
+    parser.add_argument('--max-traced-kb', type=float, default=512, help='allowed growth of traced Python memory')
+    parser.add_argument('--max-rss-mb', type=float, default=16, help='allowed RSS growth')
+    parser.add_argument('--max-surfaces', type=int, default=4, help='allowed growth in live surfaces')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    synthetic = SyntheticPTV(args.seed)
+    ptv_api._send_ptv_request = synthetic
+    gtfs.tram_service_updates = synthetic.tram_service_updates
+
+    pygame.init()
+    screen = pygame.display.set_mode(config.SCREEN_RES)
+    profiler = memprofile.MemoryProfiler().start()
+
+    display = build_display(args.display)
+    display.on_show()
+
+    now = time.time()
+    period = 1 / config.FPS
+    baseline = None
+    start = time.perf_counter()
+    print(f"{'frame':>8} {'traced MiB':>11} {'RSS MiB':>8} {'surfaces':>9}  caches")
+    for frame in range(1, args.frames + 1):
+        now += period
+        display.update(now)
+        display.refresh.join()  # collected by the next frame's update
+        display.draw(screen)
+        pygame.display.flip()
+
+        if frame == args.warmup or frame % args.sample_every == 0 or frame == args.frames:
+            caches = ', '.join(f'{name} {size}' for name, size in memprofile.cache_sizes().items())
+            clear_bounded_caches()
+            sample = profiler.sample()
+            print(f"{frame:>8} {mib(sample['traced']):>11} {mib(sample['rss']):>8} {sample['surfaces']:>9}  {caches}")
+            if frame == args.warmup:
+                profiler.reset_baseline()
+                baseline = sample
+
+    elapsed = time.perf_counter() - start
+    if baseline is None:
+        baseline = sample
+    growth = {
+        'traced': (sample['traced'] - baseline['traced']) / 1024,
+        'rss': (sample['rss'] - baseline['rss']) / 2**20 if sample['rss'] and baseline['rss'] else 0.0,
+        'surfaces': sample['surfaces'] - baseline['surfaces'],
+    }
+    print(f"\n{args.frames} frames of {args.display} in {elapsed:.1f}s "
+          f"({args.frames / elapsed:.0f} frames/s), {synthetic.calls} API calls")
+    print(f"growth after frame {args.warmup}: traced {growth['traced']:+.1f} KiB, "
+          f"RSS {growth['rss']:+.2f} MiB, surfaces {growth['surfaces']:+d}")
+    if sample['top']:
+        print("top allocation sites since warm-up:")
+        for site, size, count in sample['top']:
+            print(f"  {size / 1024:+9.1f} KiB {count:+7d} blocks  {site}")
+
+    failures = []
+    if growth['traced'] > args.max_traced_kb:
+        failures.append(f"traced memory grew {growth['traced']:.1f} KiB (limit {args.max_traced_kb})")
+    if growth['rss'] > args.max_rss_mb:
+        failures.append(f"RSS grew {growth['rss']:.2f} MiB (limit {args.max_rss_mb})")
+    if growth['surfaces'] > args.max_surfaces:
+        failures.append(f"{growth['surfaces']} more live surfaces (limit {args.max_surfaces})")
+    pygame.quit()
+    if failures:
+        print('FAIL: ' + '; '.join(failures))
+        sys.exit(1)
+    print('PASS')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for the display state store and the display loop.
+
+Several threads POST to /api/send-to-display through Flask's test client
+while ``run_display_loop`` runs headless (SDL dummy driver, PTV API
+stubbed) against the same store, switching displays as selections arrive,
+and a reader thread polls snapshots as fast as it can. Every request sends
+a self-consistent selection (the stop name encodes its transit type and
+stop ID), so a torn state can be spotted: each snapshot the reader sees and
+each ``shown_version`` the loop reports must be one whole selection, shown
+with the right display, and the final version must equal the number of
+requests.
+
+``--legacy`` runs the same writers against the old shared dict, updated
+field by field, for comparison (without the display loop):
+
+    python tools/stress_display_state.py
+    python tools/stress_display_state.py --legacy
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('TIMEZONE', 'Australia/Melbourne')
+os.environ.setdefault('USER_ID', 'stress')
+os.environ.setdefault('API_KEY', 'stress')
+os.environ.setdefault('PTV_CACHE_FILE', os.path.join(tempfile.mkdtemp(prefix='ptv-stress-'), 'snapshots.sqlite3'))
+
+import server.app as server_app
+from server.state import DisplayStateStore
+
+# server.app puts app/ on the path; app/run.py must win over the root run.py
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+
+SELECTIONS = [
+    ('Metropolitan-Train', 'platform'),
+    ('Tram', 'tram_display'),
+]
+
+
+def selection(rng: random.Random):
+    transit_type, display_type = rng.choice(SELECTIONS)
+    stop_id = str(rng.randrange(1000, 3000))
+    return {
+        'transitType': transit_type,
+        'stopId': stop_id,
+        'stopName': f'{transit_type}:{stop_id}',
+        'displayType': display_type,
+    }
+
+
+def consistent(transit_type, stop, stop_id, display_type) -> bool:
+    if stop is None:
+        return transit_type is None
+    return stop == f'{transit_type}:{stop_id}' and (transit_type, display_type) in SELECTIONS
+
+
+# Display the loop should build for each selection
+DISPLAYS = {
+    None: 'DefaultDisplay',
+    'Metropolitan-Train': 'PlatformDisplay',
+    'Tram': 'TramDisplay',
+}
+
+
+def stub_ptv(endpoint: str):
+    """Stand-in for ``ptv_api._send_ptv_request``: any stop resolves, nothing departs."""
+    path = endpoint.split('?')[0]
+    if path.startswith('/v3/stops/') and path.endswith('/route_type/0'):
+        return {'stop': {
+            'route_type': 0, 'stop_name': 'Stress Station', 'routes': [], 'stop_landmark': '',
+            'stop_location': {'suburb': 'Melbourne', 'gps': {'latitude': -37.8, 'longitude': 144.9}},
+        }}, False
+    if path.startswith('/v3/stops/'):
+        return {'stop': {'route_type': 1, 'stop_name': 'Stress St/Stop', 'routes': []}}, False
+    return {'departures': [], 'runs': {}, 'routes': {}, 'directions': {}}, False
+
+
+class RecordingStore(DisplayStateStore):
+    """``DisplayStateStore`` that keeps every published state and every display switch the loop reports."""
+
+    def __init__(self):
+        super().__init__()
+        self.published = {0: self.snapshot()}
+        self.shown = []
+
+    def compare_and_set(self, expected, new):
+        published = super().compare_and_set(expected, new)
+        if published is not None:
+            self.published[published.version] = published
+        return published
+
+    def report(self, **fields) -> None:
+        if 'shown_version' in fields:
+            self.shown.append(dict(fields))
+        super().report(**fields)
+
+
+def check_shown(store: RecordingStore) -> list:
+    """Problems with the versions the loop reported showing; empty if every one was a whole selection."""
+    problems = []
+    last = -1
+    for shown in store.shown:
+        version = shown['shown_version']
+        state = store.published.get(version)
+        if state is None:
+            problems.append(f"version {version} shown but never published")
+            continue
+        if version < last:
+            problems.append(f"version {version} shown after {last}")
+        last = version
+        if not consistent(state.transit_type, state.stop, state.stop_id, state.display_type):
+            problems.append(f"version {version} is torn: {state}")
+        if shown.get('error'):
+            continue  # the loop fell back to the default display and said why
+        expected = DISPLAYS.get(state.transit_type)
+        if shown['display_type'] != expected or shown['stop'] != state.stop:
+            problems.append(
+                f"version {version} ({state.stop}) shown as {shown['display_type']} "
+                f"for {shown['stop']}, expected {expected}"
+            )
+    return problems
+
+
+def start_display_loop(store: DisplayStateStore) -> threading.Thread:
+    """Run the display loop headless against ``store``, with the PTV API stubbed."""
+    from api import gtfs, ptv_api
+    from run import run_display_loop
+
+    ptv_api._send_ptv_request = stub_ptv
+    gtfs.tram_service_updates = lambda routes: []
+
+    loop = threading.Thread(target=run_display_loop, args=(store,), name='display-loop')
+    loop.start()
+    deadline = time.monotonic() + 30
+    while not store.running:
+        if not loop.is_alive() or time.monotonic() > deadline:
+            sys.exit('display loop failed to start')
+        time.sleep(0.05)
+    return loop
+
+
+def store_writer(requests: int, seed: int, errors: list, pause: float = 0.0) -> None:
+    client = server_app.app.test_client()
+    rng = random.Random(seed)
+    for _ in range(requests):
+        response = client.post('/api/send-to-display', json=selection(rng))
+        if response.status_code != 200:
+            errors.append(response.status_code)
+        if pause:
+            time.sleep(rng.uniform(0, 2 * pause))
+
+
+def legacy_writer(state: dict, requests: int, seed: int, errors: list) -> None:
+    # Yields between fields stand in for a request thread being preempted
+    rng = random.Random(seed)
+    for _ in range(requests):
+        data = selection(rng)
+        state['transit_type'] = data['transitType']
+        time.sleep(0)
+        state['stop'] = data['stopName']
+        time.sleep(0)
+        state['stop_id'] = data['stopId']
+        state['display_type'] = data['displayType']
+        version = state['version']
+        time.sleep(0)
+        state['version'] = version + 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requests per writer')
+    parser.add_argument('--pause', type=float, default=0.002,
+                        help='mean seconds between one writer\'s requests, so the loop rebuilds many selections')
+    parser.add_argument('--legacy', action='store_true', help='use the old field-by-field dict')
+    args = parser.parse_args()
+
+    # Switch threads often so races show up quickly
+    sys.setswitchinterval(1e-6)
+
+    if args.legacy:
+        legacy = {'transit_type': None, 'stop': None, 'stop_id': None,
+                  'display_type': 'default_display', 'version': 0}
+        read = lambda: (legacy['transit_type'], legacy['stop'], legacy['stop_id'],
+                        legacy['display_type'], legacy['version'])
+        target = lambda i, errors: legacy_writer(legacy, args.requests, i, errors)
+        loop = None
+    else:
+        store = RecordingStore()
+        server_app.display_state = store
+        loop = start_display_loop(store)
+
+        def read():
+            s = store.snapshot()
+            return s.transit_type, s.stop, s.stop_id, s.display_type, s.version
+        target = lambda i, errors: store_writer(args.requests, i, errors, args.pause)
+
+    done = threading.Event()
+    reads = torn = backwards = 0
+
+    def reader():
+        nonlocal reads, torn, backwards
+        last = 0
+        while not done.is_set():
+            transit_type, stop, stop_id, display_type, version = read()
+            reads += 1
+            if not consistent(transit_type, stop, stop_id, display_type):
+                torn += 1
+            if version < last:
+                backwards += 1
+            last = version
+
+    errors: list = []
+    reader_thread = threading.Thread(target=reader)
+    writers = [threading.Thread(target=target, args=(i, errors)) for i in range(args.writers)]
+
+    start = time.perf_counter()
+    reader_thread.start()
+    for w in writers:
+        w.start()
+    for w in writers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    reader_thread.join()
+
+    problems = []
+    if loop is not None:
+        # Let the loop catch up with the last selection, then stop it
+        deadline = time.monotonic() + 10
+        while store.status().get('shown_version') != store.version and time.monotonic() < deadline:
+            time.sleep(0.05)
+        store.running = False
+        loop.join()
+        problems = check_shown(store)
+
+    expected = args.writers * args.requests
+    final = read()[4]
+    print(f"{'legacy dict' if args.legacy else 'DisplayStateStore'}: "
+          f"{expected} requests from {args.writers} threads in {elapsed:.2f}s")
+    print(f"  final version {final} (lost updates: {expected - final})")
+    print(f"  reader: {reads} snapshots, {torn} torn, {backwards} went backwards")
+    if loop is not None:
+        print(f"  display loop: {len(store.shown)} selections shown, {len(problems)} inconsistent")
+        for problem in problems[:10]:
+            print(f"    {problem}")
+    if errors:
+        print(f"  {len(errors)} failed requests")
+    if not args.legacy and (torn or backwards or final != expected or errors or problems):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()